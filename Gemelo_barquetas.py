@@ -3,11 +3,21 @@ import streamlit as st
 import time
 import pandas as pd
 import datetime
-from collections import deque
-import altair as alt
-import math
 import copy
-from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
+import sqlite3
+from st_aggrid import AgGrid
+from utilidades import fmt_num_es, float_to_time_str
+from motor_simulacion import HORIZONTE_HORAS, simulaciones_desde_estado, n_descansos, simular_planta, firma_planta, estado_en_tick, historial_df, serie_turno, resumen_planta
+from graficos import grafico_linea, grafico_global, grafico_comparacion, grafico_evolucion, opciones_grid, rejilla_agrupada
+from carga_datos import cargar_datos, EnlaceNoCSV
+from montecarlo import barrido_montecarlo, crear_pool, PERCENTILES
+from optimizador import optimizar_planta, aplicar_orden, tabla_comparativa
+from balanceo import balancear_planta
+from perfilador import Perfilador, usar, medir, contar
+from trabajos import lanzar
+from en_vivo import PrevisionEnVivo, LectorArchivo, LectorSocket, ESTADOS
+from horizonte import planificar_horizonte, resumen_turnos, tabla_lineas, serie_horizonte, hora_dia
+from historico import TIPOS, GLOBAL, guardar_simulacion, guardar_prevision, listar_ejecuciones, cargar_ejecucion, comparar_ejecuciones
 
 # --- Configuración de la página ---
 st.set_page_config(
@@ -60,65 +70,53 @@ st.markdown("""
 # 1. FUNCIONES HELPER
 # ==========================================
 
-def fmt_num_es(val):
-    """Formato español 1.000,00"""
-    if pd.isna(val) or val == "": return ""
-    try:
-        if val == int(val): return "{:,.0f}".format(val).replace(",", ".")
-        return "{:,.2f}".format(val).replace(",", "X").replace(".", ",").replace("X", ".")
-    except: return str(val)
-
 def render_aggrid(df, key_id, height=None):
     if df.empty:
         st.info("Sin datos.")
         return
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_default_column(resizable=True, filterable=True, sortable=True, editable=False, cellStyle={'textAlign': 'left'}, headerClass='ag-header-cell-label')
-    gb.configure_grid_options(domLayout='autoHeight')
-    AgGrid(df, gridOptions=gb.build(), height=height if height else 200, width='100%', fit_columns_on_grid_load=True, theme='streamlit', key=key_id)
-
-def time_to_float(time_obj):
-    if time_obj is None: return 0.0
-    return time_obj.hour + time_obj.minute / 60.0
-
-def float_to_time_str(time_float):
-    hours = int(time_float); minutes = round((time_float - hours) * 60)
-    if minutes == 60: hours += 1; minutes = 0
-    days = hours // 24; hours = hours % 24
-    if days > 0: return f"{hours:02d}:{minutes:02d} (+{days}d)"
-    return f"{hours:02d}:{minutes:02d}"
-
-def str_to_time(time_str):
-    if not time_str or pd.isna(time_str): return None
-    try: return datetime.datetime.strptime(str(time_str).strip(), '%H:%M').time()
-    except ValueError: return None
-
-def str_to_bool(val):
-    if pd.isna(val): return False
-    s = str(val).strip().upper()
-    return s in ['TRUE', 'VERDADERO', 'SI', 'YES', '1']
-
-def safe_get_int(val, default):
-    if pd.isna(val) or val == "": return default
-    s_val = str(val).strip().replace('.', '').replace(',', '')
-    if s_val == '': return default
-    try: return int(float(s_val))
-    except: return default
-
-def calcular_descanso_en_tramo(tramo_start_float, tramo_end_float, breaks_config):
-    total_descanso = 0.0
-    for i in range(1, 4):
-        if not breaks_config[f'skip_{i}']:
-            s = breaks_config[f'start_{i}']; e = breaks_config[f'end_{i}']
-            if s == 0.0 and e == 0.0: continue
-            overlap = max(0, min(tramo_end_float, e) - max(tramo_start_float, s))
-            total_descanso += overlap
-    return total_descanso
+    with medir("render.tablas"): AgGrid(df, gridOptions=opciones_grid(df), height=height if height else 200, width='100%', fit_columns_on_grid_load=True, theme='streamlit', key=key_id)
+
+def licencia_aggrid():
+    """Licencia de AG Grid Enterprise de los secretos (`aggrid_license_key`); None si no hay."""
+    return st.secrets.get("aggrid_license_key") or None
+
+def render_aggrid_agrupado(df, grupos, key_id, titulo_grupo=None, height=500, rejilla=None):
+    """Rejilla virtual (altura fija) con filas agrupadas; `rejilla` = `rejilla_agrupada` ya construida, si se tiene."""
+    if df.empty:
+        st.info("Sin datos.")
+        return
+    # La agrupación plegable es un módulo enterprise de AG Grid: sólo se activa con licencia
+    licencia = licencia_aggrid()
+    filas, opciones = rejilla or rejilla_agrupada(df, grupos, titulo_grupo, enterprise=licencia is not None)
+    with medir("render.tablas"): AgGrid(filas, gridOptions=opciones, height=height, width='100%', theme='streamlit', key=key_id, enable_enterprise_modules=licencia is not None, license_key=licencia)
+
+def dibujar_grafico(construir, trabajo=None, clave=None):
+    """Dibuja el gráfico Altair que devuelve `construir()`.
+
+    Serializarlo (to_dict + validación) es lo más caro del dibujo; con `trabajo` la
+    especificación se guarda con esa `clave` y se reutiliza en los siguientes fotogramas
+    y en otras sesiones que muestran la misma simulación.
+    """
+    with medir("render.graficos"):
+        spec = trabajo.memo(clave, lambda: construir().to_dict()) if trabajo else construir().to_dict()
+        st.vega_lite_chart(spec=dict(spec), width="stretch")
+
+RESOLUCIONES_MIN = [60, 15, 5, 1]
+ESPERA_CORTA_SEG = 0.5   # Una simulación que termina antes se dibuja sin mostrar la barra de progreso
+
+@st.cache_resource
+def pool_escenarios():
+    """Pool de procesos de los escenarios Monte Carlo, creado una vez y compartido por todas las sesiones."""
+    return crear_pool()
+
+def paso_simulacion():
+    """Duración de cada tramo simulado, en horas."""
+    return st.session_state.get('resolucion_min', 60) / 60.0
 
 # ==========================================
 # 2. CARGA DE DATOS (BLINDADA)
 # ==========================================
-def load_data_from_sheets():
+def load_data_from_sheets(forzar=False):
     if "google_sheet_config" not in st.secrets:
         st.error("Faltan los 'Secrets'.")
         return
@@ -127,176 +125,83 @@ def load_data_from_sheets():
         url_config = st.secrets["google_sheet_config"]["config_lineas_url"]
         url_plan = st.secrets["google_sheet_config"]["plan_produccion_url"]
 
-        # Lectura robusta
-        df_config = pd.read_csv(url_config, dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8-sig', engine='python')
-        df_plan = pd.read_csv(url_plan, dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8-sig', engine='python')
-
-        # --- DETECCIÓN DE ERROR HTML ---
-        if not df_config.empty and str(df_config.iloc[0,0]).strip().startswith("<"):
-            st.error("🚨 ERROR CRÍTICO: Tus enlaces son PÁGINAS WEB, no CSV.")
-            st.info("Por favor, revisa el paso 1 de la respuesta y actualiza los secretos.")
-            st.stop()
-
-        # Limpieza
-        df_config.columns = df_config.columns.str.strip().str.replace('"', '')
-        df_plan.columns = df_plan.columns.str.strip().str.replace('"', '')
-
-        # Autocorrección linea_id
-        if 'linea_id' not in df_config.columns:
-             for c in df_config.columns:
-                 if 'linea' in c.lower() and 'id' in c.lower():
-                     df_config.rename(columns={c: 'linea_id'}, inplace=True); break
-
-        st.session_state.df_config_raw = df_config
-        st.session_state.df_plan_raw = df_plan
-        st.session_state.lineas_configuradas = []
-
-        if 'turno' not in df_config.columns: df_config['turno'] = '1'
-
-        # CONFIGURACIÓN
-        for index, row in df_config.iterrows():
-            linea_id = str(row.get('linea_id', '')).strip()
-            t_raw = str(row.get('turno', '1')).split('.')[0].strip()
-            turno = t_raw if t_raw else '1'
-            if not linea_id: continue
-
-            prefijo = f"l{linea_id}_t{turno}_"
-            st.session_state.lineas_configuradas.append((linea_id, turno))
-            st.session_state[f"{prefijo}oee"] = safe_get_int(row.get('oee_global'), 85)
-            st.session_state[f"{prefijo}hora_inicio"] = str_to_time(row.get('hora_inicio')) or datetime.time(8, 0)
-            for i in range(1, 4):
-                st.session_state[f"{prefijo}desc_{i}_start"] = str_to_time(row.get(f'desc_{i}_inicio'))
-                st.session_state[f"{prefijo}desc_{i}_end"] = str_to_time(row.get(f'desc_{i}_fin'))
-                st.session_state[f"{prefijo}desc_{i}_skip"] = str_to_bool(row.get(f'desc_{i}_skip', 'FALSE'))
-
-        # PLAN
-        if 'turno' not in df_plan.columns: df_plan['turno'] = '1'
-        if 'hora_entrada_cliente' not in df_plan.columns: df_plan['hora_entrada_cliente'] = ""
-
-        df_plan['hora_validada'] = df_plan['hora_entrada_cliente'].apply(str_to_time)
-
-        for col in ['linea_id', 'turno', 'nombre_cliente', 'nombre_articulo']:
-             if col in df_plan.columns:
-                df_plan[col] = df_plan[col].astype(str).apply(lambda x: x.split('.')[0] if x.replace('.','',1).isdigit() else x).str.strip()
-
-        horas_por_cliente = df_plan.groupby(['linea_id', 'turno', 'nombre_cliente'])['hora_validada'].last()
-        clientes_por_linea_turno = {}
-
-        for index, row in df_plan.iterrows():
-            linea_id = row.get('linea_id'); turno = row.get('turno')
-            if not turno: turno = '1'
-            cliente = row.get('nombre_cliente')
-            if not linea_id or not cliente: continue
-
-            key_lt = f"{linea_id}_{turno}"
-            if key_lt not in clientes_por_linea_turno: clientes_por_linea_turno[key_lt] = {}
-
-            if cliente not in clientes_por_linea_turno[key_lt]:
-                hora_obj = None
-                try:
-                    if (linea_id, turno, cliente) in horas_por_cliente.index:
-                        hora_obj = horas_por_cliente.get((linea_id, turno, cliente))
-                except: pass
-                act_hora = str_to_bool(row.get('act_hora_entrada', 'FALSE'))
-                clientes_por_linea_turno[key_lt][cliente] = {"nombre": cliente, "articulos": [], "hora_entrada": hora_obj, "tiene_hora": (hora_obj is not None) and act_hora}
-
-            nombre_art = str(row.get('nombre_articulo', ''))
-            if nombre_art:
-                oee_linea = st.session_state.get(f"l{linea_id}_t{turno}_oee", 85)
-                oee_art = oee_linea
-                if str_to_bool(row.get('act_oee_articulo', 'FALSE')):
-                    oee_art = safe_get_int(row.get('oee_articulo'), oee_linea)
-
-                art_obj = {"nombre": nombre_art, "cantidad": safe_get_int(row.get('barquetas_pedido'), 0), "velocidad": safe_get_int(row.get('velocidad_estimada'), 800), "oee": oee_art}
-                clientes_por_linea_turno[key_lt][cliente]['articulos'].append(art_obj)
-
-        st.session_state.plan_data = clientes_por_linea_turno
+        # Caché compartida entre sesiones (hash del contenido + TTL) con copia local de respaldo
+        with medir("carga.total"): estado, plan_hash, origen = cargar_datos(url_config, url_plan, forzar=forzar)
+        if origen == 'sin_conexion': st.warning("📴 Sin conexión con la hoja: usando la última copia local guardada.")
+        # `estado` es la caché compartida entre sesiones: cada sesión trabaja con su propia copia
+        if forzar or st.session_state.get('plan_hash') != plan_hash: st.session_state.update(copy.deepcopy(estado))
+        st.session_state.plan_hash = plan_hash
         # st.toast('✅ Datos cargados.', icon="📥") # Toast opcional
 
+    except EnlaceNoCSV:
+        # --- DETECCIÓN DE ERROR HTML ---
+        st.error("🚨 ERROR CRÍTICO: Tus enlaces son PÁGINAS WEB, no CSV.")
+        st.info("Por favor, revisa el paso 1 de la respuesta y actualiza los secretos.")
+        st.stop()
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
 
 # ==========================================
 # 3. MOTOR SIMULACIÓN
 # ==========================================
-def setup_simulation_instance(lid, turno):
-    pref = f"l{lid}_t{turno}_"
-    start_time_obj = st.session_state.get(f"{pref}hora_inicio")
-    if not start_time_obj: return None
-    start_time = time_to_float(start_time_obj)
-
-    breaks = {}; breaks_desc = []
-    for i in range(1, 4):
-        s_obj = st.session_state.get(f"{pref}desc_{i}_start")
-        e_obj = st.session_state.get(f"{pref}desc_{i}_end")
-        skip = st.session_state.get(f"{pref}desc_{i}_skip", True)
-        s = time_to_float(s_obj) if s_obj else 0.0
-        e = time_to_float(e_obj) if e_obj else 0.0
-        breaks[f'start_{i}'] = s; breaks[f'end_{i}'] = e; breaks[f'skip_{i}'] = skip
-        if not skip and s_obj and e_obj: breaks_desc.append(f"{s_obj.strftime('%H:%M')}-{e_obj.strftime('%H:%M')}")
-
-    key_lt = f"{lid}_{turno}"
-    clientes_data = st.session_state.get("plan_data", {}).get(key_lt, {})
-    queue = deque(); total_obj = 0; resumen_tabla = []
-
-    for c_name, c_data in clientes_data.items():
-        h_ent = time_to_float(c_data['hora_entrada']) if c_data['tiene_hora'] else 0.0
-        for art in c_data['articulos']:
-            cant = art['cantidad']
-            if cant > 0:
-                vel_real = art['velocidad'] * (art['oee'] / 100.0)
-                if vel_real <= 0: vel_real = 1.0
-                horas_est = cant / vel_real
-                queue.append({"cliente": c_name, "articulo": art['nombre'], "pendiente": cant, "vel_real": vel_real, "hora_entrada": h_ent})
-                total_obj += cant
-                resumen_tabla.append({"Cliente": c_name, "Artículo": art['nombre'], "Pedido": fmt_num_es(cant), "Vel. Teórica": fmt_num_es(art['velocidad']), "OEE": f"{art['oee']}%", "Vel. Real": fmt_num_es(vel_real), "Horas Est.": fmt_num_es(horas_est) + " h"})
-
-    if total_obj == 0: return None
-    return {"id": lid, "turno": turno, "active": True, "start_time": start_time, "queue": queue, "current_job": None, "end_time": None, "interrupted": False, "producido": 0, "horas_netas": 0.0, "horas_descanso": 0.0, "breaks": breaks, "breaks_desc": ", ".join(breaks_desc), "total_obj": total_obj, "history": [], "resumen_tabla": pd.DataFrame(resumen_tabla)}
-
-def run_sim_tick(sim, current_global_time, step=1.0):
-    if not sim['active']: return 0, 0
-    t_start = max(sim['start_time'], current_global_time)
-    t_end = current_global_time + step
-    if t_start >= t_end: return 0, 0
-
-    day_start, day_end = t_start % 24, t_end % 24
-    if day_end < day_start: day_end += 24
-    descanso = calcular_descanso_en_tramo(day_start, day_end, sim['breaks'])
-    net_duration = max(0, (t_end - t_start) - descanso)
-    produced_in_tick = 0; worked_in_tick = 0.0
-
-    while worked_in_tick < net_duration:
-        if not sim['current_job']:
-            if not sim['queue']: sim['active'] = False; sim['end_time'] = t_start + worked_in_tick + descanso; break
-            next_job = sim['queue'][0]
-            current_abs = t_start + worked_in_tick + descanso
-            if next_job['hora_entrada'] > (current_abs % 24) and current_abs < 24: break
-            sim['current_job'] = sim['queue'].popleft()
-
-        job = sim['current_job']
-        time_needed = job['pendiente'] / job['vel_real']
-        time_step = min(time_needed, net_duration - worked_in_tick)
-        qty = time_step * job['vel_real']
-        job['pendiente'] -= qty; produced_in_tick += qty; worked_in_tick += time_step; sim['producido'] += qty
-        if job['pendiente'] < 0.1: sim['current_job'] = None
-
-    sim['horas_netas'] += worked_in_tick; sim['horas_descanso'] += descanso
-    if produced_in_tick > 0 or sim['active']: sim['history'].append({"Hora": int(t_end), "Prod": produced_in_tick, "Acum": sim['producido']})
-    if sim['active']: sim['end_time'] = t_end
-    return produced_in_tick, descanso
+def orden_optimo_vigente():
+    """Resultado de la secuenciación si sigue siendo válido para el plan y los turnos actuales."""
+    seq = st.session_state.get('secuenciacion')
+    if seq and seq['clave'] == (st.session_state.get('plan_hash'), st.session_state.activar_t2, paso_simulacion()): return seq['resultado']
+    return None
+
+def preparar_simulaciones(orden_optimo=True, incluir_vacias=False):
+    """Simulaciones de las líneas activas y horas de inicio del T2 que cortan al T1.
+
+    Con `orden_optimo` y la casilla de secuenciación marcada, las colas siguen el orden propuesto.
+    Con `incluir_vacias` se añaden también las líneas configuradas sin pedidos.
+    """
+    sims, start_t2_map = simulaciones_desde_estado(st.session_state, st.session_state.activar_t2, incluir_vacias)
+    propuesta = orden_optimo_vigente() if (orden_optimo and st.session_state.get('usar_orden_optimo')) else None
+    if propuesta:
+        for s in sims:
+            r = propuesta.get(f"{s['id']}_{s['turno']}")
+            if r: aplicar_orden(s, r['orden'])
+    return sims, start_t2_map
+
+def tabla_resumen_global(resultado):
+    """Tabla "Resumen Global": una fila por línea/turno y el total de la planta."""
+    *lineas, g = resumen_planta(resultado)
+    resumen_final = [{"Línea/Turno": f"L{f['linea_id']} (T{f['turno']})", "Barquetas Totales": fmt_num_es(f['producido']), "Horas Netas": fmt_num_es(f['horas_netas']),
+                      "Horas Descanso": fmt_num_es(f['horas_descanso']), "Hora Fin": float_to_time_str(f['fin']) + (" (Cortado)" if f['cortada'] else "")} for f in lineas]
+    resumen_final.append({"Línea/Turno": "GLOBAL", "Barquetas Totales": fmt_num_es(g['producido']), "Horas Netas": fmt_num_es(g['horas_netas']), "Horas Descanso": "-", "Hora Fin": float_to_time_str(g['fin']) if g['fin'] else "-"})
+    return pd.DataFrame(resumen_final)
+
+def tabla_resumen_guardada(ejecucion):
+    """Tabla "Resumen Global" de una ejecución del histórico (mismas columnas que `tabla_resumen_global`)."""
+    fmt = lambda v, f=fmt_num_es: "-" if pd.isna(v) else f(v)
+    resumen_final = [{"Línea/Turno": f"L{r.linea} (T{r.turno})", "Barquetas Totales": fmt_num_es(r.producido), "Horas Netas": fmt(r.horas_netas), "Horas Descanso": fmt(r.horas_descanso),
+                      "Hora Fin": fmt(r.fin, float_to_time_str) + (" (Cortado)" if r.cortada else "")} for r in ejecucion['lineas'].itertuples()]
+    meta = ejecucion['meta']
+    resumen_final.append({"Línea/Turno": "GLOBAL", "Barquetas Totales": fmt_num_es(meta['total'] or 0), "Horas Netas": fmt(ejecucion['lineas']['horas_netas'].sum(min_count=1)), "Horas Descanso": "-", "Hora Fin": fmt(meta['fin'], float_to_time_str)})
+    return pd.DataFrame(resumen_final)
 
 # ==========================================
 # 4. INICIALIZACIÓN Y UI
 # ==========================================
 if 'segundos_por_hora_sim' not in st.session_state: st.session_state.segundos_por_hora_sim = 0.25
 if 'activar_t2' not in st.session_state: st.session_state.activar_t2 = False
+if 'fps_animacion' not in st.session_state: st.session_state.fps_animacion = 4
+if 'resolucion_min' not in st.session_state: st.session_state.resolucion_min = 60
+if 'resolucion_graficos_min' not in st.session_state: st.session_state.resolucion_graficos_min = 60
+if 'perfil_activo' not in st.session_state: st.session_state.perfil_activo = False
+if 'perfilador' not in st.session_state: st.session_state.perfilador = Perfilador()
+if 'guardar_historico' not in st.session_state: st.session_state.guardar_historico = True
+
+# Cada ejecución del script se mide desde cero; sin la casilla, los puntos de medida no hacen nada
+st.session_state.perfilador.reiniciar()
+usar(st.session_state.perfilador if st.session_state.perfil_activo else None)
 
 # CARGA INICIAL OBLIGATORIA
 load_data_from_sheets()
 
 st.markdown("<h1 style='text-align: center;'>🏭 Simulador Multi-Turno</h1>", unsafe_allow_html=True)
-tab_cfg, tab_sim = st.tabs(["⚙️ Configuración", "🚀 Simulación"])
+tab_cfg, tab_sim, tab_hor, tab_seq, tab_bal, tab_mc, tab_vivo, tab_hist = st.tabs(["⚙️ Configuración", "🚀 Simulación", "📅 Horizonte", "🧮 Secuenciación", "⚖️ Balanceo", "🎲 Escenarios", "📡 En vivo", "🗂️ Histórico"])
 
 # --- CONFIGURACIÓN ---
 with tab_cfg:
@@ -313,7 +218,7 @@ with tab_cfg:
                 st.text_input(f"Hora Inicio", value=h_ini.strftime('%H:%M'), disabled=True, key=f"{prefijo}ui_h_ini")
                 st.markdown("### ⏱️ Descansos Activos")
                 any_break = False
-                for i in range(1, 4):
+                for i in range(1, n_descansos(st.session_state, prefijo) + 1):
                     if not st.session_state[f"{prefijo}desc_{i}_skip"]:
                         s = st.session_state.get(f"{prefijo}desc_{i}_start")
                         e = st.session_state.get(f"{prefijo}desc_{i}_end")
@@ -321,165 +226,436 @@ with tab_cfg:
                 if not any_break: st.caption("Sin descansos programados.")
             st.markdown("---")
             st.markdown(f"### 🏭 OEE Global: `{st.session_state[f'{prefijo}oee']}%`")
-            st.markdown("### 📋 Plan de Producción")
-            key_lt = f"{linea_id}_{turno}"
-            clientes = st.session_state.get("plan_data", {}).get(key_lt, {})
-            if not clientes: st.warning("⚠️ No hay pedidos cargados para esta línea.")
-            else:
-                for c_name, c_data in clientes.items():
-                    with st.expander(f"👤 **{c_name}**", expanded=True):
-                        if c_data['tiene_hora']: st.success(f"🕒 Hora entrada pedido: {c_data['hora_entrada'].strftime('%H:%M')}")
-                        rows = []
-                        for art in c_data['articulos']:
-                            rows.append({"Artículo": art['nombre'], "Cantidad": fmt_num_es(art['cantidad']), "Velocidad": fmt_num_es(art['velocidad']), "OEE (%)": f"{art['oee']}%"})
-                        render_aggrid(pd.DataFrame(rows), f"grid_cfg_{linea_id}_{turno}_{c_name}")
+            if not st.session_state.get("plan_data", {}).get(f"{linea_id}_{turno}"): st.warning("⚠️ No hay pedidos cargados para esta línea.")
+
+    def tabla_plan(lineas):
+        """Plan de todas las líneas en una sola tabla; la línea y el cliente (con su hora de entrada) son los grupos."""
+        filas = []
+        for lid, turno in lineas:
+            clientes = st.session_state.get("plan_data", {}).get(f"{lid}_{turno}", {})
+            if not clientes: continue
+            total = sum(art['cantidad'] for c_data in clientes.values() for art in c_data['articulos'])
+            grupo_linea = f"🥩 Línea {lid} (T{turno}) · {fmt_num_es(total)} barquetas"
+            for c_name, c_data in clientes.items():
+                grupo_cliente = f"👤 {c_name}" + (f" · 🕒 {c_data['hora_entrada'].strftime('%H:%M')}" if c_data['tiene_hora'] else "")
+                for art in c_data['articulos']:
+                    filas.append({"Línea/Turno": grupo_linea, "Cliente": grupo_cliente, "Artículo": art['nombre'], "Cantidad": fmt_num_es(art['cantidad']), "Velocidad": fmt_num_es(art['velocidad']), "OEE (%)": f"{art['oee']}%"})
+        return pd.DataFrame(filas)
+
+    def dibujar_plan(lineas):
+        """Una única rejilla virtual con el plan; filas y opciones se construyen una vez por versión del plan."""
+        grupos = ["Línea/Turno", "Cliente"]; enterprise = licencia_aggrid() is not None
+        clave = (st.session_state.get('plan_hash'), tuple(lineas), enterprise)
+        grid = st.session_state.get('grid_plan')
+        if not grid or grid['clave'] != clave:
+            with medir("render.tabla_plan"):
+                df = tabla_plan(lineas)
+                grid = st.session_state.grid_plan = {"clave": clave, "df": df, "rejilla": rejilla_agrupada(df, grupos, "Línea / Cliente", enterprise) if not df.empty else None}
+        st.markdown("### 📋 Plan de Producción")
+        render_aggrid_agrupado(grid['df'], grupos, "grid_cfg_plan", rejilla=grid['rejilla'])
 
     st.markdown("### 🎛️ Panel de Control")
-    c1, c2 = st.columns(2)
-    c1.slider("Velocidad Simulación", 0.0, 2.0, key="segundos_por_hora_sim")
-    c2.checkbox("Activar Segundo Turno (T2)", key="activar_t2")
+    c1, c2, c3 = st.columns(3)
+    c1.slider("Velocidad Simulación", 0.0, 2.0, key="segundos_por_hora_sim", help="Segundos por hora simulada. 0 = modo instantáneo: se calcula todo y cada gráfico se dibuja una sola vez.")
+    c2.slider("Fotogramas por segundo", 1, 30, key="fps_animacion", help="Límite de refresco de la animación, independiente del paso de simulación.")
+    c3.checkbox("Activar Segundo Turno (T2)", key="activar_t2")
+    c4, c5, c6 = st.columns(3)
+    c4.selectbox("Resolución de simulación", RESOLUCIONES_MIN, key="resolucion_min", format_func=lambda m: f"{m} min", help="Duración de cada tramo simulado. Con tramos cortos los descansos y pedidos breves no se agrupan en la hora.")
+    c5.selectbox("Resolución de gráficos", RESOLUCIONES_MIN, key="resolucion_graficos_min", format_func=lambda m: f"{m} min", help="Los gráficos agregan la producción en bloques de esta duración (nunca más finos que la simulación).")
+    c6.checkbox("Medir rendimiento", key="perfil_activo", help="Cronometra carga, simulación y dibujo; el detalle aparece en el panel «Rendimiento» al final de la página.")
+    c6.checkbox("Guardar en el histórico", key="guardar_historico", help="Guarda cada simulación terminada para compararla después en la pestaña «Histórico».")
     if st.button("🔄 Recargar datos"):
-        load_data_from_sheets()
+        load_data_from_sheets(forzar=True)
         st.rerun()
     st.markdown("---")
     if 'lineas_configuradas' in st.session_state:
         lineas_ord = sorted(st.session_state.lineas_configuradas, key=lambda x: (x[1], x[0]))
-        for lid, turno in lineas_ord:
-            if turno == '2' and not st.session_state.activar_t2: continue
-            dibujar_config_linea(lid, turno)
+        lineas_ord = [(lid, turno) for lid, turno in lineas_ord if turno == '1' or st.session_state.activar_t2]
+        for lid, turno in lineas_ord: dibujar_config_linea(lid, turno)
+        dibujar_plan(lineas_ord)
     else: st.warning("No se encontraron líneas en la configuración. Revisa el Excel.")
 
 # --- SIMULACIÓN ---
+def maquetar_fotograma(anim):
+    """Huecos del panel de la simulación, uno por elemento, creados en la ejecución completa de la página.
+
+    Quedan fuera del fragmento de la animación: lo que éste escribe en ellos se conserva entre
+    sus ejecuciones, así que cada fotograma sólo reescribe los elementos que han cambiado.
+    """
+    huecos = {"aviso": st.empty(), "metricas": st.empty(), "global_1": st.empty(), "global_2": st.empty()}
+    for turno_n in ['1', '2']:
+        ids = [lid for lid, t in anim['lineas'] if t == turno_n]
+        if not ids: continue
+        huecos[turno_n] = st.empty()
+        for i in range(0, len(ids), 2):
+            for col, lid in zip(st.columns(2), ids[i:i + 2]):
+                with col: huecos[(lid, turno_n, 'estado')] = st.empty(); huecos[(lid, turno_n, 'grafico')] = st.empty()
+    return huecos
+
+def _hueco(huecos, dibujado, clave, firma):
+    """El hueco `clave` si su contenido (`firma`) ha cambiado desde el fotograma anterior; None si no hay que redibujarlo."""
+    if clave in dibujado and dibujado[clave] == firma: return None
+    dibujado[clave] = firma
+    return huecos[clave]
+
+def dibujar_fotograma(anim, k, huecos, dibujado):
+    """Panel de la simulación en el tramo `k` del resultado compartido; sólo se reenvía lo que ha cambiado."""
+    trabajo = anim['trabajo']; resultado = trabajo.resultado; sims = resultado['sims']; res_graf = anim['res_graf']
+    en_tick = lambda serie, turno_n: float(serie[turno_n][k]) if turno_n in serie else 0
+    acc_t1 = en_tick(resultado['acum'], '1'); acc_t2 = en_tick(resultado['acum'], '2')
+    fin_t1_val = en_tick(resultado['fin_turno'], '1'); fin_t2_val = en_tick(resultado['fin_turno'], '2')
+
+    h = _hueco(huecos, dibujado, 'metricas', (fin_t1_val, acc_t1, fin_t2_val, acc_t2))
+    if h:
+        with h.container():
+            k1, k2, k3, k4, k5 = st.columns(5)
+            k1.metric("Fin Turno 1", float_to_time_str(fin_t1_val) if fin_t1_val > 0 else "-"); k2.metric("Total T1", fmt_num_es(acc_t1)); k3.metric("Fin Turno 2", float_to_time_str(fin_t2_val) if fin_t2_val > 0 else "-"); k4.metric("Total T2", fmt_num_es(acc_t2)); k5.metric("Total Global", fmt_num_es(acc_t1 + acc_t2))
+            st.markdown("---")
+
+    start_t2_hour = min(anim['cortes'].values()) if (anim['activar_t2'] and anim['cortes']) else 24
+    with medir("render.series"): df_g1 = serie_turno(resultado, '1', k + 1, res_graf)
+    limit_t1 = start_t2_hour if anim['activar_t2'] else df_g1['Ultima'].iat[-1]
+    df_g1 = df_g1[df_g1['Hora'] <= limit_t1]
+    h = _hueco(huecos, dibujado, 'global_1', (len(df_g1), acc_t1))
+    if h:
+        with h.container():
+            st.markdown("##### Producción Global - Turno 1")
+            if acc_t1 > 0: dibujar_grafico(lambda: grafico_global(df_g1[['Hora', 'Prod', 'Acum']], '#1f77b4', '#ff7f0e', "GLOBAL TURNO 1"), trabajo, ('global', '1', len(df_g1), acc_t1, res_graf, limit_t1))
+    df_g2 = None
+    if anim['activar_t2'] and acc_t2 > 0:
+        with medir("render.series"): df_g2 = serie_turno(resultado, '2', k + 1, res_graf)
+        limit_t2 = df_g2['Ultima'].iat[-1]
+        df_g2 = df_g2[df_g2['Hora'] >= start_t2_hour]; df_g2 = df_g2[df_g2['Hora'] <= limit_t2]
+    h = _hueco(huecos, dibujado, 'global_2', (anim['activar_t2'], None if df_g2 is None else len(df_g2), acc_t2))
+    if h:
+        with h.container():
+            if anim['activar_t2']:
+                st.markdown("##### Producción Global - Turno 2")
+                if df_g2 is not None: dibujar_grafico(lambda: grafico_global(df_g2[['Hora', 'Prod', 'Acum']], '#2ca02c', '#d62728', "GLOBAL TURNO 2"), trabajo, ('global', '2', len(df_g2), acc_t2, res_graf, start_t2_hour))
+            st.markdown("---")
+
+    for turno_n in ['1', '2']:
+        h = _hueco(huecos, dibujado, turno_n, True) if turno_n in huecos else None
+        if h: h.markdown(f"#### {'☀️' if turno_n=='1' else '🌙'} Turno {turno_n}")
+    for s in sims:
+        netas, descanso, producido, n_hist, _, _, _ = estado_en_tick(s, k)
+        h = _hueco(huecos, dibujado, (s['id'], s['turno'], 'estado'), (netas, descanso, producido))
+        if h:
+            with h.container():
+                st.markdown(f"**Línea {s['id']}**")
+                c1, c2, c3 = st.columns([1, 1, 2])
+                c1.metric("Neto", f"{netas:.1f}h"); c2.metric("Desc", f"{descanso:.1f}h"); c3.write(f"**{fmt_num_es(producido)} / {fmt_num_es(s['total_obj'])}**")
+        h = _hueco(huecos, dibujado, (s['id'], s['turno'], 'grafico'), n_hist)
+        if h and n_hist:
+            # Mismo número de tramos de historia = mismo gráfico: se serializa una vez por trabajo
+            with h.container(): dibujar_grafico(lambda: grafico_linea(historial_df(s, n_hist, res_graf)), trabajo, ('linea', s['id'], s['turno'], n_hist, res_graf))
+
+def vista_simulacion(huecos, dibujado):
+    """Consulta el trabajo compartido y dibuja el fotograma que toca según el tiempo transcurrido."""
+    anim = st.session_state.sim_anim; trabajo = anim['trabajo']
+    if not trabajo.esperar(ESPERA_CORTA_SEG):
+        h = _hueco(huecos, dibujado, 'aviso', trabajo.progreso)
+        if h: h.progress(trabajo.progreso, text=f"Simulando... {trabajo.progreso:.0%}" + (" (compartida con otra sesión)" if not anim['nuevo'] else ""))
+        return
+    if trabajo.error:
+        h = _hueco(huecos, dibujado, 'aviso', 'error')
+        if h: h.error(f"Error en la simulación: {trabajo.error}")
+        return
+    h = _hueco(huecos, dibujado, 'aviso', None)
+    if h: h.empty()
+    n_ticks = len(trabajo.resultado['t'])
+    if anim['inicio'] is None: anim['inicio'] = time.perf_counter()
+    if anim['seg_tramo'] <= 0: k = n_ticks - 1
+    else: k = min(n_ticks - 1, int((time.perf_counter() - anim['inicio']) / anim['seg_tramo']))
+    if anim['guardar'] and 'ejecucion' not in anim:
+        # Una vez por trabajo, aunque lo compartan varias sesiones
+        try: anim['ejecucion'] = trabajo.memo(('historico',), lambda: guardar_simulacion(trabajo.resultado, anim['plan_hash'], trabajo.clave, anim['activar_t2']))
+        except sqlite3.Error as e: anim['ejecucion'] = None; st.warning(f"No se pudo guardar en el histórico: {e}")
+    if k == n_ticks - 1 and not anim['fin']:
+        # Fin de la animación: la ejecución completa deja de consultar y dibuja el último fotograma (una sola vez) y el resumen
+        anim['fin'] = True
+        st.rerun()
+    if k >= 0:
+        contar("animacion.fotogramas")
+        dibujar_fotograma(anim, k, huecos, dibujado)
+
+def resumen_simulacion(resultado):
+    sims = resultado['sims']
+    st.success("✅ Simulación Completada")
+    st.markdown("---")
+    st.markdown("### 📈 Resumen Global")
+    render_aggrid(tabla_resumen_global(resultado), "grid_resumen_final", height=250)
+
+    for s in sims:
+        st.markdown(f"#### 📄 Detalle Línea {s['id']} - Turno {s['turno']}")
+        fin_str = float_to_time_str(s['end_time'] if s['end_time'] else s['start_time'] + s['horas_netas'] + s['horas_descanso'])
+        st.info(f"Finalizada a las {fin_str} ({s['horas_netas']:.2f}h netas)")
+        if not s['resumen_tabla'].empty: render_aggrid(s['resumen_tabla'], f"grid_det_{s['id']}_{s['turno']}", height=200)
+
 with tab_sim:
     if st.button("▶️ EJECUTAR SIMULACIÓN", type="primary"):
-        sims = []; start_t2_map = {}
-        if 'lineas_configuradas' in st.session_state:
-            if st.session_state.activar_t2:
-                for lid, turno in st.session_state.lineas_configuradas:
-                    if turno == '2':
-                        pref = f"l{lid}_t{turno}_"
-                        t_obj = st.session_state.get(f"{pref}hora_inicio")
-                        if t_obj: start_t2_map[lid] = time_to_float(t_obj)
-            for lid, turno in st.session_state.lineas_configuradas:
-                if turno == '2' and not st.session_state.activar_t2: continue
-                s = setup_simulation_instance(lid, turno)
-                if s: sims.append(s)
+        sims, start_t2_map = preparar_simulaciones()
 
         if not sims:
             st.error("No hay pedidos cargados.")
+            st.session_state.sim_anim = None
         else:
-            global_start = min(s['start_time'] for s in sims)
-            curr_t = global_start
-            ph_global_metrics = st.empty()
-            st.markdown("---")
-            st.markdown("##### Producción Global - Turno 1")
-            ph_global_chart_t1 = st.empty()
-            ph_global_chart_t2 = None
-            if st.session_state.activar_t2:
-                st.markdown("##### Producción Global - Turno 2")
-                ph_global_chart_t2 = st.empty()
-            st.markdown("---")
-            ph_lines = {}
-            for turno_n in ['1', '2']:
-                sims_t = [s for s in sims if s['turno'] == turno_n]
-                if sims_t:
-                    st.markdown(f"#### {'☀️' if turno_n=='1' else '🌙'} Turno {turno_n}")
-                    for i in range(0, len(sims_t), 2):
-                        cols = st.columns(2)
-                        with cols[0]:
-                            s = sims_t[i]
-                            st.markdown(f"**Línea {s['id']}**")
-                            ph_lines[f"{s['id']}_{s['turno']}"] = st.empty()
-                        if i + 1 < len(sims_t):
-                            with cols[1]:
-                                s = sims_t[i+1]
-                                st.markdown(f"**Línea {s['id']}**")
-                                ph_lines[f"{s['id']}_{s['turno']}"] = st.empty()
-
-            global_hist_t1 = []; global_hist_t2 = []; running = True; acc_t1 = 0; acc_t2 = 0
-            last_active_hour_t1 = global_start; last_active_hour_t2 = global_start
-            start_t2_hour = 24
-            if st.session_state.activar_t2 and start_t2_map:
-                 if start_t2_map: start_t2_hour = min(start_t2_map.values())
-
-            while running:
-                running = False; curr_t += 1.0; prod_tick_t1 = 0; prod_tick_t2 = 0; fin_t1_val = 0; fin_t2_val = 0; t1_active_now = False; t2_active_now = False
-                for s in sims:
-                    if s['turno'] == '1' and s['active'] and s['id'] in start_t2_map:
-                         if curr_t > start_t2_map[s['id']]: s['active'] = False; s['interrupted'] = True; s['end_time'] = start_t2_map[s['id']]
-                    p, d = run_sim_tick(s, curr_t - 1.0)
-                    if s['turno'] == '1': prod_tick_t1 += p;
-                    else: prod_tick_t2 += p;
-                    if s['active']:
-                        running = True
-                        if s['turno'] == '1': t1_active_now = True
-                        else: t2_active_now = True
-                    current_end = s['end_time'] if s['end_time'] else (s['start_time'] + s['horas_netas'] + s['horas_descanso'])
-                    if s['turno'] == '1' and current_end > fin_t1_val: fin_t1_val = current_end
-                    if s['turno'] == '2' and current_end > fin_t2_val: fin_t2_val = current_end
-
-                    ph = ph_lines.get(f"{s['id']}_{s['turno']}")
-                    if ph:
-                        with ph.container():
-                            c1, c2, c3 = st.columns([1, 1, 2])
-                            c1.metric("Neto", f"{s['horas_netas']:.1f}h"); c2.metric("Desc", f"{s['horas_descanso']:.1f}h"); c3.write(f"**{fmt_num_es(s['producido'])} / {fmt_num_es(s['total_obj'])}**")
-                            if s['history']:
-                                df_h = pd.DataFrame(s['history'])
-                                base = alt.Chart(df_h).encode(x=alt.X('Hora:O', axis=alt.Axis(labels=True, title='Hora')))
-                                bar = base.mark_bar(color='#29b5e8').encode(y=alt.Y('Prod:Q', axis=alt.Axis(title='Prod/h', orient='left')), tooltip=['Hora', 'Prod'])
-                                txt_bar = bar.mark_text(dy=-5, color='black').encode(text=alt.Text('Prod:Q', format=',.0f'))
-                                line = base.mark_line(color='#ff8c00').encode(y=alt.Y('Acum:Q', axis=alt.Axis(title='Acum', orient='right')))
-                                txt_line = line.mark_text(dy=-10, color='#e6550d').encode(text=alt.Text('Acum:Q', format=',.0f'))
-                                st.altair_chart((bar + txt_bar + line + txt_line).resolve_scale(y='independent').properties(height=250), use_container_width=True)
-
-                acc_t1 += prod_tick_t1; acc_t2 += prod_tick_t2
-                if t1_active_now or prod_tick_t1 > 0: last_active_hour_t1 = curr_t
-                if t2_active_now or prod_tick_t2 > 0: last_active_hour_t2 = curr_t
-                global_hist_t1.append({"Hora": int(curr_t), "Prod": prod_tick_t1, "Acum": acc_t1})
-                global_hist_t2.append({"Hora": int(curr_t), "Prod": prod_tick_t2, "Acum": acc_t2})
-
-                with ph_global_metrics.container():
-                    k1, k2, k3, k4, k5 = st.columns(5)
-                    k1.metric("Fin Turno 1", float_to_time_str(fin_t1_val) if fin_t1_val > 0 else "-"); k2.metric("Total T1", fmt_num_es(acc_t1)); k3.metric("Fin Turno 2", float_to_time_str(fin_t2_val) if fin_t2_val > 0 else "-"); k4.metric("Total T2", fmt_num_es(acc_t2)); k5.metric("Total Global", fmt_num_es(acc_t1 + acc_t2))
-
-                with ph_global_chart_t1.container():
-                    if acc_t1 > 0:
-                        df_g1 = pd.DataFrame(global_hist_t1); limit_t1 = start_t2_hour if st.session_state.activar_t2 else last_active_hour_t1
-                        df_g1 = df_g1[df_g1['Hora'] <= limit_t1]
-                        base = alt.Chart(df_g1).encode(x=alt.X('Hora:O', axis=alt.Axis(labels=True)))
-                        bar = base.mark_bar(color='#1f77b4').encode(y=alt.Y('Prod:Q', axis=alt.Axis(title='Prod/h', orient='left')))
-                        txt_b = bar.mark_text(dy=-5).encode(text=alt.Text('Prod:Q', format='.0f'))
-                        line = base.mark_line(color='#ff7f0e').encode(y=alt.Y('Acum:Q', axis=alt.Axis(title='Total', orient='right')))
-                        txt_l = line.mark_text(dy=-10, color='#ff7f0e').encode(text=alt.Text('Acum:Q', format='.0f'))
-                        st.altair_chart((bar + txt_b + line + txt_l).resolve_scale(y='independent').properties(height=250, title="GLOBAL TURNO 1"), use_container_width=True)
-
-                if ph_global_chart_t2 and acc_t2 > 0:
-                    with ph_global_chart_t2.container():
-                        df_g2 = pd.DataFrame(global_hist_t2); df_g2 = df_g2[df_g2['Hora'] >= start_t2_hour]; df_g2 = df_g2[df_g2['Hora'] <= last_active_hour_t2]
-                        base = alt.Chart(df_g2).encode(x=alt.X('Hora:O', axis=alt.Axis(labels=True)))
-                        bar = base.mark_bar(color='#2ca02c').encode(y=alt.Y('Prod:Q', axis=alt.Axis(title='Prod/h', orient='left')))
-                        txt_b = bar.mark_text(dy=-5).encode(text=alt.Text('Prod:Q', format='.0f'))
-                        line = base.mark_line(color='#d62728').encode(y=alt.Y('Acum:Q', axis=alt.Axis(title='Total', orient='right')))
-                        txt_l = line.mark_text(dy=-10, color='#d62728').encode(text=alt.Text('Acum:Q', format='.0f'))
-                        st.altair_chart((bar + txt_b + line + txt_l).resolve_scale(y='independent').properties(height=250, title="GLOBAL TURNO 2"), use_container_width=True)
-
-                time.sleep(st.session_state.segundos_por_hora_sim)
-                if curr_t > global_start + 48: break
-
-            st.success("✅ Simulación Completada")
-            st.markdown("---")
-            st.markdown("### 📈 Resumen Global")
-            resumen_final = []; total_neto_planta = 0
-            for s in sims:
-                fin = s['end_time'] if s['end_time'] else (s['start_time'] + s['horas_netas'] + s['horas_descanso'])
-                total_neto_planta += s['horas_netas']; nota = " (Cortado)" if s.get('interrupted') else ""
-                resumen_final.append({"Línea/Turno": f"L{s['id']} (T{s['turno']})", "Barquetas Totales": fmt_num_es(s['producido']), "Horas Netas": fmt_num_es(s['horas_netas']), "Horas Descanso": fmt_num_es(s['horas_descanso']), "Hora Fin": float_to_time_str(fin) + nota})
-
-            resumen_final.append({"Línea/Turno": "GLOBAL", "Barquetas Totales": fmt_num_es(acc_t1 + acc_t2), "Horas Netas": fmt_num_es(total_neto_planta), "Horas Descanso": "-", "Hora Fin": float_to_time_str(curr_t)})
-            render_aggrid(pd.DataFrame(resumen_final), "grid_resumen_final", height=250)
-
-            for s in sims:
-                st.markdown(f"#### 📄 Detalle Línea {s['id']} - Turno {s['turno']}")
-                fin_str = float_to_time_str(s['end_time'] if s['end_time'] else s['start_time'] + s['horas_netas'] + s['horas_descanso'])
-                st.info(f"Finalizada a las {fin_str} ({s['horas_netas']:.2f}h netas)")
-                if not s['resumen_tabla'].empty: render_aggrid(s['resumen_tabla'], f"grid_det_{s['id']}_{s['turno']}", height=200)
+            # El motor calcula la planta completa en segundo plano; una simulación idéntica
+            # (mismas líneas, colas, cortes y resolución) pedida por otra sesión se reutiliza
+            paso = paso_simulacion()
+            trabajo, nuevo = lanzar(firma_planta(sims, start_t2_map, HORIZONTE_HORAS, paso), simular_planta, sims, start_t2_map, HORIZONTE_HORAS, paso)
+            if not nuevo: contar("simulacion.reutilizada")
+            st.session_state.sim_anim = {"trabajo": trabajo, "nuevo": nuevo, "inicio": None, "fin": False, "cortes": start_t2_map, "lineas": [(s['id'], s['turno']) for s in sims],
+                                         "activar_t2": st.session_state.activar_t2, "seg_tramo": st.session_state.segundos_por_hora_sim * paso,
+                                         "res_graf": max(paso, st.session_state.resolucion_graficos_min / 60.0),
+                                         "guardar": st.session_state.guardar_historico, "plan_hash": st.session_state.get('plan_hash')}
+
+    anim = st.session_state.get('sim_anim')
+    if anim:
+        # Mientras dura la animación sólo se re-ejecuta este fragmento; el resto de la página sigue respondiendo
+        st.fragment(vista_simulacion, run_every=None if anim['fin'] else 1.0 / max(1, st.session_state.fps_animacion))(maquetar_fotograma(anim), {})
+        if anim['fin'] and anim['trabajo'].hecho() and not anim['trabajo'].error: resumen_simulacion(anim['trabajo'].resultado)
+
+# --- HORIZONTE DE VARIOS DÍAS ---
+with tab_hor:
+    st.markdown("### 📅 Planificación de varios días")
+    st.caption("Encadena todos los turnos configurados de cada línea, sin límite de T1/T2 ni de 48 h. La columna opcional `dia` (1, 2, ...) sitúa cada turno en el calendario y `horas_turno` fija su duración; sin ella, un turno dura hasta que empieza el siguiente de la línea.")
+    o1, o2 = st.columns(2)
+    arrastrar = o1.checkbox("Pasar lo pendiente al siguiente turno", value=True, key="hor_arrastrar", help="Sin la casilla, lo que no se termina queda cortado como en la simulación T1/T2.")
+    holgura = o2.number_input("Horas tras el último día", 0, 168, 24, key="hor_holgura", help="Margen para que el último turno de cada línea termine su cola.")
+    clave_hor = (st.session_state.get('plan_hash'), arrastrar, holgura, paso_simulacion())
+    if st.button("📅 Planificar horizonte"):
+        with st.spinner("Simulando el horizonte..."), medir("horizonte"):
+            st.session_state.horizonte = {"clave": clave_hor, "resultado": planificar_horizonte(st.session_state, paso_simulacion(), arrastrar, float(holgura))}
+
+    hor = st.session_state.get('horizonte')
+    if hor and hor['clave'] != clave_hor: st.info("El plan o los ajustes han cambiado desde la última planificación: vuelve a planificar.")
+    elif hor and hor['resultado']['turnos'].empty: st.error("No hay turnos configurados.")
+    elif hor:
+        res = hor['resultado']; df_t = res['turnos']
+        fin_hor = df_t['fin'].max()
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Objetivo", fmt_num_es(df_t['objetivo'].sum())); k2.metric("Producido", fmt_num_es(round(df_t['producido'].sum())))
+        k3.metric("Sin terminar", fmt_num_es(round(df_t['pendiente'].sum()))); k4.metric("Fin", "-" if pd.isna(fin_hor) else hora_dia(fin_hor))
+        st.markdown("##### Por día y turno")
+        render_aggrid(resumen_turnos(res), "grid_hor_turnos", height=300)
+        st.markdown("##### Producción global")
+        df_hg = serie_horizonte(res, max(res['paso'], st.session_state.resolucion_graficos_min / 60.0))
+        if len(df_hg): dibujar_grafico(lambda: grafico_global(df_hg, '#1f77b4', '#ff7f0e', "GLOBAL HORIZONTE"))
+        st.markdown("##### Por línea")
+        df_hl = tabla_lineas(res)
+        render_aggrid_agrupado(df_hl, ["Día / Turno"], "grid_hor_lineas")
+
+# --- SECUENCIACIÓN ---
+with tab_seq:
+    st.markdown("### 🧮 Orden de pedidos por línea")
+    st.caption("Reordena la cola de cada línea para terminar antes, respetando la hora de entrada de cada cliente, los descansos y el corte por el Turno 2.")
+    if st.button("🧮 Optimizar orden"):
+        sims, start_t2_map = preparar_simulaciones(orden_optimo=False)
+        if not sims:
+            st.error("No hay pedidos cargados.")
+        else:
+            with st.spinner("Buscando el mejor orden..."), medir("secuenciacion"):
+                st.session_state.secuenciacion = {"clave": (st.session_state.get('plan_hash'), st.session_state.activar_t2, paso_simulacion()), "resultado": optimizar_planta(sims, cortes=start_t2_map, paso=paso_simulacion())}
+
+    propuesta = orden_optimo_vigente()
+    if propuesta:
+        st.checkbox("Usar el orden propuesto en Simulación y Escenarios", key="usar_orden_optimo")
+        sims, _ = preparar_simulaciones(orden_optimo=False)
+        fmt_fin = lambda r: float_to_time_str(r['fin']) if r['terminado'] else "Sin terminar"
+        filas = []
+        for s in sims:
+            r = propuesta.get(f"{s['id']}_{s['turno']}")
+            if not r: continue
+            filas.append({"Línea/Turno": f"L{s['id']} (T{s['turno']})", "Fin Actual": fmt_fin(r['actual']), "Fin Propuesto": fmt_fin(r['propuesta']),
+                          "Espera Actual": fmt_num_es(round(r['actual']['espera'], 2)) + " h", "Espera Propuesta": fmt_num_es(round(r['propuesta']['espera'], 2)) + " h",
+                          "Barquetas Actual": fmt_num_es(round(r['actual']['producido'])), "Barquetas Propuesta": fmt_num_es(round(r['propuesta']['producido'])), "Método": r['metodo']})
+        render_aggrid(pd.DataFrame(filas), "grid_seq_resumen", height=250)
+        for s in sims:
+            r = propuesta.get(f"{s['id']}_{s['turno']}")
+            if not r: continue
+            cambia = r['orden'] != sorted(r['orden'])
+            with st.expander(f"📋 Línea {s['id']} - Turno {s['turno']}" + ("" if cambia else " (sin cambios)"), expanded=False):
+                render_aggrid(tabla_comparativa(s, r), f"grid_seq_{s['id']}_{s['turno']}", height=250)
+    elif st.session_state.get('secuenciacion'):
+        st.info("El plan o los turnos han cambiado desde la última optimización: vuelve a optimizar.")
+
+# --- BALANCEO ENTRE LÍNEAS ---
+with tab_bal:
+    st.markdown("### ⚖️ Reparto de carga entre líneas")
+    st.caption("Propone mover o dividir artículos entre líneas del mismo turno para adelantar la hora de fin de la planta. La columna opcional `lineas_permitidas` del plan (p.ej. `1;3`) limita a qué líneas puede ir cada artículo.")
+    b1, b2 = st.columns(2)
+    dividir = b1.checkbox("Permitir dividir pedidos", value=True)
+    lote_min = b2.number_input("Lote mínimo al dividir (barquetas)", 1, 100000, 500, step=100)
+    if st.button("⚖️ Proponer reparto"):
+        sims, start_t2_map = preparar_simulaciones(orden_optimo=False, incluir_vacias=True)
+        if not any(s['total_obj'] > 0 for s in sims):
+            st.error("No hay pedidos cargados.")
+        else:
+            oee_lineas = {f"{lid}_{turno}": st.session_state.get(f"l{lid}_t{turno}_oee") for lid, turno in st.session_state.lineas_configuradas}
+            with st.spinner("Repartiendo carga..."), medir("balanceo"):
+                res = balancear_planta(sims, oee_lineas, cortes=start_t2_map, dividir=dividir, lote_min=int(lote_min), paso=paso_simulacion())
+            if res['movimientos']:
+                st.markdown("##### Movimientos propuestos")
+                nombre = lambda k: "L{} (T{})".format(*k.split('_'))
+                render_aggrid(pd.DataFrame([{"Cliente": mv['cliente'], "Artículo": mv['articulo'], "Desde": nombre(mv['desde']), "Hacia": nombre(mv['hacia']), "Barquetas": fmt_num_es(mv['cantidad']) + ("" if mv['entero'] else " (parte)")} for mv in res['movimientos']]), "grid_bal_mov", height=250)
+            else: st.info("No se encuentra un reparto que adelante la hora de fin.")
+            c_antes, c_despues = st.columns(2)
+            with c_antes:
+                st.markdown("##### 📈 Resumen Global - Actual")
+                render_aggrid(tabla_resumen_global(res['antes']), "grid_bal_antes", height=250)
+            with c_despues:
+                st.markdown("##### 📈 Resumen Global - Propuesto")
+                render_aggrid(tabla_resumen_global(res['despues']), "grid_bal_despues", height=250)
+
+# --- ESCENARIOS (MONTE CARLO) ---
+with tab_mc:
+    st.markdown("### 🎲 Incertidumbre de OEE y velocidad")
+    m1, m2, m3 = st.columns(3)
+    n_esc = m1.number_input("Escenarios", 100, 50000, 2000, step=500)
+    desv_oee = m2.slider("Desviación OEE (puntos)", 0.0, 20.0, 5.0)
+    desv_vel = m3.slider("Desviación velocidad (%)", 0.0, 30.0, 5.0)
+    m4, m5, m6 = st.columns(3)
+    nivel = m4.selectbox("Variación", ["Por línea", "Por artículo"])
+    paradas_h = m5.number_input("Paradas aleatorias por hora", 0.0, 10.0, 0.0, step=0.1)
+    min_parada = m6.number_input("Minutos por parada", 1, 240, 10)
+    if st.button("🎲 Ejecutar barrido"):
+        sims, start_t2_map = preparar_simulaciones()
+        if not sims:
+            st.error("No hay pedidos cargados.")
+        else:
+            with st.spinner("Simulando escenarios..."), medir("escenarios"):
+                res = barrido_montecarlo(sims, int(n_esc), oee={"dist": "normal", "desv": desv_oee}, velocidad={"dist": "normal", "desv": desv_vel / 100.0},
+                                         paradas={"por_hora": paradas_h, "minutos": min_parada} if paradas_h > 0 else None,
+                                         nivel='linea' if nivel == "Por línea" else 'articulo', cortes=start_t2_map, paso=paso_simulacion(), pool=pool_escenarios())
+            fmt_hora = lambda v: "-" if pd.isna(v) else float_to_time_str(v)
+            st.markdown(f"##### Fin y producción por turno ({fmt_num_es(res['escenarios'])} escenarios)")
+            df_t = res['turnos'].copy()
+            for p in PERCENTILES: df_t[f"Fin P{p}"] = df_t[f"Fin P{p}"].map(fmt_hora); df_t[f"Total P{p}"] = df_t[f"Total P{p}"].round().map(fmt_num_es)
+            render_aggrid(df_t, "grid_mc_turnos", height=150)
+            st.markdown("##### Por línea")
+            df_l = res['lineas'].drop(columns=['turno'])
+            for p in PERCENTILES: df_l[f"Fin P{p}"] = df_l[f"Fin P{p}"].map(fmt_hora); df_l[f"Barquetas P{p}"] = df_l[f"Barquetas P{p}"].round().map(fmt_num_es)
+            for c in ["% Cortado", "% Sin terminar"]: df_l[c] = df_l[c].round(1).map(fmt_num_es)
+            render_aggrid(df_l, "grid_mc_lineas", height=300)
+
+# --- EN VIVO ---
+def vista_en_vivo():
+    """Lee el feed y re-prevé sólo las líneas cuyos contadores han cambiado."""
+    vivo = st.session_state.vivo; prevision = vivo['prevision']
+    with medir("vivo.lectura"):
+        try: registros = vivo['lector'].leer(); vivo['error'] = None
+        except OSError as e: registros = []; vivo['error'] = str(e)
+    recalculadas = prevision.actualizar(registros)
+    if vivo['error']: st.warning(f"No se pudo leer el feed: {vivo['error']}")
+
+    fmt_fin = lambda f: ("-" if f[0] is None else float_to_time_str(f[0])) + (" (+ sin terminar)" if f[1] else "")
+    real_t1, pend_t1 = prevision.totales('1'); real_t2, pend_t2 = prevision.totales('2')
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("Fin Turno 1", fmt_fin(prevision.fin_turno('1'))); k2.metric("Real T1", fmt_num_es(real_t1), f"-{fmt_num_es(round(pend_t1))} pend.", delta_color="off")
+    k3.metric("Fin Turno 2", fmt_fin(prevision.fin_turno('2'))); k4.metric("Real T2", fmt_num_es(real_t2), f"-{fmt_num_es(round(pend_t2))} pend.", delta_color="off")
+    k5.metric("Hora del feed", float_to_time_str(prevision.ahora))
+    st.caption(f"Lectura {prevision.lecturas} · {len(registros)} registros nuevos · {len(recalculadas)} de {len(prevision.sims)} líneas recalculadas")
+    render_aggrid(prevision.tabla(recalculadas), "grid_vivo", height=300)
+
+with tab_vivo:
+    st.markdown("### 📡 Re-previsión con contadores reales")
+    st.caption("Lee lo producido por línea y artículo (acumulado) y vuelve a simular sólo lo que queda de la cola, desde la hora del último dato y con el calendario restante.")
+    v1, v2, v3 = st.columns(3)
+    fuente = v1.radio("Fuente", ["Archivo (CSV / JSON)", "Socket UDP"], key="vivo_fuente")
+    if fuente == "Socket UDP": v2.number_input("Puerto UDP", 1024, 65535, 47000, key="vivo_puerto", help="Datagramas con un registro JSON por línea.")
+    else: v2.text_input("Ruta del archivo", key="vivo_ruta", help="CSV con cabecera o JSON Lines que otro proceso va ampliando, o JSON que se reescribe.")
+    v3.slider("Refresco (s)", 1, 60, 5, key="vivo_refresco")
+    st.caption("Columnas: `linea_id`, `turno`, `nombre_cliente` (opcional), `nombre_articulo`, `producido`, `hora` (HH:MM).")
+    b1, b2, b3 = st.columns(3)
+    if b1.button("📡 Iniciar seguimiento"):
+        sims, start_t2_map = preparar_simulaciones()
+        if st.session_state.get('vivo'): st.session_state.vivo['lector'].cerrar()
+        st.session_state.vivo = None
+        if not sims: st.error("No hay pedidos cargados.")
+        elif fuente != "Socket UDP" and not st.session_state.get('vivo_ruta'): st.error("Indica la ruta del archivo.")
+        else:
+            try:
+                lector = LectorSocket(int(st.session_state.vivo_puerto)) if fuente == "Socket UDP" else LectorArchivo(st.session_state.vivo_ruta)
+                st.session_state.vivo = {"prevision": PrevisionEnVivo(sims, start_t2_map, paso_simulacion()), "lector": lector, "error": None}
+            except OSError as e: st.error(f"No se pudo abrir el feed: {e}")
+    if b2.button("⏹️ Detener") and st.session_state.get('vivo'):
+        st.session_state.vivo['lector'].cerrar(); st.session_state.vivo = None
+    if b3.button("💾 Guardar previsión", help="Guarda lo producido y la previsión actual en el histórico, para compararla con el plan.") and st.session_state.get('vivo'):
+        try:
+            eid = guardar_prevision(st.session_state.vivo['prevision'], st.session_state.get('plan_hash'), st.session_state.activar_t2)
+            st.success(f"Previsión guardada como ejecución #{eid}.")
+        except sqlite3.Error as e: st.error(f"No se pudo guardar en el histórico: {e}")
+
+    if st.session_state.get('vivo'):
+        st.fragment(vista_en_vivo, run_every=st.session_state.vivo_refresco)()
+
+# --- HISTÓRICO ---
+def nombre_ejecucion(fila):
+    return f"#{fila['id']} · {fila['fecha']:%d/%m %H:%M} · {TIPOS.get(fila['tipo'], fila['tipo'])} · {fmt_num_es(round(fila['total'] or 0))}"
+
+def vista_comparacion(ea, eb, nombre_a, nombre_b):
+    """Comparación de dos ejecuciones guardadas, línea a línea y en el acumulado global."""
+    fmt_fin = lambda v: "-" if pd.isna(v) else float_to_time_str(v)
+    fmt_dif = lambda v: "-" if pd.isna(v) else ("+" if v > 0 else "") + fmt_num_es(round(v))
+    filas = []
+    for r in comparar_ejecuciones(ea, eb).itertuples():
+        filas.append({"Línea/Turno": f"L{r.linea} (T{r.turno})", "Barquetas A": fmt_num_es(r.producido_a) if pd.notna(r.producido_a) else "-", "Barquetas B": fmt_num_es(r.producido_b) if pd.notna(r.producido_b) else "-",
+                      "Δ Barquetas": fmt_dif(r.dif_producido), "Fin A": fmt_fin(r.fin_a), "Fin B": fmt_fin(r.fin_b), "Δ Fin (min)": fmt_dif(r.dif_fin_min),
+                      "Estado A": ESTADOS.get(r.estado_a, "-"), "Estado B": ESTADOS.get(r.estado_b, "-")})
+    render_aggrid(pd.DataFrame(filas), "grid_hist_comparacion", height=300)
+
+    for turno in sorted({t for l, t in list(ea['series']) + list(eb['series']) if l == GLOBAL}):
+        partes = [ej['series'][(GLOBAL, turno)][['Hora', 'Acum']].assign(**{"Ejecución": nombre}) for ej, nombre in ((ea, nombre_a), (eb, nombre_b)) if (GLOBAL, turno) in ej['series']]
+        dibujar_grafico(lambda: grafico_comparacion(pd.concat(partes, ignore_index=True), f"ACUMULADO TURNO {turno}"))
+
+    c_a, c_b = st.columns(2)
+    with c_a:
+        st.markdown("##### 📈 Resumen Global - A")
+        render_aggrid(tabla_resumen_guardada(ea), "grid_hist_a", height=250)
+    with c_b:
+        st.markdown("##### 📈 Resumen Global - B")
+        render_aggrid(tabla_resumen_guardada(eb), "grid_hist_b", height=250)
+
+with tab_hist:
+    st.markdown("### 🗂️ Histórico de ejecuciones")
+    st.caption("Simulaciones terminadas y previsiones del modo en vivo guardadas. Compara dos ejecuciones cualesquiera (p.ej. plan frente a real) sin volver a simular.")
+    hoy = datetime.date.today()
+    h1, h2, h3 = st.columns(3)
+    desde = h1.date_input("Desde", hoy - datetime.timedelta(days=14), key="hist_desde")
+    hasta = h2.date_input("Hasta", hoy, key="hist_hasta")
+    tipo = h3.selectbox("Tipo", ["todos"] + list(TIPOS), format_func=lambda t: TIPOS.get(t, "Todos"), key="hist_tipo")
+    try: df_ej = listar_ejecuciones(desde, hasta + datetime.timedelta(days=1), None if tipo == "todos" else tipo)
+    except sqlite3.Error as e: df_ej = None; st.error(f"No se pudo leer el histórico: {e}")
+
+    if df_ej is not None and df_ej.empty: st.info("No hay ejecuciones guardadas en esas fechas.")
+    elif df_ej is not None:
+        if len(df_ej) > 1:
+            df_e = pd.DataFrame({"Fecha": df_ej['fecha'], "Total": df_ej['total'], "Tipo": df_ej['tipo'].map(lambda t: TIPOS.get(t, t))})
+            dibujar_grafico(lambda: grafico_evolucion(df_e))
+        render_aggrid(pd.DataFrame({"Id": df_ej['id'], "Fecha": df_ej['fecha'].map(lambda f: f"{f:%d/%m/%Y %H:%M}"), "Tipo": df_ej['tipo'].map(lambda t: TIPOS.get(t, t)),
+                                    "Líneas": df_ej['lineas'], "Barquetas": df_ej['total'].fillna(0).round().map(fmt_num_es), "Hora Fin": df_ej['fin'].map(lambda v: "-" if pd.isna(v) else float_to_time_str(v)),
+                                    "T2": df_ej['activar_t2'].map(lambda v: "Sí" if v else "No"), "Plan": df_ej['plan_hash'].fillna("").str[:8]}), "grid_hist_ejecuciones", height=250)
+        nombres = {f['id']: nombre_ejecucion(f) for f in df_ej.to_dict('records')}
+        s1, s2 = st.columns(2)
+        id_a = s1.selectbox("Ejecución A", list(nombres), index=min(1, len(nombres) - 1), format_func=nombres.get, key="hist_a")
+        id_b = s2.selectbox("Ejecución B", list(nombres), index=0, format_func=nombres.get, key="hist_b")
+        try: ea, eb = cargar_ejecucion(id_a), cargar_ejecucion(id_b)
+        except sqlite3.Error as e: ea = eb = None; st.error(f"No se pudo leer el histórico: {e}")
+        if ea and eb: vista_comparacion(ea, eb, nombres[id_a], nombres[id_b])
+
+# --- RENDIMIENTO ---
+if st.session_state.perfil_activo:
+    st.markdown("---")
+    with st.expander("⏱️ Rendimiento", expanded=False):
+        perf = st.session_state.perfilador
+        st.caption("Tiempo de cada fase en esta ejecución de la página (las fases anidadas se solapan con su fase padre).")
+        df_perf = perf.resumen()
+        if df_perf.empty: st.info("Sin mediciones en esta ejecución.")
+        else:
+            for c in ["Total (ms)", "Media (ms)", "Máx (ms)", "% ejecución"]: df_perf[c] = df_perf[c].round(1).map(fmt_num_es)
+            st.dataframe(df_perf, hide_index=True, width="stretch")
+        if perf.contadores: st.caption(" · ".join(f"**{n}**: {fmt_num_es(v)}" for n, v in sorted(perf.contadores.items())))
+        d1, d2 = st.columns(2)
+        d1.download_button("📥 Exportar JSON", perf.a_json(), file_name="rendimiento.json", mime="application/json")
+        d2.download_button("📥 Exportar traza (chrome://tracing)", perf.a_traza(), file_name="traza_rendimiento.json", mime="application/json")
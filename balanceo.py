@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Balanceo de carga entre líneas: propone mover o dividir artículos entre líneas.
+
+Cada (línea, turno) se simula por separado, así que una línea puede acabar horas
+después que las demás. Aquí se reparte la carga para adelantar la hora de fin de
+la planta (la más tardía de cada turno).
+
+Cada línea se resume en su curva de capacidad: su calendario de trabajo
+(`calendario.py`) desde el arranque hasta el corte por el Turno 2 o el final del
+horizonte, que da la hora de reloj a la que se completan W horas netas. Con las
+curvas precalculadas, cada movimiento se valora con dos búsquedas binarias. El
+algoritmo es voraz: saca trabajo de las líneas que acaban más tarde (lo que no cabe
+en el calendario cuenta como horas tras su final) hacia las líneas elegibles que
+acaban antes, moviendo el artículo entero o la parte que iguala las dos horas de fin.
+Sólo se acepta un movimiento que adelanta la hora de fin del grupo o deja menos líneas
+empatadas en ella (con dos líneas en el máximo, descargar una ya es una mejora); entre
+varios, gana el de menor suma de cuadrados de las horas de fin. Al final el reparto se
+comprueba con el motor completo, que sí tiene en cuenta las esperas por hora de
+entrada; si un turno empeora, se descartan sus movimientos.
+"""
+import copy
+from collections import deque
+from motor_simulacion import HORIZONTE_HORAS, simular_planta, tabla_pedidos
+from calendario import compilar_calendario, descansos_de_config, hora_de_netas
+
+LOTE_MIN = 500            # Barquetas mínimas de cada parte al dividir un pedido
+LINEAS_MAX = 6            # Líneas que se prueban en cada paso como origen y, para cada pedido, como destino
+TOLERANCIA_H = 1e-6
+
+# ==========================================
+# 1. CURVAS DE CAPACIDAD
+# ==========================================
+def curva_capacidad(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Calendario de la línea desde su arranque hasta el corte o el final del horizonte del motor."""
+    fin = origen + (int(horizonte / paso) + 1) * paso
+    if corte is not None: fin = min(fin, corte)
+    inicio = max(sim['start_time'], origen)
+    return compilar_calendario(inicio, max(inicio, fin), descansos_de_config(sim['breaks']))
+
+def exceso(curva, w):
+    """Horas netas de `w` que no caben en la curva."""
+    return max(0.0, w - curva['cum'][-1])
+
+def hora_fin(curva, w):
+    """Hora de reloj a la que la línea completa `w` horas netas (None si no tiene trabajo); lo que no cabe se suma tras el final."""
+    if w <= TOLERANCIA_H: return None
+    h = hora_de_netas(curva, w)
+    return h if h is not None else curva['fin'] + exceso(curva, w)
+
+# ==========================================
+# 2. REPARTO VORAZ
+# ==========================================
+def _velocidad(job, origen, destino, oee_lineas):
+    # El artículo con el OEE de su línea toma el de la línea destino; si tiene OEE propio, lo conserva
+    oee = job.oee
+    if oee_lineas and oee == oee_lineas.get(origen) and destino in oee_lineas: oee = oee_lineas[destino]
+    vel = job.velocidad * (oee / 100.0)
+    return (vel if vel > 0 else 1.0), oee
+
+def _elegible(job, destino, lineas, elegibles):
+    lid = lineas[destino]['id']
+    if elegibles and job.articulo in elegibles: return lid in elegibles[job.articulo]
+    return not job.lineas_permitidas or lid in job.lineas_permitidas
+
+def _menor(a, b):
+    """`a` < `b` en orden lexicográfico, sin contar diferencias por debajo de TOLERANCIA_H."""
+    for x, y in zip(a, b):
+        if x < y - TOLERANCIA_H: return True
+        if x > y + TOLERANCIA_H: return False
+    return False
+
+def _max_resto(ordenados, b, m):
+    """Hora de fin más tardía entre las líneas distintas de `b` y `m` (`ordenados`: (fin, clave) de mayor a menor)."""
+    for f, k in ordenados:
+        if k != b and k != m: return f
+    return None
+
+def _en_maximo(ordenados, b, m, maximo):
+    """Líneas distintas de `b` y `m` que acaban en `maximo` (con TOLERANCIA_H)."""
+    n = 0
+    for f, k in ordenados:
+        if f < maximo - TOLERANCIA_H: break
+        if k != b and k != m: n += 1
+    return n
+
+def _valorar(curvas, fines, origen, actual, ordenados, b, m, w_b, w_m):
+    # (máximo, líneas en el máximo, suma de cuadrados) del grupo si `b` pasa a tener `w_b` horas netas y `m` `w_m`
+    f_b = hora_fin(curvas[b], w_b); f_m = hora_fin(curvas[m], w_m)
+    cuad = actual[2] - _cuadrado(fines[b], origen) - _cuadrado(fines[m], origen) + _cuadrado(f_b, origen) + _cuadrado(f_m, origen)
+    nuevos = [f for f in (f_b, f_m, _max_resto(ordenados, b, m)) if f is not None]
+    if not nuevos: return (0.0, 0, cuad)
+    maximo = max(nuevos)
+    return (maximo, _en_maximo(ordenados, b, m, maximo) + sum(f is not None and f >= maximo - TOLERANCIA_H for f in (f_b, f_m)), cuad)
+
+def _cuadrado(f, origen):
+    return 0.0 if f is None else (f - origen) ** 2
+
+def _repartir(claves, lineas, curvas, colas, oee_lineas, elegibles, dividir, lote_min, max_movimientos):
+    """Movimientos voraces dentro de un grupo de líneas; modifica `colas`."""
+    carga = {k: sum(j.pendiente / j.vel_real for j in colas[k]) for k in claves}
+    fines = {k: hora_fin(curvas[k], carga[k]) for k in claves}
+    origen = min(curvas[k]['inicio'] for k in claves)
+    movimientos = []; prohibidos = set()  # (cliente, artículo, desde, hacia) que desharían un movimiento anterior
+
+    def mejor_desde(b, actual, ordenados):
+        # Destinos de la que acaba antes a la que acaba más tarde; cada pedido prueba los LINEAS_MAX primeros que admiten su artículo
+        destinos = sorted((k for k in claves if k != b), key=lambda k: fines[k] if fines[k] is not None else curvas[k]['inicio'])
+        mejor = None  # (valor resultante, índice del pedido, destino, cantidad)
+        mejor_por_destino = {}
+        vistos = set()  # (destino, horas que salen de b, horas que entran en el destino): pedidos iguales valen lo mismo
+        for n, job in enumerate(colas[b]):
+            d_b = job.pendiente / job.vel_real; probados = 0
+            for m in destinos:
+                if probados >= LINEAS_MAX: break
+                if not _elegible(job, m, lineas, elegibles) or (job.cliente, job.articulo, b, m) in prohibidos: continue
+                probados += 1
+                v_m, _ = _velocidad(job, b, m, oee_lineas)
+                if (m, d_b, job.pendiente / v_m) in vistos: continue
+                vistos.add((m, d_b, job.pendiente / v_m))
+                res = _valorar(curvas, fines, origen, actual, ordenados, b, m, carga[b] - d_b, carga[m] + job.pendiente / v_m)
+                if mejor is None or _menor(res, mejor[0]): mejor = (res, n, m, job.pendiente)
+                if m not in mejor_por_destino or _menor(res, mejor_por_destino[m][0]): mejor_por_destino[m] = (res, n)
+
+        if dividir:
+            # Dividir el pedido más prometedor de cada destino: la parte que iguala las dos horas de fin
+            for m, (_, n) in mejor_por_destino.items():
+                job = colas[b][n]; v_m, _ = _velocidad(job, b, m, oee_lineas)
+                lo, hi = 0.0, float(job.pendiente)
+                for _ in range(40):
+                    q = (lo + hi) / 2
+                    f_b = hora_fin(curvas[b], carga[b] - q / job.vel_real); f_m = hora_fin(curvas[m], carga[m] + q / v_m)
+                    if f_b is None or (f_m is not None and f_m >= f_b): hi = q
+                    else: lo = q
+                q = int(round(lo))
+                if q < lote_min or job.pendiente - q < lote_min: continue
+                res = _valorar(curvas, fines, origen, actual, ordenados, b, m, carga[b] - q / job.vel_real, carga[m] + q / v_m)
+                if mejor is None or _menor(res, mejor[0]): mejor = (res, n, m, q)
+        # La suma de cuadrados sólo desempata: un movimiento que no adelanta el fin del grupo no se hace
+        return mejor if mejor is not None and _menor(mejor[0][:2], actual[:2]) else None
+
+    while len(movimientos) < max_movimientos:
+        ordenados = sorted(((f, k) for k, f in fines.items() if f is not None), reverse=True)
+        if not ordenados: break
+        actual = (ordenados[0][0], _en_maximo(ordenados, None, None, ordenados[0][0]), sum(_cuadrado(f, origen) for f, _ in ordenados))
+        # Se descargan primero las que acaban más tarde
+        origenes = [k for _, k in ordenados[:LINEAS_MAX]]
+        mejor = next(((b, mv) for b in origenes if (mv := mejor_desde(b, actual, ordenados)) is not None), None)
+        if mejor is None: break
+        b, (_, n, m, q) = mejor
+        job = colas[b][n]; v_m, oee_m = _velocidad(job, b, m, oee_lineas)
+        nuevo_job = job.copia(pendiente=q, vel_real=v_m, oee=oee_m)
+        if q >= job.pendiente: del colas[b][n]
+        else: colas[b][n] = job.copia(pendiente=job.pendiente - q)
+        colas[m].append(nuevo_job)
+        carga[b] -= q / job.vel_real; carga[m] += q / v_m
+        if not colas[b]: carga[b] = 0.0
+        fines[b] = hora_fin(curvas[b], carga[b]); fines[m] = hora_fin(curvas[m], carga[m])
+        prohibidos.add((job.cliente, job.articulo, m, b))
+        movimientos.append({"cliente": job.cliente, "articulo": job.articulo, "desde": b, "hacia": m, "cantidad": q, "entero": q >= job.pendiente})
+    return movimientos
+
+# ==========================================
+# 3. PROPUESTA Y COMPROBACIÓN CON EL MOTOR
+# ==========================================
+def _clave(sim):
+    return f"{sim['id']}_{sim['turno']}"
+
+def _con_colas(sims, colas):
+    """Copias de `sims` con las colas indicadas (y su total y tabla resumen)."""
+    nuevas = []
+    for s in sims:
+        # La cola y su tabla se sustituyen: no hace falta copiarlas
+        c = copy.deepcopy(dict(s, queue=None, resumen_tabla=None)); cola = colas[_clave(s)]
+        c['queue'] = deque(cola); c['total_obj'] = sum(j.pendiente for j in cola)
+        c['resumen_tabla'] = tabla_pedidos(cola)
+        if c['total_obj'] > 0: nuevas.append(c)
+    return nuevas
+
+def _valor_grupo(resultado, claves):
+    """Menor es mejor: todas terminadas y hora de fin más temprana; si no, más producción."""
+    sims = [s for s in resultado['sims'] if _clave(s) in claves]
+    if not sims: return (0, 0.0)
+    if any(s['active'] or s['interrupted'] for s in sims): return (1, -sum(s['producido'] for s in sims))
+    return (0, max(s['end_time'] for s in sims))
+
+def balancear_planta(sims, oee_lineas=None, elegibles=None, cortes=None, mismo_turno=True, dividir=True, lote_min=LOTE_MIN,
+                     max_movimientos=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Propone mover o dividir artículos entre líneas para adelantar la hora de fin de la planta.
+
+    `sims` incluye las líneas sin pedidos que pueden recibir carga (`crear_simulacion(..., permitir_vacia=True)`).
+    `oee_lineas` = {"{id}_{turno}": OEE global}; `elegibles` = {artículo: ids de línea permitidos}, que
+    sustituye a la columna `lineas_permitidas` del plan. Con `mismo_turno` sólo se mueve carga entre
+    líneas del mismo turno. No modifica `sims`.
+
+    Devuelve {"movimientos", "antes", "despues"}, con "antes"/"despues" el resultado de `simular_planta`.
+    """
+    cortes = cortes or {}
+    if not sims: return {"movimientos": [], "antes": simular_planta([]), "despues": simular_planta([])}
+    origen = min(s['start_time'] for s in ([s for s in sims if s['total_obj'] > 0] or sims))
+    lineas = {_clave(s): s for s in sims}
+    curvas = {k: curva_capacidad(s, origen, cortes.get(s['id']) if s['turno'] == '1' else None, horizonte, paso) for k, s in lineas.items()}
+    colas = {k: list(s['queue']) for k, s in lineas.items()}
+    grupos = {}
+    for k, s in lineas.items(): grupos.setdefault(s['turno'] if mismo_turno else '*', []).append(k)
+    max_movimientos = max_movimientos or 4 * sum(len(c) for c in colas.values())
+
+    propuestos = {g: _repartir(claves, lineas, curvas, colas, oee_lineas, elegibles, dividir, lote_min, max_movimientos) for g, claves in grupos.items()}
+
+    antes = simular_planta(_con_colas(sims, {k: list(s['queue']) for k, s in lineas.items()}), cortes, horizonte, paso)
+    despues = simular_planta(_con_colas(sims, colas), cortes, horizonte, paso)
+    # Un turno que empeora con el motor completo (p.ej. por esperas a la entrada del cliente) conserva su reparto
+    descartados = [g for g, claves in grupos.items() if propuestos[g] and _valor_grupo(despues, set(claves)) > _valor_grupo(antes, set(claves))]
+    if descartados:
+        for g in descartados:
+            for k in grupos[g]: colas[k] = list(lineas[k]['queue'])
+            propuestos[g] = []
+        despues = simular_planta(_con_colas(sims, colas), cortes, horizonte, paso)
+    return {"movimientos": [mv for g in grupos for mv in propuestos[g]], "antes": antes, "despues": despues}
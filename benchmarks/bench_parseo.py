@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Compara el parseo por columnas (`carga_datos.parsear_datos`) con el antiguo parseo fila a fila.
+
+Uso: python benchmarks/bench_parseo.py [filas]   (por defecto 50.000 filas de plan)
+"""
+import datetime
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+from carga_datos import parsear_datos
+from utilidades import str_to_time, str_to_bool, safe_get_int
+
+def generar_csv(filas, lineas=30, seed=1):
+    r = random.Random(seed)
+    cfg = ["linea_id,turno,oee_global,hora_inicio,desc_1_inicio,desc_1_fin,desc_1_skip,desc_2_inicio,desc_2_fin,desc_2_skip,desc_3_inicio,desc_3_fin,desc_3_skip"]
+    for l in range(1, lineas + 1):
+        for t in ('1', '2'):
+            h0 = 6 if t == '1' else 14
+            cfg.append(f"{l},{t},{r.choice([80, 85, 90])},{h0:02d}:00,{h0+3:02d}:00,{h0+3:02d}:30,FALSE,,,TRUE,,,TRUE")
+    plan = ["linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada,oee_articulo,act_oee_articulo,hora_entrada_cliente,act_hora_entrada"]
+    for i in range(filas):
+        l = r.randint(1, lineas); t = r.choice(['1', '2', '1.0']); c = f"Cliente {r.randint(1, 40)}"
+        hora = r.choice(["", "08:00", "09:30", "12:15"])
+        plan.append(f'{l},{t},{c},Art {i},"{r.randint(1, 20)}.{r.randint(0, 999):03d}",{r.choice([800, 1200, "1.500"])},{r.randint(60, 99)},{r.choice(["TRUE", "FALSE"])},{hora},{r.choice(["TRUE", "FALSE"])}')
+    return "\n".join(cfg).encode(), "\n".join(plan).encode()
+
+def parsear_por_filas(raw_config, raw_plan):
+    """Parseo anterior (iterrows/apply), conservado sólo como referencia."""
+    leer = lambda raw: pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8-sig', engine='python')
+    df_config = leer(raw_config); df_plan = leer(raw_plan)
+    df_config.columns = df_config.columns.str.strip().str.replace('"', '')
+    df_plan.columns = df_plan.columns.str.strip().str.replace('"', '')
+    estado = {"lineas_configuradas": []}
+    if 'turno' not in df_config.columns: df_config['turno'] = '1'
+    for index, row in df_config.iterrows():
+        linea_id = str(row.get('linea_id', '')).strip()
+        t_raw = str(row.get('turno', '1')).split('.')[0].strip()
+        turno = t_raw if t_raw else '1'
+        if not linea_id: continue
+        prefijo = f"l{linea_id}_t{turno}_"
+        estado["lineas_configuradas"].append((linea_id, turno))
+        estado[f"{prefijo}oee"] = safe_get_int(row.get('oee_global'), 85)
+        estado[f"{prefijo}hora_inicio"] = str_to_time(row.get('hora_inicio')) or datetime.time(8, 0)
+        for i in range(1, 4):
+            estado[f"{prefijo}desc_{i}_start"] = str_to_time(row.get(f'desc_{i}_inicio'))
+            estado[f"{prefijo}desc_{i}_end"] = str_to_time(row.get(f'desc_{i}_fin'))
+            estado[f"{prefijo}desc_{i}_skip"] = str_to_bool(row.get(f'desc_{i}_skip', 'FALSE'))
+    if 'turno' not in df_plan.columns: df_plan['turno'] = '1'
+    if 'hora_entrada_cliente' not in df_plan.columns: df_plan['hora_entrada_cliente'] = ""
+    df_plan['hora_validada'] = df_plan['hora_entrada_cliente'].apply(str_to_time)
+    for col in ['linea_id', 'turno', 'nombre_cliente', 'nombre_articulo']:
+         if col in df_plan.columns:
+            df_plan[col] = df_plan[col].astype(str).apply(lambda x: x.split('.')[0] if x.replace('.','',1).isdigit() else x).str.strip()
+    horas_por_cliente = df_plan.groupby(['linea_id', 'turno', 'nombre_cliente'])['hora_validada'].last()
+    clientes_por_linea_turno = {}
+    for index, row in df_plan.iterrows():
+        linea_id = row.get('linea_id'); turno = row.get('turno')
+        if not turno: turno = '1'
+        cliente = row.get('nombre_cliente')
+        if not linea_id or not cliente: continue
+        key_lt = f"{linea_id}_{turno}"
+        if key_lt not in clientes_por_linea_turno: clientes_por_linea_turno[key_lt] = {}
+        if cliente not in clientes_por_linea_turno[key_lt]:
+            hora_obj = None
+            try:
+                if (linea_id, turno, cliente) in horas_por_cliente.index:
+                    hora_obj = horas_por_cliente.get((linea_id, turno, cliente))
+            except: pass
+            act_hora = str_to_bool(row.get('act_hora_entrada', 'FALSE'))
+            clientes_por_linea_turno[key_lt][cliente] = {"nombre": cliente, "articulos": [], "hora_entrada": hora_obj, "tiene_hora": (hora_obj is not None) and act_hora}
+        nombre_art = str(row.get('nombre_articulo', ''))
+        if nombre_art:
+            oee_linea = estado.get(f"l{linea_id}_t{turno}_oee", 85)
+            oee_art = oee_linea
+            if str_to_bool(row.get('act_oee_articulo', 'FALSE')):
+                oee_art = safe_get_int(row.get('oee_articulo'), oee_linea)
+            art_obj = {"nombre": nombre_art, "cantidad": safe_get_int(row.get('barquetas_pedido'), 0), "velocidad": safe_get_int(row.get('velocidad_estimada'), 800), "oee": oee_art}
+            clientes_por_linea_turno[key_lt][cliente]['articulos'].append(art_obj)
+    estado["plan_data"] = clientes_por_linea_turno
+    return estado
+
+def cronometrar(fn, *args, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter(); res = fn(*args); dt = time.perf_counter() - t0
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor, res
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    raw_config, raw_plan = generar_csv(filas)
+    t_filas, ref = cronometrar(parsear_por_filas, raw_config, raw_plan, repeticiones=1)
+    t_cols, res = cronometrar(parsear_datos, raw_config, raw_plan)
+    assert res["plan_data"] == ref["plan_data"], "El parseo por columnas no coincide con el parseo por filas"
+    print(f"Plan de {filas} filas")
+    print(f"  Por filas:    {t_filas * 1000:8.1f} ms")
+    print(f"  Por columnas: {t_cols * 1000:8.1f} ms  (x{t_filas / t_cols:.1f})")
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Banco de pruebas de la planta completa: genera CSV sintéticos y mide cada fase por separado.
+
+Fases: carga (lectura + hash + parseo + copia local, como `load_data_from_sheets`),
+preparación de simulaciones, simulación de la planta, re-simulación tras editar un
+pedido (con la caché de líneas ya llena), horizonte de varios días con arrastre entre
+turnos (`horizonte.planificar_horizonte`), series para los gráficos,
+gráficos Altair serializados (lo que hace `st.altair_chart`) y tablas AgGrid
+(opciones + datos en JSON). No arranca Streamlit ni usa la red.
+
+Uso:
+    python benchmarks/bench_planta.py                       # tamaños pequeña, mediana y grande
+    python benchmarks/bench_planta.py --tamanos muy_grande --repeticiones 1
+    python benchmarks/bench_planta.py --tamanos semana                     # 7 días x 3 turnos
+    python benchmarks/bench_planta.py --salida actual.json --comparar anterior.json
+
+Sin `--salida`, los resultados se escriben en `benchmarks/resultados/bench_planta.json` (ignorado por git).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import numpy as np
+import pandas as pd
+from carga_datos import cargar_datos, limpiar_cache
+from motor_simulacion import simulaciones_desde_estado, simular_planta, limpiar_cache_lineas, historial_df, serie_turno
+from graficos import grafico_linea, grafico_global, opciones_grid
+from horizonte import planificar_horizonte
+
+# Parámetros del generador por tamaño de planta
+TAMANOS = {
+    "pequena":    {"lineas": 4,   "turnos": 1, "clientes": 3,  "articulos": 3,  "descansos": 2},
+    "mediana":    {"lineas": 15,  "turnos": 2, "clientes": 6,  "articulos": 4,  "descansos": 3},
+    "grande":     {"lineas": 40,  "turnos": 2, "clientes": 12, "articulos": 6,  "descansos": 3},
+    "muy_grande": {"lineas": 120, "turnos": 2, "clientes": 25, "articulos": 10, "descansos": 4},
+    "semana":     {"lineas": 40,  "turnos": 3, "clientes": 2,  "articulos": 1,  "descansos": 2, "dias": 7},
+}
+# Resultados por defecto en una carpeta ignorada por git, para no dejar ficheros sueltos en el árbol
+SALIDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados", "bench_planta.json")
+FASES = ["carga", "preparacion", "simulacion", "resimulacion", "horizonte", "series", "graficos", "tablas"]
+
+# ==========================================
+# 1. GENERADOR DE PLANTAS SINTÉTICAS
+# ==========================================
+def _hora(h):
+    h = h % 24; return f"{int(h):02d}:{int(round((h - int(h)) * 60)) % 60:02d}"
+
+def generar_planta(lineas, turnos=2, clientes=6, articulos=4, descansos=3, con_hora=0.4, seed=1, dias=1):
+    """(raw_config, raw_plan) en el formato de la hoja de cálculo.
+
+    El T1 arranca entre las 05:00 y las 07:30 y cada turno siguiente ocho horas después.
+    Con `dias` > 1 se añade la columna `dia` y los turnos se numeran seguidos a lo largo
+    de los días (T1-T3 el día 1, T4-T6 el día 2...). Cada turno tiene
+    `descansos` pausas (la primera de 15 min, la segunda de 30 min...). Una fracción
+    `con_hora` de los clientes tiene hora de entrada activa. Cantidades y velocidades
+    usan el formato español ("1.500") como en la hoja real.
+    """
+    r = random.Random(seed)
+    cab = ["linea_id", "turno", "oee_global", "hora_inicio"] + [f"desc_{i}_{c}" for i in range(1, descansos + 1) for c in ("inicio", "fin", "skip")] + (["dia"] if dias > 1 else [])
+    cfg = [",".join(cab)]; inicios = {}
+    for l in range(1, lineas + 1):
+        h1 = r.choice([5.0, 5.5, 6.0, 6.0, 7.0, 7.5])
+        for d, t in ((d, t) for d in range(1, dias + 1) for t in range(1, turnos + 1)):
+            h0 = h1 + 8 * (t - 1); etiqueta = (d - 1) * turnos + t; inicios[(l, etiqueta)] = h0
+            fila = [str(l), str(etiqueta), str(r.choice([75, 80, 85, 90])), _hora(h0)]
+            for i in range(descansos):
+                ini = h0 + 2 + i * 2.5 + r.choice([0, 0.25, 0.5]); dur = 0.5 if i % 2 else 0.25
+                fila += [_hora(ini), _hora(ini + dur), "TRUE" if r.random() < 0.1 else "FALSE"]
+            cfg.append(",".join(fila + ([str(d)] if dias > 1 else [])))
+
+    plan = ["linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada,oee_articulo,act_oee_articulo,hora_entrada_cliente,act_hora_entrada"]
+    for (l, t), h0 in inicios.items():
+        for c in range(1, clientes + 1):
+            tiene = r.random() < con_hora; hora = _hora(h0 + r.choice([1, 2, 3.5, 5])) if tiene else ""
+            for a in range(1, articulos + 1):
+                cant = r.choice([500, 1200, 2500, 4000, 8000]) + r.randint(0, 99) * 10
+                vel = r.choice([600, 800, 1000, 1200, 1500])
+                miles = lambda v: f"{v:,}".replace(",", ".")
+                plan.append(f'{l},{t},Cliente {c},Art {c}-{a},"{miles(cant)}","{miles(vel)}",{r.randint(70, 95)},{"TRUE" if r.random() < 0.2 else "FALSE"},{hora},{"TRUE" if tiene else "FALSE"}')
+    return "\n".join(cfg).encode(), "\n".join(plan).encode()
+
+# ==========================================
+# 2. FASES
+# ==========================================
+def _medir(tiempos, fase, fn, *args):
+    t0 = time.perf_counter(); res = fn(*args); tiempos.setdefault(fase, []).append(time.perf_counter() - t0)
+    return res
+
+def _series(sims, resultado, res_graf):
+    lineas = [historial_df(s, resolucion=res_graf) for s in sims]
+    return lineas, {t: serie_turno(resultado, t, resolucion=res_graf) for t in resultado['prod']}
+
+def _graficos(lineas, globales):
+    specs = [grafico_linea(df).to_dict() for df in lineas if not df.empty]
+    return specs + [grafico_global(df[['Hora', 'Prod', 'Acum']], '#1f77b4', '#ff7f0e', f"GLOBAL TURNO {t}").to_dict() for t, df in globales.items()]
+
+def _tablas(sims):
+    # Lo que envía `render_aggrid` al navegador: opciones de la rejilla y filas en JSON
+    return [(opciones_grid(s['resumen_tabla']), s['resumen_tabla'].to_json(orient='records')) for s in sims if not s['resumen_tabla'].empty]
+
+def _editar_pedido(sims):
+    # Cambia la cantidad del primer pedido de la primera línea con cola (como una edición en la hoja)
+    for s in sims:
+        if s['queue']: s['queue'][0] = s['queue'][0].copia(pendiente=s['queue'][0].pendiente + 100); return
+
+def medir_planta(params, repeticiones=3, paso=1.0, res_graf=None, seed=1):
+    """Tiempos (s) de cada fase en `repeticiones` pasadas completas sobre la misma planta generada."""
+    raw_config, raw_plan = generar_planta(seed=seed, **params)
+    tiempos = {}; info = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_config = os.path.join(tmp, "config.csv"); ruta_plan = os.path.join(tmp, "plan.csv")
+        with open(ruta_config, 'wb') as f: f.write(raw_config)
+        with open(ruta_plan, 'wb') as f: f.write(raw_plan)
+        for _ in range(repeticiones):
+            limpiar_cache(); limpiar_cache_lineas()
+            estado, _, _ = _medir(tiempos, "carga", lambda: cargar_datos(ruta_config, ruta_plan, forzar=True, dir_snapshot=os.path.join(tmp, "snapshot")))
+            sims, cortes = _medir(tiempos, "preparacion", simulaciones_desde_estado, estado, params['turnos'] > 1)
+            pedidos = sum(len(s['queue']) for s in sims)  # el motor consume las colas
+            resultado = _medir(tiempos, "simulacion", simular_planta, sims, cortes, 48.0, paso)
+            editadas, cortes_ed = simulaciones_desde_estado(estado, params['turnos'] > 1); _editar_pedido(editadas)
+            _medir(tiempos, "resimulacion", simular_planta, editadas, cortes_ed, 48.0, paso)
+            limpiar_cache_lineas(); _medir(tiempos, "horizonte", planificar_horizonte, estado, paso)
+            lineas, globales = _medir(tiempos, "series", _series, sims, resultado, res_graf or paso)
+            _medir(tiempos, "graficos", _graficos, lineas, globales)
+            _medir(tiempos, "tablas", _tablas, sims)
+            info = {"filas_plan": raw_plan.count(b"\n"), "bytes": len(raw_config) + len(raw_plan), "simulaciones": len(sims),
+                    "pedidos": pedidos, "tramos": len(resultado['t'])}
+    return tiempos, info
+
+# ==========================================
+# 3. INFORME
+# ==========================================
+def _commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+def resumen_fases(tiempos):
+    return {f: {"min_ms": 1000 * min(v), "mediana_ms": 1000 * statistics.median(v)} for f, v in tiempos.items()}
+
+def comparar(actual, previo):
+    """Cociente actual/anterior de la mediana de cada fase (>1 = más lento)."""
+    prev = {r['tamano']: r['fases'] for r in previo['resultados']}
+    print(f"\nComparación con {previo['meta'].get('commit')} (mediana actual / anterior):")
+    for r in actual['resultados']:
+        if r['tamano'] not in prev: continue
+        ratios = [f"{f} x{v['mediana_ms'] / prev[r['tamano']][f]['mediana_ms']:.2f}" for f, v in r['fases'].items() if prev[r['tamano']].get(f, {}).get('mediana_ms')]
+        print(f"  {r['tamano']:<11} " + "  ".join(ratios))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tamanos", default="pequena,mediana,grande", help=f"Lista separada por comas de {', '.join(TAMANOS)}")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--resolucion-min", type=int, default=60, help="Duración del tramo simulado en minutos")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--salida", default=SALIDA, help="Fichero JSON con los resultados")
+    ap.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    args = ap.parse_args(argv)
+
+    paso = args.resolucion_min / 60.0
+    informe = {"meta": {"commit": _commit(), "fecha": datetime.datetime.now().isoformat(timespec='seconds'), "python": platform.python_version(),
+                        "numpy": np.__version__, "pandas": pd.__version__, "plataforma": platform.platform(), "cpus": os.cpu_count(),
+                        "repeticiones": args.repeticiones, "resolucion_min": args.resolucion_min, "seed": args.seed}, "resultados": []}
+    print(f"{'tamaño':<11} {'filas':>7} " + " ".join(f"{f:>11}" for f in FASES) + "   (mediana, ms)")
+    for nombre in args.tamanos.split(","):
+        params = TAMANOS[nombre.strip()]
+        tiempos, info = medir_planta(params, args.repeticiones, paso, seed=args.seed)
+        fases = resumen_fases(tiempos)
+        informe["resultados"].append({"tamano": nombre.strip(), "parametros": params, **info, "fases": fases})
+        print(f"{nombre.strip():<11} {info['filas_plan']:>7} " + " ".join(f"{fases[f]['mediana_ms']:>11.1f}" for f in FASES))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as f: json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f: comparar(informe, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Calendario de trabajo precompilado de una línea/turno.
+
+Los descansos diarios se repiten a lo largo del horizonte y se guardan como
+intervalos ordenados y fusionados, junto con la suma acumulada de horas netas y
+de horas de descanso. Así, "cuántas horas de descanso caen en cada tramo" y "a qué
+hora se completan N horas netas" se resuelven con búsquedas binarias en lugar de
+recorrer tramos. Admite
+cualquier número de descansos, descansos que cruzan la medianoche
+(p.ej. 23:30-00:30) y horizontes de varios días.
+"""
+from bisect import bisect_left
+import numpy as np
+
+# ==========================================
+# 1. COMPILACIÓN
+# ==========================================
+def descansos_de_config(breaks):
+    """Lista de descansos activos [(inicio, fin)] en horas del día.
+
+    Admite la lista directamente o el dict de la hoja (`start_i`/`end_i`/`skip_i`, i = 1, 2, ...).
+    Un descanso 00:00-00:00 o de duración nula se ignora.
+    """
+    if isinstance(breaks, dict):
+        lista = []; i = 1
+        while f'start_{i}' in breaks:
+            if not breaks.get(f'skip_{i}', False): lista.append((breaks[f'start_{i}'], breaks[f'end_{i}']))
+            i += 1
+        breaks = lista
+    return [(float(s), float(e)) for s, e in breaks if s != e]
+
+def compilar_calendario(inicio, fin, descansos):
+    """Intervalos de trabajo y de descanso dentro de [inicio, fin], con las horas netas acumuladas."""
+    pausas = []
+    for d in range(int(inicio // 24) - 1, int(fin // 24) + 1):
+        for s, e in descansos:
+            a = d * 24 + s; b = d * 24 + e + (24 if e < s else 0)
+            if b > inicio and a < fin: pausas.append((max(a, inicio), min(b, fin)))
+    pausas.sort()
+
+    # Descansos solapados se fusionan; el trabajo es el complemento
+    p_desde = []; p_hasta = []; t_desde = []; t_hasta = []; t = inicio
+    for a, b in pausas:
+        if p_hasta and a <= p_hasta[-1]: p_hasta[-1] = max(p_hasta[-1], b); continue
+        p_desde.append(a); p_hasta.append(b)
+    for a, b in zip(p_desde, p_hasta):
+        if a > t: t_desde.append(t); t_hasta.append(a)
+        t = max(t, b)
+    if t < fin: t_desde.append(t); t_hasta.append(fin)
+    cum = [0.0]; cum_pausa = [0.0]
+    for a, b in zip(t_desde, t_hasta): cum.append(cum[-1] + (b - a))
+    for a, b in zip(p_desde, p_hasta): cum_pausa.append(cum_pausa[-1] + (b - a))
+    return {"inicio": inicio, "fin": fin, "descansos": descansos, "pausa_desde": p_desde, "pausa_hasta": p_hasta, "cum_pausa": cum_pausa,
+            "desde": t_desde, "hasta": t_hasta, "cum": cum}
+
+def calendario_linea(sim, inicio, fin):
+    """Calendario de `sim` que cubre [inicio, fin]; se compila una vez y se guarda en `sim['calendario']`."""
+    cal = sim.get('calendario')
+    if cal is None or cal['inicio'] > inicio or cal['fin'] < fin:
+        cal = sim['calendario'] = compilar_calendario(inicio, fin, descansos_de_config(sim['breaks']))
+    return cal
+
+# ==========================================
+# 2. CONSULTAS
+# ==========================================
+def _descanso_hasta(cal, t):
+    # Horas de descanso del calendario anteriores a cada instante de `t`
+    p_desde = np.asarray(cal['pausa_desde']); p_hasta = np.asarray(cal['pausa_hasta']); cum = np.asarray(cal['cum_pausa'])
+    i = np.searchsorted(p_desde, t, side='right') - 1
+    j = np.maximum(i, 0)
+    return np.where(i < 0, 0.0, cum[j] + np.minimum(t, p_hasta[j]) - p_desde[j])
+
+def descanso_en_tramos(cal, a, b):
+    """Horas de descanso de cada tramo [a, b] (arrays de inicios y fines, una fila por tramo)."""
+    if not cal['pausa_desde'] or not len(a): return np.zeros(len(a))
+    return np.maximum(_descanso_hasta(cal, b) - _descanso_hasta(cal, a), 0)
+
+def hora_de_netas(cal, n):
+    """Hora de reloj a la que se completan `n` horas netas desde el inicio del calendario; None si no caben."""
+    cum = cal['cum']
+    if n > cum[-1] or not cal['desde']: return None
+    i = max(0, bisect_left(cum, n) - 1)
+    return cal['desde'][i] + (n - cum[i])
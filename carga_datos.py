@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""Ingesta del plan y la configuración de líneas, con caché compartida y copia local.
+
+Los CSV descargados se identifican por el hash de sus bytes: si el contenido no ha
+cambiado se reutiliza el resultado ya parseado. La caché vive a nivel de módulo, así
+que la comparten todas las sesiones del mismo servidor. La última descarga correcta
+se guarda en disco para arrancar en frío sin red o trabajar sin conexión con la hoja.
+Tras una descarga fallida no se vuelve a intentar hasta pasados `REINTENTO_SIN_CONEXION_SEG`
+(o hasta pulsar "Recargar datos"), para no bloquear cada interacción esperando a la red.
+El estado devuelto es compartido: quien lo vaya a modificar debe copiarlo.
+"""
+import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+import numpy as np
+import pandas as pd
+from utilidades import str_to_time, safe_get_int
+from perfilador import medir, contar
+
+TTL_DATOS_SEG = 300
+MAX_VERSIONES = 8
+TIMEOUT_DESCARGA_SEG = 15
+REINTENTO_SIN_CONEXION_SEG = 60   # Espera tras una descarga fallida antes de volver a intentarlo
+DIR_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot_datos")
+
+class EnlaceNoCSV(ValueError):
+    """El enlace devuelve una página web en lugar de un CSV."""
+
+# ==========================================
+# 1. PARSEO (SIN STREAMLIT)
+# ==========================================
+def leer_csv(raw):
+    # Lector C (mucho más rápido); el lector Python queda como respaldo para CSV raros
+    try: return pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8-sig', engine='c')
+    except (pd.errors.ParserError, ValueError): return pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8-sig', engine='python')
+
+_VERDADEROS = ['TRUE', 'VERDADERO', 'SI', 'YES', '1']
+
+def _col(df, nombre, defecto=None):
+    """Columna como Series de str; si falta, Series con el valor por defecto (None = ausente)."""
+    if nombre in df.columns: return df[nombre].astype(str)
+    return pd.Series([defecto] * len(df), index=df.index, dtype=object)
+
+def _booleanos(col):
+    """Versión por columnas de `str_to_bool`."""
+    return col.where(col.notna(), '').astype(str).str.strip().str.upper().isin(_VERDADEROS)
+
+def _enteros(col, defecto):
+    """Versión por columnas de `safe_get_int` (formato español: se quitan '.' y ',').
+
+    `defecto` puede ser un escalar o una lista alineada con la columna. Devuelve una lista de int.
+    """
+    presente = col.notna()
+    limpio = col.where(presente, '').astype(str).str.strip().str.replace('.', '', regex=False).str.replace(',', '', regex=False)
+    num = pd.to_numeric(limpio, errors='coerce').astype(float)
+    valido = np.isfinite(num.to_numpy()) & (np.abs(num.to_numpy()) < 2**63)
+    defectos = defecto if isinstance(defecto, list) else [defecto] * len(col)
+    enteros = np.trunc(np.where(valido, num.to_numpy(), 0)).astype(np.int64).tolist()
+    res = [e if v else d for e, v, d in zip(enteros, valido, defectos)]
+    # Casos raros que float() acepta y to_numeric no (p.ej. '1_000'): se resuelven uno a uno
+    raros = np.flatnonzero(~valido & presente.to_numpy() & (limpio != '').to_numpy())
+    for i in raros: res[i] = safe_get_int(col.iat[i], defectos[i])
+    return res
+
+def _por_valor(col, fn, na=None):
+    """Aplica `fn` una sola vez por cada valor distinto de la columna (pocas horas/ids, muchas filas)."""
+    codigos, unicos = pd.factorize(col, use_na_sentinel=True)
+    valores = np.empty(len(unicos) + 1, dtype=object)
+    valores[:-1] = [fn(u) for u in unicos]; valores[-1] = na
+    return pd.Series(valores[codigos], index=col.index, dtype=object)
+
+def _horas(col):
+    """Versión por columnas de `str_to_time`."""
+    return _por_valor(col, str_to_time)
+
+def _sin_decimal_valor(x):
+    return (x.split('.')[0] if x.replace('.','',1).isdigit() else x).strip()
+
+def _sin_decimal(col):
+    """Quita el sufijo '.0' de identificadores numéricos exportados como número."""
+    return _por_valor(col, _sin_decimal_valor)
+
+def _lineas_permitidas(x):
+    """'1; 3|5' -> ['1', '3', '5']; vacío -> None (sin restricción)."""
+    ids = [_sin_decimal_valor(v) for v in str(x).replace('|', ';').replace(',', ';').replace(' ', ';').split(';') if v.strip()]
+    return ids or None
+
+def parsear_datos(raw_config, raw_plan):
+    """Convierte los bytes de ambos CSV en las claves de `st.session_state` que usa la app."""
+    # Lectura robusta
+    df_config = leer_csv(raw_config)
+    df_plan = leer_csv(raw_plan)
+
+    # --- DETECCIÓN DE ERROR HTML ---
+    if not df_config.empty and str(df_config.iloc[0,0]).strip().startswith("<"):
+        raise EnlaceNoCSV("Los enlaces son páginas web, no CSV.")
+
+    # Limpieza
+    df_config.columns = df_config.columns.str.strip().str.replace('"', '')
+    df_plan.columns = df_plan.columns.str.strip().str.replace('"', '')
+
+    # Autocorrección linea_id
+    if 'linea_id' not in df_config.columns:
+         for c in df_config.columns:
+             if 'linea' in c.lower() and 'id' in c.lower():
+                 df_config.rename(columns={c: 'linea_id'}, inplace=True); break
+
+    estado = {"df_config_raw": df_config, "df_plan_raw": df_plan, "lineas_configuradas": []}
+
+    if 'turno' not in df_config.columns: df_config['turno'] = '1'
+
+    # CONFIGURACIÓN (columnas convertidas en bloque)
+    lineas = _col(df_config, 'linea_id', '').str.strip().tolist()
+    turnos = _col(df_config, 'turno', '1').str.split('.', n=1).str[0].str.strip().tolist()
+    oees = _enteros(_col(df_config, 'oee_global'), 85)
+    inicios = _horas(_col(df_config, 'hora_inicio')).tolist()
+    # Columnas opcionales del horizonte de varios días: día del turno (1, 2, ...) y su duración en horas
+    dias = _enteros(_col(df_config, 'dia'), 0)
+    horas_turno = pd.to_numeric(_col(df_config, 'horas_turno', '').str.strip().str.replace(',', '.', regex=False), errors='coerce').tolist()
+    # Descansos desc_1 .. desc_N (al menos los tres de la plantilla)
+    n_desc = max([3] + [int(m.group(1)) for m in (re.fullmatch(r'desc_(\d+)_inicio', c) for c in df_config.columns) if m])
+    descansos = [(_horas(_col(df_config, f'desc_{i}_inicio')).tolist(), _horas(_col(df_config, f'desc_{i}_fin')).tolist(), _booleanos(_col(df_config, f'desc_{i}_skip', 'FALSE')).tolist()) for i in range(1, n_desc + 1)]
+    for n, (linea_id, t_raw) in enumerate(zip(lineas, turnos)):
+        turno = t_raw if t_raw else '1'
+        if not linea_id: continue
+
+        prefijo = f"l{linea_id}_t{turno}_"
+        estado["lineas_configuradas"].append((linea_id, turno))
+        estado[f"{prefijo}oee"] = oees[n]
+        estado[f"{prefijo}hora_inicio"] = inicios[n] or datetime.time(8, 0)
+        estado[f"{prefijo}dia"] = dias[n] if dias[n] > 0 else None
+        estado[f"{prefijo}horas_turno"] = horas_turno[n] if horas_turno[n] > 0 else None
+        for i, (d_ini, d_fin, d_skip) in enumerate(descansos, start=1):
+            estado[f"{prefijo}desc_{i}_start"] = d_ini[n]
+            estado[f"{prefijo}desc_{i}_end"] = d_fin[n]
+            estado[f"{prefijo}desc_{i}_skip"] = d_skip[n]
+
+    # PLAN
+    if 'turno' not in df_plan.columns: df_plan['turno'] = '1'
+    if 'hora_entrada_cliente' not in df_plan.columns: df_plan['hora_entrada_cliente'] = ""
+
+    df_plan['hora_validada'] = _horas(df_plan['hora_entrada_cliente'])
+
+    for col in ['linea_id', 'turno', 'nombre_cliente', 'nombre_articulo']:
+         if col in df_plan.columns:
+            df_plan[col] = _sin_decimal(df_plan[col].astype(str))
+
+    horas_por_cliente = df_plan.groupby(['linea_id', 'turno', 'nombre_cliente'])['hora_validada'].last().to_dict()
+    clientes_por_linea_turno = {}
+
+    lin = df_plan['linea_id'].tolist(); tur = df_plan['turno'].where(df_plan['turno'] != '', '1').tolist()
+    oee_config = {lt: estado[f"l{lt[0]}_t{lt[1]}_oee"] for lt in estado["lineas_configuradas"]}
+    oee_linea = [oee_config.get(lt, 85) for lt in zip(lin, tur)]
+    oee_art = _enteros(_col(df_plan, 'oee_articulo'), oee_linea)
+    act_oee = _booleanos(_col(df_plan, 'act_oee_articulo', 'FALSE')).tolist()
+    # Columna opcional con las líneas en las que puede fabricarse cada artículo (para el balanceo)
+    permitidas = _col(df_plan, 'lineas_permitidas', '')
+    por_valor = {v: _lineas_permitidas(v) for v in permitidas.unique()}
+    columnas = zip(lin, tur, df_plan['nombre_cliente'].tolist(), _col(df_plan, 'nombre_articulo', '').tolist(),
+                   _booleanos(_col(df_plan, 'act_hora_entrada', 'FALSE')).tolist(), _enteros(_col(df_plan, 'barquetas_pedido'), 0),
+                   _enteros(_col(df_plan, 'velocidad_estimada'), 800), oee_linea, oee_art, act_oee, [por_valor[v] for v in permitidas.tolist()])
+
+    for linea_id, turno, cliente, nombre_art, act_hora, cantidad, velocidad, oee_l, oee_a, act_o, lineas_ok in columnas:
+        if not linea_id or not cliente: continue
+        key_lt = f"{linea_id}_{turno}"
+        clientes = clientes_por_linea_turno.get(key_lt)
+        if clientes is None: clientes = clientes_por_linea_turno[key_lt] = {}
+        c_data = clientes.get(cliente)
+        if c_data is None:
+            hora_obj = horas_por_cliente.get((linea_id, turno, cliente))
+            c_data = clientes[cliente] = {"nombre": cliente, "articulos": [], "hora_entrada": hora_obj, "tiene_hora": (hora_obj is not None) and act_hora}
+        if nombre_art:
+            art = {"nombre": nombre_art, "cantidad": cantidad, "velocidad": velocidad, "oee": oee_a if act_o else oee_l}
+            if lineas_ok: art['lineas_permitidas'] = lineas_ok
+            c_data['articulos'].append(art)
+
+    estado["plan_data"] = clientes_por_linea_turno
+    return estado
+
+# ==========================================
+# 2. DESCARGA, CACHÉ Y COPIA LOCAL
+# ==========================================
+_lock = threading.Lock()
+_parseados = {}   # hash contenido -> estado parseado
+_descargas = {}   # (url_config, url_plan) -> (instante, hash)
+_fallos = {}      # (url_config, url_plan) -> (instante del fallo, hash de la copia local servida)
+
+def hash_contenido(raw_config, raw_plan):
+    h = hashlib.sha256(); h.update(raw_config); h.update(b"\0"); h.update(raw_plan)
+    return h.hexdigest()
+
+def descargar(url, timeout=TIMEOUT_DESCARGA_SEG):
+    """Bytes de una URL http(s)/file o de una ruta local."""
+    if re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', url):
+        with urllib.request.urlopen(url, timeout=timeout) as resp: return resp.read()
+    with open(url, 'rb') as f: return f.read()
+
+def _ruta_snapshot(dir_snapshot, nombre):
+    return os.path.join(dir_snapshot, nombre)
+
+def _leer_meta(dir_snapshot):
+    try:
+        with open(_ruta_snapshot(dir_snapshot, "meta.json"), encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+def guardar_snapshot(raw_config, raw_plan, h, clave, dir_snapshot=DIR_SNAPSHOT):
+    """Guarda los CSV crudos (sólo si cambió el hash) y refresca la marca de tiempo."""
+    os.makedirs(dir_snapshot, exist_ok=True)
+    previo = _leer_meta(dir_snapshot)
+    if not previo or previo.get("hash") != h:
+        for nombre, raw in (("config.csv", raw_config), ("plan.csv", raw_plan)):
+            tmp = _ruta_snapshot(dir_snapshot, nombre + ".tmp")
+            with open(tmp, 'wb') as f: f.write(raw)
+            os.replace(tmp, _ruta_snapshot(dir_snapshot, nombre))
+    with open(_ruta_snapshot(dir_snapshot, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"hash": h, "guardado": time.time(), "urls": list(clave)}, f)
+
+def leer_snapshot(dir_snapshot=DIR_SNAPSHOT):
+    """(raw_config, raw_plan, meta) de la última descarga correcta, o None (sin copia o dañada)."""
+    meta = _leer_meta(dir_snapshot)
+    if not isinstance(meta, dict): return None
+    try:
+        with open(_ruta_snapshot(dir_snapshot, "config.csv"), 'rb') as f: raw_config = f.read()
+        with open(_ruta_snapshot(dir_snapshot, "plan.csv"), 'rb') as f: raw_plan = f.read()
+    except (OSError, ValueError): return None
+    # Ficheros a medio escribir o cambiados a mano: el hash no coincide con el guardado
+    if meta.get("hash") != hash_contenido(raw_config, raw_plan): return None
+    return raw_config, raw_plan, meta
+
+def _parseado(raw_config, raw_plan, h):
+    if h not in _parseados:
+        with medir("carga.parseo"): _parseados[h] = parsear_datos(raw_config, raw_plan)
+        while len(_parseados) > MAX_VERSIONES: _parseados.pop(next(iter(_parseados)))
+    return _parseados[h]
+
+def cargar_datos(url_config, url_plan, ttl=TTL_DATOS_SEG, forzar=False, dir_snapshot=DIR_SNAPSHOT, timeout=TIMEOUT_DESCARGA_SEG):
+    """Devuelve (estado, hash, origen); origen es 'cache', 'red', 'copia_local' o 'sin_conexion'.
+
+    Dentro del TTL no se toca la red. `forzar=True` (botón "Recargar datos") descarga
+    siempre. Si la descarga falla se sirve la última copia local buena de las mismas URLs, sin reintentar
+    durante `REINTENTO_SIN_CONEXION_SEG`. `estado` se comparte entre llamadas: no modificarlo.
+    """
+    clave = (url_config, url_plan); ahora = time.time()
+    with _lock:
+        if not forzar:
+            previo = _descargas.get(clave)
+            if previo and ahora - previo[0] < ttl and previo[1] in _parseados:
+                contar("carga.cache")
+                return _parseados[previo[1]], previo[1], 'cache'
+            fallo = _fallos.get(clave)
+            if fallo and ahora - fallo[0] < REINTENTO_SIN_CONEXION_SEG and fallo[1] in _parseados:
+                contar("carga.sin_conexion")
+                return _parseados[fallo[1]], fallo[1], 'sin_conexion'
+            # Arranque en frío: la copia local reciente evita esperar a la red
+            if previo is None:
+                snap = leer_snapshot(dir_snapshot)
+                if snap and snap[2].get("urls") == list(clave) and ahora - snap[2].get("guardado", 0) < ttl:
+                    h = hash_contenido(snap[0], snap[1])
+                    estado = _parseado(snap[0], snap[1], h)
+                    _descargas[clave] = (snap[2]["guardado"], h); contar("carga.copia_local")
+                    return estado, h, 'copia_local'
+
+    try:
+        with medir("carga.descarga"): raw_config = descargar(url_config, timeout); raw_plan = descargar(url_plan, timeout)
+    except OSError:
+        contar("carga.sin_conexion")
+        with _lock:
+            snap = leer_snapshot(dir_snapshot)
+            # Sólo la copia de estas mismas URLs: si la hoja ha cambiado, la copia es de otra hoja
+            if snap is None or snap[2].get("urls") != list(clave): raise
+            h = snap[2]["hash"]; estado = _parseado(snap[0], snap[1], h)
+            _fallos[clave] = (ahora, h)
+            return estado, h, 'sin_conexion'
+
+    contar("carga.bytes", len(raw_config) + len(raw_plan))
+    h = hash_contenido(raw_config, raw_plan)
+    with _lock:
+        estado = _parseado(raw_config, raw_plan, h)
+        _descargas[clave] = (ahora, h); _fallos.pop(clave, None)
+    try:
+        with medir("carga.copia_local"): guardar_snapshot(raw_config, raw_plan, h, clave, dir_snapshot)
+    except OSError: pass
+    return estado, h, 'red'
+
+def limpiar_cache():
+    with _lock: _parseados.clear(); _descargas.clear(); _fallos.clear()
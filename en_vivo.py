@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Modo en vivo: re-previsión del fin de turno a partir de los contadores reales.
+
+Los contadores llegan de un feed con lo producido (acumulado) por línea y artículo:
+un archivo CSV / JSON que se va ampliando y se lee por el final, o un socket UDP que
+hace de sustituto del sistema de planta. Con cada lectura se resta lo producido de
+la cola planificada y se simula sólo lo que queda, desde la hora actual y con el
+calendario restante. Únicamente se recalculan las líneas cuyos contadores han
+cambiado; las demás conservan su última previsión.
+
+Formato de cada registro (columnas CSV o claves JSON):
+    linea_id, turno (opcional, '1'), nombre_cliente (opcional), nombre_articulo,
+    producido (barquetas acumuladas del artículo) y hora (opcional, "HH:MM" u horas).
+"""
+import io
+import json
+import os
+import socket
+import time
+import weakref
+from collections import deque
+import pandas as pd
+from motor_simulacion import HORIZONTE_HORAS, EPS_PENDIENTE, simular_linea
+from utilidades import time_to_float, str_to_time, safe_get_int, float_to_time_str, fmt_num_es
+from perfilador import medir, contar
+
+# ==========================================
+# 1. LECTURA DEL FEED
+# ==========================================
+_ALIAS = {"linea": "linea_id", "cliente": "nombre_cliente", "articulo": "nombre_articulo", "barquetas_producidas": "producido", "cantidad": "producido"}
+
+def _hora_registro(v):
+    if v is None or v == "": return None
+    if isinstance(v, (int, float)): return float(v)
+    try: return float(str(v).replace(',', '.'))
+    except ValueError: pass
+    t = str_to_time(v)
+    return time_to_float(t) if t else None
+
+def normalizar_registro(d):
+    """Registro del feed con claves y tipos uniformes; None si le falta línea, artículo o cantidad."""
+    d = {_ALIAS.get(str(k).strip().lower(), str(k).strip().lower()): v for k, v in d.items()}
+    linea = str(d.get('linea_id', '')).split('.')[0].strip(); articulo = str(d.get('nombre_articulo', '')).strip()
+    if not linea or not articulo or d.get('producido') in (None, ""): return None
+    turno = str(d.get('turno') or '1').split('.')[0].strip() or '1'
+    cliente = str(d.get('nombre_cliente') or '').strip() or None
+    producido = d['producido'] if isinstance(d['producido'], (int, float)) else safe_get_int(d['producido'], 0)
+    return {"linea_id": linea, "turno": turno, "cliente": cliente, "articulo": articulo, "producido": float(producido), "hora": _hora_registro(d.get('hora'))}
+
+class LectorArchivo:
+    """Lee los registros nuevos de un archivo que otro proceso va ampliando.
+
+    `.csv` (con cabecera) y `.jsonl` se leen por el final, sólo las líneas completas nuevas;
+    `.json` (lista de registros o {"registros": [...]}) se relee entero cuando cambia.
+    Si el archivo se trunca o se sustituye, se vuelve a leer desde el principio.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta; self.posicion = 0; self.cabecera = None; self.firma = None
+
+    def leer(self):
+        try: info = os.stat(self.ruta)
+        except OSError: return []
+        if self.ruta.lower().endswith('.json'):
+            if self.firma == (info.st_mtime_ns, info.st_size): return []
+            self.firma = (info.st_mtime_ns, info.st_size)
+            with open(self.ruta, encoding='utf-8-sig') as f:
+                try: datos = json.load(f)
+                except ValueError: return []
+            datos = datos.get('registros', []) if isinstance(datos, dict) else datos
+            return [r for r in map(normalizar_registro, datos) if r]
+
+        if info.st_size < self.posicion: self.posicion = 0; self.cabecera = None
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.posicion); bloque = f.read()
+        fin = bloque.rfind(b"\n") + 1          # La última línea puede estar a medio escribir
+        if fin == 0: return []
+        self.posicion += fin
+        lineas = bloque[:fin].decode('utf-8-sig').splitlines()
+        if self.ruta.lower().endswith(('.jsonl', '.ndjson')):
+            registros = []
+            for l in lineas:
+                try: registros.append(json.loads(l))
+                except ValueError: continue
+        else:
+            if self.cabecera is None:
+                if not lineas: return []
+                self.cabecera = lineas.pop(0)
+            if not lineas: return []
+            df = pd.read_csv(io.StringIO("\n".join([self.cabecera] + lineas)), dtype=str, keep_default_na=False, on_bad_lines='skip')
+            df.columns = df.columns.str.strip()
+            registros = df.to_dict('records')
+        return [r for r in map(normalizar_registro, registros) if r]
+
+    def cerrar(self):
+        pass
+
+class LectorSocket:
+    """Sustituto del sistema de planta: recibe datagramas UDP con registros JSON (uno por línea).
+
+    Cada puerto tiene un único lector: en UDP dos sockets en el mismo puerto se repartirían
+    los datagramas, así que abrir un segundo lector falla. El socket se cierra con `cerrar`
+    o, si la sesión termina sin detener el seguimiento, cuando se descarta el lector.
+    """
+
+    def __init__(self, puerto, host="127.0.0.1"):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try: self.sock.bind((host, puerto))
+        except OSError: self.sock.close(); raise
+        self.sock.setblocking(False); self.puerto = self.sock.getsockname()[1]
+        self._cierre = weakref.finalize(self, self.sock.close)
+
+    def leer(self):
+        registros = []
+        while True:
+            try: datos, _ = self.sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError): break
+            except OSError: break
+            for l in datos.decode('utf-8', errors='replace').splitlines():
+                try: r = normalizar_registro(json.loads(l))
+                except (ValueError, AttributeError): continue
+                if r: registros.append(r)
+        return registros
+
+    def cerrar(self):
+        self._cierre()
+
+def enviar_registros(registros, puerto, host="127.0.0.1"):
+    """Envía registros al `LectorSocket` (para pruebas o como puente desde otro sistema)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.sendto("\n".join(json.dumps(r) for r in registros).encode('utf-8'), (host, puerto))
+
+# ==========================================
+# 2. CONTADORES Y RE-PREVISIÓN POR LÍNEA
+# ==========================================
+def hora_en_eje(h, inicio, ultima=None):
+    """Hora de reloj (0-24) llevada al eje de la simulación, que sigue tras la medianoche (25 = 01:00 del día siguiente).
+
+    Es la primera a partir de `inicio` (arranque del turno, con una hora de margen) y, si ya hay una
+    hora anterior (`ultima`), no queda más de 12 h por detrás de ella: así un turno que pasa la
+    medianoche sigue en 25, 26... aunque la planta arranque a las 06:00.
+    """
+    while h < inicio - 1: h += 24
+    if ultima is not None:
+        while h <= ultima - 12: h += 24
+    return h
+
+def cola_restante(queue, producido):
+    """Cola sin lo ya producido. `producido` = {(cliente, artículo): barquetas}; cliente None = cualquier cliente.
+
+    Lo producido de un artículo se descuenta de sus pedidos en el orden de la cola.
+    """
+    resto = dict(producido); cola = deque()
+    for job in queue:
+        clave = (job.cliente, job.articulo) if (job.cliente, job.articulo) in resto else (None, job.articulo)
+        hecho = min(resto.get(clave, 0.0), job.pendiente)
+        if clave in resto: resto[clave] -= hecho
+        if job.pendiente - hecho >= EPS_PENDIENTE: cola.append(job.copia(pendiente=job.pendiente - hecho))
+    return cola
+
+def reprever_linea(sim, producido, ahora, corte=None, fin_horizonte=None, paso=1.0):
+    """Simula lo que le queda a la línea desde `ahora`, sin modificar `sim`.
+
+    Devuelve {"fin", "pendiente", "estado"} con estado 'terminada', 'en_curso',
+    'cortada' (el T2 la interrumpe) o 'sin_terminar' (no acaba en el horizonte).
+    """
+    cola = cola_restante(sim['queue'], producido)
+    pendiente = sum(j.pendiente for j in cola)
+    if not cola: return {"fin": None, "pendiente": 0.0, "estado": 'terminada'}
+    if corte is not None and ahora >= corte: return {"fin": corte, "pendiente": pendiente, "estado": 'cortada'}
+    inicio = max(sim['start_time'], ahora)
+    fin_horizonte = fin_horizonte if fin_horizonte is not None else sim['start_time'] + HORIZONTE_HORAS
+    copia = dict(sim, queue=cola, start_time=inicio)
+    simular_linea(copia, ahora, corte, max(paso, fin_horizonte - ahora), paso)
+    if copia['interrupted']: estado = 'cortada'
+    elif copia['active']: estado = 'sin_terminar'
+    else: estado = 'en_curso'
+    return {"fin": copia['end_time'] if estado != 'sin_terminar' else None, "pendiente": pendiente, "estado": estado}
+
+class Contadores:
+    """Último acumulado conocido por (línea, turno) y (cliente, artículo)."""
+
+    def __init__(self):
+        self.valores = {}; self.horas = {}
+
+    def aplicar(self, registros):
+        """Incorpora los registros; devuelve las (línea, turno) cuyo acumulado ha cambiado."""
+        cambiadas = set()
+        for r in registros:
+            lt = (r['linea_id'], r['turno']); clave = (r['cliente'], r['articulo'])
+            por_linea = self.valores.setdefault(lt, {})
+            # Un artículo se cuenta con o sin cliente, no de las dos formas: manda el último registro
+            for otra in [k for k in por_linea if k[1] == r['articulo'] and (k[0] is None) != (r['cliente'] is None)]: del por_linea[otra]; cambiadas.add(lt)
+            if por_linea.get(clave) != r['producido']: por_linea[clave] = r['producido']; cambiadas.add(lt)
+            if r['hora'] is not None: self.horas[lt] = max(self.horas.get(lt, r['hora']), r['hora'])
+        return cambiadas
+
+    def de_linea(self, lt):
+        return self.valores.get(lt, {})
+
+# ==========================================
+# 3. PREVISIÓN DE LA PLANTA
+# ==========================================
+ESTADOS = {"terminada": "✅ Terminada", "en_curso": "🟢 En curso", "cortada": "✂️ Cortada por T2", "sin_terminar": "⚠️ No acaba"}
+
+class PrevisionEnVivo:
+    """Previsión de fin por línea y turno que se actualiza con cada lectura del feed."""
+
+    def __init__(self, sims, cortes=None, paso=1.0, horizonte=HORIZONTE_HORAS):
+        self.sims = {(s['id'], s['turno']): s for s in sims}; self.cortes = cortes or {}; self.paso = paso
+        self.origen = min((s['start_time'] for s in sims), default=0.0); self.fin_horizonte = self.origen + horizonte
+        self.contadores = Contadores(); self.prevision = {}; self.ahora = self.origen; self.lecturas = 0
+
+    def _corte(self, lt):
+        return self.cortes.get(lt[0]) if lt[1] == '1' else None
+
+    def actualizar(self, registros, ahora=None):
+        """Aplica los registros y recalcula sólo las líneas que han cambiado (o aún sin previsión).
+
+        `ahora` en horas del eje; por defecto la hora más reciente del feed o, si no trae horas, la del reloj.
+        Devuelve el conjunto de (línea, turno) recalculadas.
+        """
+        ultimas = dict(self.contadores.horas)
+        for r in registros:
+            if r['hora'] is None: continue
+            lt = (r['linea_id'], r['turno']); sim = self.sims.get(lt)
+            r['hora'] = hora_en_eje(r['hora'], sim['start_time'] if sim else self.origen, ultimas.get(lt))
+            ultimas[lt] = max(ultimas.get(lt, r['hora']), r['hora'])
+        cambiadas = self.contadores.aplicar(registros); self.lecturas += 1
+        if ahora is None:
+            horas = [r['hora'] for r in registros if r['hora'] is not None]
+            if horas: ahora = max(horas)
+            elif registros:
+                reloj = time.localtime(); ahora = hora_en_eje(reloj.tm_hour + reloj.tm_min / 60.0 + reloj.tm_sec / 3600.0, self.origen, self.ahora)
+        if ahora is not None: self.ahora = max(self.ahora, ahora)
+
+        pendientes = {lt for lt in self.sims if lt in cambiadas or lt not in self.prevision}
+        with medir("vivo.reprevision"):
+            for lt in pendientes:
+                sim = self.sims[lt]; producido = self.contadores.de_linea(lt)
+                # Sin contadores la línea sigue el plan desde su arranque
+                desde = self.ahora if producido else self.origen
+                p = reprever_linea(sim, producido, desde, self._corte(lt), self.fin_horizonte, self.paso)
+                # Lo producido que cuenta es lo descontado del plan (un mismo artículo puede llegar con y sin cliente)
+                p['real'] = sim['total_obj'] - p['pendiente']; p['hora'] = self.contadores.horas.get(lt)
+                if p['estado'] == 'terminada': p['fin'] = p['hora'] if p['hora'] is not None else self.ahora
+                self.prevision[lt] = p
+        contar("vivo.lineas_recalculadas", len(pendientes))
+        return pendientes
+
+    def fin_turno(self, turno):
+        fines = [p['fin'] for lt, p in self.prevision.items() if lt[1] == turno and p['fin'] is not None]
+        sin_fin = any(p['estado'] == 'sin_terminar' for lt, p in self.prevision.items() if lt[1] == turno)
+        return (max(fines) if fines else None), sin_fin
+
+    def totales(self, turno=None):
+        ps = [p for lt, p in self.prevision.items() if turno is None or lt[1] == turno]
+        return sum(p['real'] for p in ps), sum(p['pendiente'] for p in ps)
+
+    def tabla(self, recalculadas=()):
+        filas = []
+        for lt in sorted(self.prevision, key=lambda lt: (lt[1], lt[0])):
+            p = self.prevision[lt]; s = self.sims[lt]
+            filas.append({"Línea/Turno": f"L{lt[0]} (T{lt[1]})", "Producido real": fmt_num_es(p['real']), "Pendiente": fmt_num_es(round(p['pendiente'])),
+                          "Objetivo": fmt_num_es(s['total_obj']), "Fin previsto": float_to_time_str(p['fin']) if p['fin'] is not None else "-",
+                          "Estado": ESTADOS[p['estado']], "Último dato": float_to_time_str(p['hora']) if p['hora'] is not None else "-",
+                          "Recalculada": "🔄" if lt in recalculadas else ""})
+        return pd.DataFrame(filas)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Construcción de gráficos Altair y opciones de AgGrid, sin dibujar nada.
+
+Separado de la app para poder medir el coste de preparar cada gráfico o tabla
+(p.ej. desde `benchmarks/`) sin levantar un servidor de Streamlit.
+"""
+import altair as alt
+import pandas as pd
+from st_aggrid import GridOptionsBuilder
+
+# ==========================================
+# 1. GRÁFICOS
+# ==========================================
+def grafico_linea(df_h):
+    base = alt.Chart(df_h).encode(x=alt.X('Hora:O', axis=alt.Axis(labels=True, title='Hora')))
+    bar = base.mark_bar(color='#29b5e8').encode(y=alt.Y('Prod:Q', axis=alt.Axis(title='Prod/h', orient='left')), tooltip=['Hora', 'Prod'])
+    txt_bar = bar.mark_text(dy=-5, color='black').encode(text=alt.Text('Prod:Q', format=',.0f'))
+    line = base.mark_line(color='#ff8c00').encode(y=alt.Y('Acum:Q', axis=alt.Axis(title='Acum', orient='right')))
+    txt_line = line.mark_text(dy=-10, color='#e6550d').encode(text=alt.Text('Acum:Q', format=',.0f'))
+    return (bar + txt_bar + line + txt_line).resolve_scale(y='independent').properties(height=250)
+
+def grafico_global(df_g, color_bar, color_line, titulo):
+    base = alt.Chart(df_g).encode(x=alt.X('Hora:O', axis=alt.Axis(labels=True)))
+    bar = base.mark_bar(color=color_bar).encode(y=alt.Y('Prod:Q', axis=alt.Axis(title='Prod/h', orient='left')))
+    txt_b = bar.mark_text(dy=-5).encode(text=alt.Text('Prod:Q', format='.0f'))
+    line = base.mark_line(color=color_line).encode(y=alt.Y('Acum:Q', axis=alt.Axis(title='Total', orient='right')))
+    txt_l = line.mark_text(dy=-10, color=color_line).encode(text=alt.Text('Acum:Q', format='.0f'))
+    return (bar + txt_b + line + txt_l).resolve_scale(y='independent').properties(height=250, title=titulo)
+
+def grafico_comparacion(df_c, titulo):
+    """Acumulado de varias ejecuciones superpuesto; `df_c` en formato largo (Hora, Acum, Ejecución)."""
+    return alt.Chart(df_c).mark_line().encode(x=alt.X('Hora:Q', axis=alt.Axis(title='Hora')), y=alt.Y('Acum:Q', axis=alt.Axis(title='Total')),
+                                              color=alt.Color('Ejecución:N'), tooltip=['Ejecución', 'Hora', alt.Tooltip('Acum:Q', format=',.0f')]).properties(height=250, title=titulo)
+
+def grafico_evolucion(df_e):
+    """Total previsto de cada ejecución a lo largo del tiempo (Fecha, Total, Tipo)."""
+    return alt.Chart(df_e).mark_line(point=True).encode(x=alt.X('Fecha:T', axis=alt.Axis(title='Ejecución')), y=alt.Y('Total:Q', axis=alt.Axis(title='Barquetas')),
+                                                        color=alt.Color('Tipo:N'), tooltip=['Fecha:T', 'Tipo', alt.Tooltip('Total:Q', format=',.0f')]).properties(height=200)
+
+# ==========================================
+# 2. TABLAS
+# ==========================================
+def opciones_grid(df):
+    """`gridOptions` de AgGrid con el estilo común de todas las tablas de la app."""
+    gb = GridOptionsBuilder.from_dataframe(df)
+    gb.configure_default_column(resizable=True, filterable=True, sortable=True, editable=False, cellStyle={'textAlign': 'left'}, headerClass='ag-header-cell-label')
+    gb.configure_grid_options(domLayout='autoHeight')
+    return gb.build()
+
+def rejilla_agrupada(df, grupos, titulo_grupo=None, enterprise=False):
+    """(filas, `gridOptions`) de una rejilla con las filas agrupadas por las columnas `grupos` (en ese orden).
+
+    Sin `autoHeight`: con altura fija la rejilla es virtual y sólo dibuja las filas visibles.
+    Con `enterprise` (módulo de pago de AG Grid, necesita licencia) los grupos se pliegan; sin él,
+    las filas se ordenan por grupo y cada grupo se muestra sólo en su primera fila.
+    """
+    gb = GridOptionsBuilder.from_dataframe(df)
+    gb.configure_grid_options(animateRows=False, rowBuffer=10)
+    if enterprise:
+        gb.configure_default_column(resizable=True, filterable=True, sortable=True, editable=False, cellStyle={'textAlign': 'left'}, headerClass='ag-header-cell-label')
+        for g in grupos: gb.configure_column(g, rowGroup=True, hide=True)
+        gb.configure_grid_options(groupDefaultExpanded=0, autoGroupColumnDef={"headerName": titulo_grupo or " / ".join(grupos), "minWidth": 320})
+        return df, gb.build()
+
+    # Grupos en orden de aparición, cada uno dentro de su grupo padre; dentro del grupo se conserva el orden
+    orden = pd.DataFrame({i: df.groupby(grupos[:i + 1], sort=False).ngroup() for i in range(len(grupos))})
+    filas = df.loc[orden.sort_values(list(orden.columns), kind='stable').index].reset_index(drop=True)
+    nuevo = pd.Series(False, index=filas.index); previas = filas[grupos].shift()
+    for g in grupos:
+        nuevo |= filas[g].ne(previas[g])
+        filas[g] = filas[g].where(nuevo, "")
+    # Ordenar o filtrar desharía los bloques: la rejilla se muestra tal cual
+    gb.configure_default_column(resizable=True, filterable=False, sortable=False, editable=False, cellStyle={'textAlign': 'left'}, headerClass='ag-header-cell-label')
+    for g in grupos: gb.configure_column(g, pinned='left', minWidth=220, cellStyle={'textAlign': 'left', 'fontWeight': 'bold'})
+    return filas, gb.build()
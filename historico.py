@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Histórico persistente de ejecuciones (SQLite local, sin dependencias nuevas).
+
+Cada simulación terminada se guarda con la huella de sus entradas, el resumen por
+línea (lo que muestra "Resumen Global"), la tabla de pedidos de cada línea y las
+series de producción. Las previsiones del modo en vivo se guardan igual, sin
+series, para comparar plan frente a real. Después se puede cargar y comparar
+cualquier par de ejecuciones sin volver a simular.
+
+Las series se guardan en columna (un array float64 por línea y campo, comprimido
+como BLOB), así una ejecución ocupa unas pocas filas aunque tenga resolución de 5 minutos.
+Las tablas hijas usan la ejecución como prefijo de su clave primaria (WITHOUT
+ROWID), de modo que cargar una ejecución es una lectura contigua, y la tabla de
+ejecuciones está indexada por fecha y por plan para consultar semanas de histórico.
+Al guardar se borran las ejecuciones de más de DIAS_CONSERVAR días.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from motor_simulacion import historial_df, serie_turno
+from perfilador import medir, contar
+
+RUTA_HISTORICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".historico", "ejecuciones.sqlite")
+TIPOS = {"simulacion": "🚀 Simulación", "en_vivo": "📡 En vivo"}
+DIAS_CONSERVAR = 90   # Antigüedad máxima de las ejecuciones guardadas (None = sin límite)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id INTEGER PRIMARY KEY, creado REAL NOT NULL, tipo TEXT NOT NULL, etiqueta TEXT,
+    plan_hash TEXT, firma TEXT, paso REAL, activar_t2 INTEGER, origen REAL, fin REAL, total REAL);
+CREATE INDEX IF NOT EXISTS ejecuciones_creado ON ejecuciones(creado);
+CREATE INDEX IF NOT EXISTS ejecuciones_plan ON ejecuciones(plan_hash, creado);
+CREATE TABLE IF NOT EXISTS lineas (
+    ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id) ON DELETE CASCADE, linea TEXT NOT NULL, turno TEXT NOT NULL,
+    inicio REAL, objetivo REAL, producido REAL, pendiente REAL, horas_netas REAL, horas_descanso REAL,
+    fin REAL, cortada INTEGER, estado TEXT, pedidos BLOB,
+    PRIMARY KEY (ejecucion, linea, turno)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id) ON DELETE CASCADE, linea TEXT NOT NULL, turno TEXT NOT NULL,
+    hora BLOB, prod BLOB, acum BLOB,
+    PRIMARY KEY (ejecucion, linea, turno)) WITHOUT ROWID;
+"""
+GLOBAL = ""   # `linea` de las series globales de cada turno
+
+_lock = threading.Lock()
+_listas = set()   # rutas con el esquema ya creado en este proceso
+
+# ==========================================
+# 1. CONEXIÓN
+# ==========================================
+def conectar(ruta=None):
+    """Conexión a la base del histórico (la crea con su esquema la primera vez)."""
+    ruta = ruta or RUTA_HISTORICO
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    con = sqlite3.connect(ruta, timeout=30)
+    con.execute("PRAGMA foreign_keys = ON")
+    if ruta not in _listas:
+        with _lock:
+            # WAL: las sesiones pueden leer el histórico mientras otra guarda una ejecución
+            con.execute("PRAGMA journal_mode = WAL"); con.executescript(_ESQUEMA); _listas.add(ruta)
+    return con
+
+def _blob(a):
+    return zlib.compress(np.ascontiguousarray(a, dtype=np.float64).tobytes(), 1)
+
+def _array(b):
+    return np.frombuffer(zlib.decompress(b), dtype=np.float64) if b else np.zeros(0)
+
+# ==========================================
+# 2. GUARDAR
+# ==========================================
+def _fin_linea(s):
+    return s['end_time'] if s['end_time'] else s['start_time'] + s['horas_netas'] + s['horas_descanso']
+
+def _insertar(con, tipo, lineas, series=(), etiqueta=None, plan_hash=None, firma=None, paso=None, activar_t2=False, origen=None, fin=None, total=None):
+    cur = con.execute("INSERT INTO ejecuciones (creado, tipo, etiqueta, plan_hash, firma, paso, activar_t2, origen, fin, total) VALUES (?,?,?,?,?,?,?,?,?,?)",
+                      (time.time(), tipo, etiqueta, plan_hash, firma, paso, int(bool(activar_t2)), origen, fin, total))
+    eid = cur.lastrowid
+    con.executemany("INSERT INTO lineas VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", [(eid,) + f for f in lineas])
+    con.executemany("INSERT INTO series VALUES (?,?,?,?,?,?)", [(eid,) + f for f in series])
+    contar("historico.lineas_guardadas", len(lineas))
+    # Después de insertar: la ejecución más reciente sigue existiendo y SQLite no reutiliza ids
+    if DIAS_CONSERVAR is not None: borrar_anteriores(DIAS_CONSERVAR, con=con)
+    return eid
+
+def guardar_simulacion(resultado, plan_hash=None, firma=None, activar_t2=False, etiqueta=None, ruta=None):
+    """Guarda el resultado de `simular_planta`; devuelve el id de la ejecución."""
+    sims = resultado['sims']; acum = resultado['acum']
+    with medir("historico.guardar"):
+        lineas = []; series = []
+        for s in sims:
+            pedidos = zlib.compress(s['resumen_tabla'].to_json(orient='records', force_ascii=False).encode(), 1) if not s['resumen_tabla'].empty else None
+            pendiente = max(0.0, s['total_obj'] - s['producido'])
+            estado = "cortada" if s['interrupted'] else ("sin_terminar" if s['active'] else "terminada")
+            lineas.append((str(s['id']), s['turno'], s['start_time'], s['total_obj'], float(s['producido']), pendiente, s['horas_netas'], s['horas_descanso'], _fin_linea(s), int(s['interrupted']), estado, pedidos))
+            h = historial_df(s)
+            series.append((str(s['id']), s['turno'], _blob(h['Hora']), _blob(h['Prod']), _blob(h['Acum'])))
+        for t in acum:
+            g = serie_turno(resultado, t)
+            series.append((GLOBAL, t, _blob(g['Hora']), _blob(g['Prod']), _blob(g['Acum'])))
+        total = float(sum(a[-1] for a in acum.values() if len(a)))
+        with conectar(ruta) as con:
+            eid = _insertar(con, "simulacion", lineas, series, etiqueta, plan_hash, None if firma is None else repr(firma), resultado['paso'], activar_t2, resultado['origen'], resultado['fin'], total)
+        con.close()
+    return eid
+
+def guardar_prevision(prevision, plan_hash=None, activar_t2=False, etiqueta=None, ruta=None):
+    """Guarda el estado de un `en_vivo.PrevisionEnVivo` (real + previsión por línea); devuelve el id."""
+    with medir("historico.guardar"):
+        lineas = []
+        for (lid, turno), p in sorted(prevision.prevision.items()):
+            s = prevision.sims[(lid, turno)]
+            lineas.append((str(lid), turno, s['start_time'], s['total_obj'], float(p['real']), float(p['pendiente']), None, None, p['fin'], int(p['estado'] == 'cortada'), p['estado'], None))
+        fines = [f[8] for f in lineas if f[8] is not None]
+        with conectar(ruta) as con:
+            eid = _insertar(con, "en_vivo", lineas, (), etiqueta, plan_hash, None, prevision.paso, activar_t2, prevision.origen, max(fines) if fines else None, sum(f[4] for f in lineas))
+        con.close()
+    return eid
+
+def borrar_anteriores(dias, ruta=None, con=None):
+    """Borra las ejecuciones de hace más de `dias` días (con sus líneas y series); devuelve cuántas.
+
+    Con `con`, el borrado va en la transacción de esa conexión.
+    """
+    if con is not None: return con.execute("DELETE FROM ejecuciones WHERE creado < ?", (time.time() - dias * 86400,)).rowcount
+    with conectar(ruta) as con:
+        n = borrar_anteriores(dias, con=con)
+    con.close()
+    return n
+
+# ==========================================
+# 3. CONSULTAS
+# ==========================================
+def _a_epoch(d):
+    if d is None or isinstance(d, (int, float)): return d
+    if not isinstance(d, datetime.datetime): d = datetime.datetime.combine(d, datetime.time())
+    return d.timestamp()
+
+def listar_ejecuciones(desde=None, hasta=None, tipo=None, plan_hash=None, limite=500, ruta=None):
+    """Ejecuciones entre `desde` y `hasta` (fechas o epoch; `hasta` excluido), de la más reciente a la más antigua."""
+    sql = "SELECT id, creado, tipo, etiqueta, plan_hash, paso, activar_t2, origen, fin, total, (SELECT COUNT(*) FROM lineas l WHERE l.ejecucion = e.id) AS lineas FROM ejecuciones e WHERE 1=1"
+    args = []
+    for cond, v in (("creado >= ?", _a_epoch(desde)), ("creado < ?", _a_epoch(hasta)), ("tipo = ?", tipo), ("plan_hash = ?", plan_hash)):
+        if v is not None: sql += f" AND {cond}"; args.append(v)
+    sql += " ORDER BY creado DESC LIMIT ?"; args.append(limite)
+    with medir("historico.consulta"):
+        con = conectar(ruta)
+        try: df = pd.read_sql_query(sql, con, params=args)
+        finally: con.close()
+    df['fecha'] = df['creado'].map(datetime.datetime.fromtimestamp)
+    return df
+
+def cargar_ejecucion(eid, ruta=None):
+    """Ejecución guardada: {"meta", "lineas" (DataFrame), "series" {(linea, turno): DataFrame Hora/Prod/Acum}}.
+
+    Las series globales de cada turno tienen `linea` = `GLOBAL`. None si no existe.
+    """
+    with medir("historico.carga"):
+        con = conectar(ruta); con.row_factory = sqlite3.Row
+        try:
+            meta = con.execute("SELECT * FROM ejecuciones WHERE id = ?", (eid,)).fetchone()
+            if meta is None: return None
+            lineas = pd.read_sql_query("SELECT * FROM lineas WHERE ejecucion = ? ORDER BY turno, CAST(linea AS INTEGER), linea", con, params=(eid,))
+            series = {(r['linea'], r['turno']): pd.DataFrame({"Hora": _array(r['hora']), "Prod": _array(r['prod']), "Acum": _array(r['acum'])})
+                      for r in con.execute("SELECT linea, turno, hora, prod, acum FROM series WHERE ejecucion = ?", (eid,))}
+        finally: con.close()
+    return {"meta": dict(meta), "lineas": lineas, "series": series}
+
+def comparar_ejecuciones(a, b):
+    """Una fila por línea/turno con producción, pendiente y hora de fin de `a` y `b` y sus diferencias (b − a)."""
+    cols = ['linea', 'turno', 'objetivo', 'producido', 'pendiente', 'fin', 'estado']
+    df = a['lineas'][cols].merge(b['lineas'][cols], on=['linea', 'turno'], how='outer', suffixes=('_a', '_b'))
+    df['dif_producido'] = df['producido_b'] - df['producido_a']
+    df['dif_fin_min'] = (df['fin_b'] - df['fin_a']) * 60
+    return df.sort_values(['turno', 'linea'], key=lambda c: pd.to_numeric(c, errors='coerce') if c.name == 'linea' else c, ignore_index=True)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Planificación de varios días con cualquier número de turnos por línea.
+
+Cada línea encadena sus turnos por orden de inicio: día (columna opcional `dia` de la
+configuración, 1 = primer día) y `hora_inicio`. Sin columna `dia`, los turnos siguen
+el orden de su número y uno que empieza antes que el anterior pasa al día siguiente
+(turno de noche). Un turno termina cuando empieza el siguiente de la misma línea o,
+con la columna opcional `horas_turno`, al cumplir esa duración. Lo que queda sin
+hacer al terminar un turno (el pedido en curso y los no empezados) pasa al principio
+de la cola del siguiente turno de la línea, en lugar de quedar "(Cortado)".
+
+Cada turno se simula con el motor por eventos hasta su corte (no hay tramos horarios
+que recorrer) y en la hora local de su día, de modo que la hora de entrada de los
+clientes se aplica al día del turno. Las historias se suman después en la rejilla
+global del horizonte. Con un solo día, sin arrastre y con `holgura` = hora del primer
+arranque + 24 (las 48 h de `simular_planta` desde ese arranque), el resultado es el
+de `simular_planta` con T1 y T2; con otra holgura sólo cambian las líneas que no
+terminan, que siguen hasta el final de este horizonte.
+"""
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+from motor_simulacion import n_tramos, simulacion_desde_estado, simular_linea
+from utilidades import time_to_float, float_to_time_str, fmt_num_es
+from perfilador import medir, contar
+
+HOLGURA_HORAS = 24.0   # Tiempo tras el último día con turnos para que el último turno de cada línea termine
+ESTADOS = {"terminada": "✅ Terminada", "arrastrada": "➡️ Pasa al siguiente turno", "cortada": "✂️ Cortada", "sin_terminar": "⚠️ No acaba", "vacia": "➖ Sin carga"}
+
+# ==========================================
+# 1. CALENDARIO DE TURNOS
+# ==========================================
+def _orden_turno(turno):
+    return (0, int(turno), turno) if turno.isdigit() else (1, 0, turno)
+
+def turnos_de_estado(estado):
+    """{linea_id: [(inicio, turno, dia, fin)]} con horas absolutas (0 = 00:00 del día 1), por orden de inicio.
+
+    `fin` es el inicio del siguiente turno de la línea, el fin de `horas_turno` si es antes,
+    o None para el último turno sin duración (sigue hasta el final del horizonte).
+    """
+    por_linea = {}
+    for lid, turno in estado.get('lineas_configuradas', []):
+        pref = f"l{lid}_t{turno}_"; h = estado.get(f"{pref}hora_inicio")
+        if h: por_linea.setdefault(lid, []).append([time_to_float(h), turno, estado.get(f"{pref}dia"), estado.get(f"{pref}horas_turno")])
+    res = {}
+    for lid, ts in por_linea.items():
+        if any(t[2] for t in ts):
+            for t in ts: t[2] = t[2] or 1; t[0] += 24 * (t[2] - 1)
+        else:
+            ts.sort(key=lambda t: _orden_turno(t[1])); desfase = 0.0; previo = None
+            for t in ts:
+                if previo is not None and t[0] + desfase <= previo: desfase += 24
+                t[0] += desfase; t[2] = int(t[0] // 24) + 1; previo = t[0]
+        ts.sort(key=lambda t: t[0])
+        res[lid] = [(ini, turno, dia, min([f for f in ((ts[i + 1][0] if i + 1 < len(ts) else None), (ini + horas if horas else None)) if f is not None], default=None))
+                    for i, (ini, turno, dia, horas) in enumerate(ts)]
+    return res
+
+# ==========================================
+# 2. SIMULACIÓN DEL HORIZONTE
+# ==========================================
+def _arrastre(sim):
+    # Pedido a medias y pedidos sin empezar, en su orden
+    return ([sim['current_job']] if sim['current_job'] else []) + list(sim['queue'])
+
+def planificar_horizonte(estado, paso=1.0, arrastrar=True, holgura=HOLGURA_HORAS, progreso=None):
+    """Simula todos los turnos de todas las líneas del horizonte, con arrastre de lo pendiente.
+
+    Devuelve "t" (hora absoluta de fin de cada tramo global), "prod" y "acum" de la planta,
+    "prod_turno" por número de turno, "turnos" (DataFrame con una fila por línea y turno)
+    y "sims" (las simulaciones de cada turno, con sus horas en la hora local de su día).
+    """
+    calendario = turnos_de_estado(estado)
+    todos = [t for ts in calendario.values() for t in ts]
+    if not todos: return {"origen": None, "fin": None, "paso": paso, "t": np.zeros(0), "prod": np.zeros(0), "acum": np.zeros(0), "prod_turno": {}, "turnos": pd.DataFrame(), "sims": []}
+    origen = min(t[0] for t in todos)
+    fin_h = 24 * max(t[2] for t in todos) + holgura
+    # Horizonte hasta `h` en tramos enteros desde el origen: la rejilla global y la de cada turno se miden igual
+    hasta_tramo = lambda h: math.ceil(round((h - origen) / paso, 9)) * paso
+    n = n_tramos(hasta_tramo(fin_h), paso)
+    prod = np.zeros(n); prod_turno = {}; filas = []; sims = []
+
+    with medir("horizonte.turnos"):
+        for i, (lid, ts) in enumerate(calendario.items()):
+            pendiente = []; desfase_previo = 0.0
+            for inicio, turno, dia, fin in ts:
+                sim = simulacion_desde_estado(estado, lid, turno, permitir_vacia=True, con_resumen=False)
+                desfase = 24.0 * (dia - 1)
+                objetivo = sim['total_obj']; entra = sum(j.pendiente for j in pendiente)
+                if pendiente:
+                    # Un cliente que entraba otro día ya está: sólo se mantiene su hora si el turno es del mismo día
+                    if desfase > desfase_previo: pendiente = [j.copia(hora_entrada=0.0) if j.hora_entrada else j for j in pendiente]
+                    pendiente.extend(sim['queue']); sim['queue'] = deque(pendiente); sim['total_obj'] += entra
+                fila = {"linea_id": lid, "turno": turno, "dia": dia, "inicio": inicio, "corte": fin, "objetivo": objetivo, "arrastre_entrada": entra}
+                if not sim['queue']:
+                    filas.append(dict(fila, fin=None, producido=0.0, arrastre_salida=0.0, pendiente=0.0, horas_netas=0.0, horas_descanso=0.0, estado="vacia"))
+                    pendiente = []; desfase_previo = desfase; continue
+
+                # Rejilla global desplazada al día del turno, sólo hasta el primer tramo que pasa el corte
+                hasta = fin_h if fin is None else min(fin_h, fin + paso)
+                contar("simulacion.pedidos", len(sim['queue']))
+                simular_linea(sim, origen - desfase, None if fin is None else fin - desfase, hasta_tramo(hasta), paso)
+                sim.update({"dia": dia, "desfase": desfase})
+                h = sim['historial']
+                np.add.at(prod, h['k'], h['prod']); np.add.at(prod_turno.setdefault(turno, np.zeros(n)), h['k'], h['prod'])
+
+                sin_hacer = sum(j.pendiente for j in _arrastre(sim))
+                fin_sim = sim['end_time'] if sim['end_time'] else sim['start_time'] + sim['horas_netas'] + sim['horas_descanso']
+                if sim['interrupted']: estado_t = "arrastrada" if arrastrar else "cortada"
+                else: estado_t = "sin_terminar" if sim['active'] else "terminada"
+                pendiente = _arrastre(sim) if estado_t == "arrastrada" else []; desfase_previo = desfase
+                filas.append(dict(fila, fin=fin_sim + desfase, producido=sim['producido'], arrastre_salida=sin_hacer if pendiente else 0.0,
+                                  pendiente=0.0 if pendiente else sin_hacer, horas_netas=sim['horas_netas'], horas_descanso=sim['horas_descanso'], estado=estado_t))
+                sims.append(sim)
+            if progreso: progreso((i + 1) / len(calendario))
+
+    t = np.round(origen + paso * np.arange(1, n + 1), 6)
+    return {"origen": origen, "fin": fin_h, "paso": paso, "t": t, "prod": prod, "acum": np.round(np.cumsum(prod), 6),
+            "prod_turno": prod_turno, "turnos": pd.DataFrame(filas), "sims": sims}
+
+# ==========================================
+# 3. TABLAS
+# ==========================================
+def hora_dia(h):
+    """Hora absoluta del horizonte como "D2 14:00"."""
+    dia = int(h // 24); return f"D{dia + 1} {float_to_time_str(h - 24 * dia)}"
+
+def resumen_turnos(res):
+    """Una fila por día y turno: inicio, fin, objetivo, arrastre y producción de todas sus líneas."""
+    df = res['turnos']
+    if df.empty: return pd.DataFrame()
+    g = df.groupby(['dia', 'turno'], sort=False).agg(inicio=('inicio', 'min'), fin=('fin', 'max'), lineas=('linea_id', 'count'), objetivo=('objetivo', 'sum'),
+                                                    entrada=('arrastre_entrada', 'sum'), producido=('producido', 'sum'), salida=('arrastre_salida', 'sum'), pendiente=('pendiente', 'sum'))
+    g = g.reset_index().sort_values(['dia', 'inicio'])
+    return pd.DataFrame({"Día": g['dia'], "Turno": "T" + g['turno'], "Inicio": g['inicio'].map(hora_dia), "Fin": g['fin'].map(lambda v: "-" if pd.isna(v) else hora_dia(v)),
+                         "Líneas": g['lineas'], "Objetivo": g['objetivo'].map(fmt_num_es), "Arrastre recibido": g['entrada'].round().map(fmt_num_es),
+                         "Producido": g['producido'].round().map(fmt_num_es), "Pasa al siguiente": g['salida'].round().map(fmt_num_es), "Sin terminar": g['pendiente'].round().map(fmt_num_es)})
+
+def tabla_lineas(res):
+    """Detalle por línea y turno, con el día y el turno como grupos."""
+    df = res['turnos']
+    if df.empty: return pd.DataFrame()
+    df = df.sort_values(['inicio', 'linea_id'], key=lambda c: pd.to_numeric(c, errors='coerce') if c.name == 'linea_id' else c)
+    return pd.DataFrame({"Día / Turno": "Día " + df['dia'].astype(str) + " · T" + df['turno'], "Línea": "L" + df['linea_id'], "Inicio": df['inicio'].map(hora_dia),
+                         "Fin": df['fin'].map(lambda v: "-" if pd.isna(v) else hora_dia(v)), "Objetivo": df['objetivo'].map(fmt_num_es),
+                         "Arrastre recibido": df['arrastre_entrada'].round().map(fmt_num_es), "Producido": df['producido'].round().map(fmt_num_es),
+                         "Pasa al siguiente": df['arrastre_salida'].round().map(fmt_num_es), "Horas Netas": df['horas_netas'].map(lambda v: fmt_num_es(round(v, 2))),
+                         "Estado": df['estado'].map(ESTADOS)})
+
+def serie_horizonte(res, resolucion=None):
+    """Serie global (Hora, Prod, Acum) con la hora como "D2 14:00", agregada en bloques de `resolucion` horas."""
+    t, prod, acum = res['t'], res['prod'], res['acum']
+    if resolucion and resolucion > res['paso'] + 1e-9 and len(t):
+        m = int(round(resolucion / res['paso'])); inicio = np.arange(0, len(t), m); ultimo = np.minimum(inicio + m, len(t)) - 1
+        prod = np.round(np.add.reduceat(prod, inicio), 6); acum = acum[ultimo]; t = t[ultimo]
+    hay = np.flatnonzero(prod > 0)
+    if len(hay): t, prod, acum = t[:hay[-1] + 1], prod[:hay[-1] + 1], acum[:hay[-1] + 1]
+    return pd.DataFrame({"Hora": [hora_dia(h) for h in t], "Prod": prod, "Acum": acum})
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Simulación por lotes desde la línea de comandos, sin Streamlit.
+
+Simula muchos planes (CSV de plan con su CSV de configuración de líneas) con el
+mismo motor que el botón "EJECUTAR SIMULACIÓN" y escribe el "Resumen Global" de
+cada uno: una fila por plan y línea/turno y otra por plan con el total de la planta
+("Barquetas Totales", "Horas Netas", "Hora Fin"). Los planes se reparten entre
+procesos; cada proceso lee y simula sus ficheros, así que sólo viajan rutas y filas.
+
+Cada plan se identifica por su ruta relativa a la carpeta común de todos los planes
+(`2024-05-01.csv`, o `norte/2024-05-01.csv` y `sur/2024-05-01.csv` si hay dos con el
+mismo nombre). Con `--config` como directorio, cada plan usa la configuración con ese
+mismo nombre relativo o, si no existe, con el mismo nombre de fichero (p.ej.
+`config/2024-05-01.csv` con `planes/2024-05-01.csv`).
+
+Uso:
+    python lotes.py --config config_lineas.csv planes/ --salida resumen.csv
+    python lotes.py --config config/ planes/ --t2 --resolucion-min 15 --salida resumen.parquet
+    python lotes.py --config config_lineas.csv plan_a.csv plan_b.csv --salida resumen.json --procesos 4
+
+Escribe `resumen.<ext>` (líneas) y `resumen_global.<ext>` (plantas); el formato sale
+de la extensión: .csv, .json o .parquet (éste necesita pyarrow).
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from carga_datos import parsear_datos
+from motor_simulacion import simulaciones_desde_estado, simular_planta, resumen_planta
+from utilidades import float_to_time_str
+
+FORMATOS = (".csv", ".json", ".parquet")
+
+# ==========================================
+# 1. ENTRADAS
+# ==========================================
+def _csvs(ruta):
+    if os.path.isdir(ruta): return sorted(os.path.join(ruta, f) for f in os.listdir(ruta) if f.lower().endswith(".csv"))
+    return [ruta]
+
+def nombres_planes(rutas):
+    """Nombre de cada plan: su ruta relativa a la carpeta común, así dos `plan.csv` de carpetas distintas no se pisan."""
+    if not rutas: return []
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in rutas])
+    return [os.path.relpath(os.path.abspath(p), base).replace(os.sep, "/") for p in rutas]
+
+def emparejar(config, planes):
+    """[(ruta_config, ruta_plan, nombre)] de cada plan; los directorios se expanden a sus .csv."""
+    rutas = list(dict.fromkeys(p for r in planes for p in _csvs(r)))
+    nombres = nombres_planes(rutas)
+    if not os.path.isdir(config): return [(config, p, n) for p, n in zip(rutas, nombres)]
+    pares = []
+    for p, n in zip(rutas, nombres):
+        c = os.path.join(config, *n.split("/"))
+        if not os.path.exists(c): c = os.path.join(config, os.path.basename(p))
+        if not os.path.exists(c): raise FileNotFoundError(f"No hay configuración {c} para el plan {p}")
+        pares.append((c, p, n))
+    return pares
+
+# ==========================================
+# 2. SIMULACIÓN DE UN PLAN
+# ==========================================
+def simular_plan(ruta_config, ruta_plan, activar_t2=False, paso=1.0, nombre=None):
+    """(filas por línea/turno, fila global) del plan; la fila global lleva "Error" si no se pudo simular."""
+    plan = nombre or os.path.basename(ruta_plan); t0 = time.perf_counter()
+    try:
+        with open(ruta_config, 'rb') as f: raw_config = f.read()
+        with open(ruta_plan, 'rb') as f: raw_plan = f.read()
+        sims, cortes = simulaciones_desde_estado(parsear_datos(raw_config, raw_plan), activar_t2, con_resumen=False)
+        # Cada plan se simula una sola vez: la caché de líneas sólo ocuparía memoria en el proceso
+        *lineas, g = resumen_planta(simular_planta(sims, cortes, paso=paso, cache=False))
+    except Exception as e:
+        return [], {"Plan": plan, "Líneas": 0, "Barquetas Totales": None, "Horas Netas": None, "Hora Fin": None, "Fin (h)": None, "Segundos": time.perf_counter() - t0, "Error": f"{type(e).__name__}: {e}"}
+    filas = [{"Plan": plan, "Línea": str(f['linea_id']), "Turno": f['turno'], "Barquetas Totales": f['producido'], "Horas Netas": f['horas_netas'], "Horas Descanso": f['horas_descanso'],
+              "Hora Fin": float_to_time_str(f['fin']), "Fin (h)": f['fin'], "Cortado": f['cortada']} for f in lineas]
+    return filas, {"Plan": plan, "Líneas": len(lineas), "Barquetas Totales": g['producido'], "Horas Netas": g['horas_netas'], "Hora Fin": float_to_time_str(g['fin']) if g['fin'] else None,
+                   "Fin (h)": g['fin'], "Segundos": time.perf_counter() - t0, "Error": None}
+
+def _simular_par(args):
+    return simular_plan(*args)
+
+def simular_lote(pares, activar_t2=False, paso=1.0, procesos=None):
+    """(DataFrame por línea, DataFrame global) de todos los planes, en el orden de `pares`."""
+    tareas = [(c, p, activar_t2, paso, n) for c, p, n in pares]
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos <= 1: resultados = [_simular_par(t) for t in tareas]
+    else:
+        # Bloques de varios planes por envío: con cientos de planes pequeños pesa más el ir y venir que la simulación
+        with ProcessPoolExecutor(max_workers=procesos) as pool: resultados = list(pool.map(_simular_par, tareas, chunksize=max(1, len(tareas) // (4 * procesos))))
+    lineas = pd.DataFrame([f for filas, _ in resultados for f in filas], columns=["Plan", "Línea", "Turno", "Barquetas Totales", "Horas Netas", "Horas Descanso", "Hora Fin", "Fin (h)", "Cortado"])
+    return lineas, pd.DataFrame([g for _, g in resultados])
+
+# ==========================================
+# 3. SALIDA
+# ==========================================
+def escribir(df, ruta):
+    ext = os.path.splitext(ruta)[1].lower()
+    if ext == ".csv": df.to_csv(ruta, index=False)
+    elif ext == ".json": df.to_json(ruta, orient='records', force_ascii=False, indent=1)
+    elif ext == ".parquet": df.to_parquet(ruta, index=False)
+    else: raise ValueError(f"Formato no soportado: {ext} (usa {', '.join(FORMATOS)})")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("planes", nargs="+", help="CSV de plan o directorios con CSV de plan")
+    ap.add_argument("--config", required=True, help="CSV de configuración de líneas, o directorio con una por plan (mismo nombre)")
+    ap.add_argument("--salida", default="resumen.csv", help=f"Fichero de líneas ({', '.join(FORMATOS)}); el global se escribe junto a él con sufijo _global")
+    ap.add_argument("--t2", action="store_true", help="Activar el Turno 2 (corta el T1 de cada línea)")
+    ap.add_argument("--resolucion-min", type=int, default=60, help="Duración del tramo simulado en minutos")
+    ap.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    args = ap.parse_args(argv)
+
+    base, ext = os.path.splitext(args.salida)
+    if ext.lower() not in FORMATOS: ap.error(f"formato de salida no soportado: {ext or '(sin extensión)'}")
+    if args.resolucion_min <= 0: ap.error("--resolucion-min debe ser mayor que 0")
+    if args.procesos is not None and args.procesos <= 0: ap.error("--procesos debe ser mayor que 0")
+    try: pares = emparejar(args.config, args.planes)
+    except FileNotFoundError as e: ap.error(str(e))
+    if not pares: ap.error("no hay planes que simular")
+
+    t0 = time.perf_counter()
+    lineas, plantas = simular_lote(pares, args.t2, args.resolucion_min / 60.0, args.procesos)
+    escribir(lineas, args.salida); escribir(plantas, f"{base}_global{ext}")
+    errores = plantas['Error'].notna().sum()
+    print(f"{len(pares)} planes, {len(lineas)} líneas/turno en {time.perf_counter() - t0:.2f} s -> {args.salida}, {base}_global{ext}")
+    for r in plantas[plantas['Error'].notna()].itertuples(): print(f"  ❌ {r.Plan}: {r.Error}", file=sys.stderr)
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Barridos Monte Carlo (what-if) sobre la incertidumbre de OEE y velocidad.
+
+Cada escenario es una copia perturbada del plan construido por `crear_simulacion`.
+La rejilla de tramos de cada línea (inicio, descansos, corte por T2) no depende
+de OEE ni velocidades, así que se calcula una vez; en cada bloque de escenarios
+los pedidos se colocan sobre ella con NumPy para todas las repeticiones a la vez,
+con la misma lógica que `motor_simulacion`. Los bloques se reparten en un pool de
+procesos y el resultado son percentiles P50/P90/P99 por línea y por turno.
+
+Los procesos se arrancan con "spawn": el servidor de Streamlit tiene hilos y hacer
+`fork` de un proceso con hilos puede dejar el hijo bloqueado en un lock heredado.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from motor_simulacion import HORIZONTE_HORAS, EPS_PENDIENTE, rejilla_linea
+
+PERCENTILES = (50, 90, 99)
+TAM_BLOQUE = 1000
+
+# ==========================================
+# 1. MODELO COMPACTO POR LÍNEA
+# ==========================================
+def _espera(hora_entrada, actual):
+    # Misma condición que el motor: el pedido no puede empezar antes de la entrada del cliente
+    return (hora_entrada > (actual % 24)) & (actual < 24)
+
+def modelo_linea(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Arrays de la rejilla y de los pedidos de una línea, listos para enviar a otro proceso."""
+    tramos, cum, k_corte, n_max = rejilla_linea(sim, origen, corte, horizonte, paso)
+    t_start = np.array([tr[1] for tr in tramos]); t_end = np.array([tr[2] for tr in tramos])
+    desc = np.array([tr[3] for tr in tramos]); neto = np.array([tr[4] for tr in tramos])
+    jobs = list(sim['queue'])
+    h = np.array([j.hora_entrada for j in jobs], dtype=float)
+    # Para cada hora de entrada: primer tramo >= i con producción en el que ya no hay espera
+    liberacion = {}
+    for he in set(h.tolist()):
+        rel = np.full(len(tramos) + 1, len(tramos), dtype=np.int64)
+        for i in range(len(tramos) - 1, -1, -1):
+            rel[i] = i if (neto[i] > 0 and not _espera(he, t_start[i] + desc[i])) else rel[i + 1]
+        liberacion[he] = rel
+    return {"id": sim['id'], "turno": sim['turno'], "t_start": t_start, "t_end": t_end, "desc": desc, "cum": np.array(cum),
+            "cortado": k_corte < n_max, "corte": corte, "cant": np.array([j.pendiente for j in jobs], dtype=float),
+            "velocidad": np.array([j.velocidad for j in jobs], dtype=float),
+            "oee": np.array([j.oee for j in jobs], dtype=float), "articulo": [j.articulo for j in jobs],
+            "h": h, "liberacion": liberacion}
+
+def simular_vectorizado(m, vel, extra=None):
+    """Simula `R` escenarios de una línea a la vez. `vel` y `extra` (horas de parada) son (R, J).
+
+    Devuelve (fin, producido, interrumpido, terminado), arrays de longitud R.
+    """
+    R, J = vel.shape; cum = m['cum']; n = len(m['t_start']); total = cum[-1]
+    x = np.zeros(R); vivo = np.ones(R, dtype=bool); producido = np.zeros(R)
+    for j in range(J):
+        if n == 0: vivo[:] = False; break
+        i = np.searchsorted(cum, x, side='right') - 1
+        vivo &= i < n
+        ic = np.minimum(i, n - 1)
+        actual = m['t_start'][ic] + (x - cum[ic]) + m['desc'][ic]
+        espera = vivo & _espera(m['h'][j], actual)
+        if espera.any():
+            i2 = m['liberacion'][m['h'][j]][np.minimum(ic + 1, n)]
+            vivo &= ~(espera & (i2 >= n))
+            x = np.where(espera & vivo, cum[np.minimum(i2, n)], x)
+        dur = m['cant'][j] / vel[:, j]
+        vel_ef = vel[:, j]
+        if extra is not None:
+            dur = dur + extra[:, j]; vel_ef = np.where(extra[:, j] > 0, m['cant'][j] / dur, vel_ef)
+        x_fin = x + dur
+        b = np.searchsorted(cum, x_fin, side='left') - 1
+        redondeo = (cum[b] > x) & ((x_fin - cum[b]) * vel_ef < EPS_PENDIENTE)
+        x_fin = np.where(redondeo, cum[b], x_fin)
+        producido += np.where(vivo, (np.minimum(x_fin, total) - x) * vel_ef, 0.0)
+        vivo &= x_fin <= total
+        x = np.where(vivo, x_fin, x)
+
+    fin = np.full(R, np.nan)
+    if n:
+        i = np.minimum(np.searchsorted(cum, x, side='right') - 1, n - 1)
+        terminado = vivo & ((np.searchsorted(cum, x, side='right') - 1) < n)
+        fin = np.where(terminado, m['t_start'][i] + (x - cum[i]) + m['desc'][i], m['corte'] if m['cortado'] else m['t_end'][-1])
+    else:
+        terminado = np.zeros(R, dtype=bool)
+        if m['cortado']: fin[:] = m['corte']
+    interrumpido = ~terminado & m['cortado']
+    return fin, producido, interrumpido, terminado
+
+# ==========================================
+# 2. MUESTREO DE LA INCERTIDUMBRE
+# ==========================================
+def _muestrear(spec, rng, size):
+    """Perturbación según `spec`: {"dist": "normal", "media", "desv"} | {"dist": "uniforme", "min", "max"} | {"dist": "triangular", "min", "moda", "max"}."""
+    if not spec: return np.zeros(size)
+    dist = spec.get('dist', 'normal')
+    if dist == 'normal': return rng.normal(spec.get('media', 0.0), spec.get('desv', 0.0), size)
+    if dist == 'uniforme': return rng.uniform(spec['min'], spec['max'], size)
+    if dist == 'triangular': return rng.triangular(spec['min'], spec.get('moda', 0.0), spec['max'], size)
+    raise ValueError(f"Distribución desconocida: {dist}")
+
+def _perturbar(m, params, rng, R):
+    """Velocidades reales (R, J) y horas de parada (R, J) de un bloque de escenarios."""
+    J = len(m['cant']); por_linea = params['por_linea'].get(m['id'], {}); por_art = params['por_articulo']
+    columnas = (R, 1) if params['nivel'] == 'linea' else (R, J)
+    d_oee = np.broadcast_to(_muestrear(por_linea.get('oee', params['oee']), rng, columnas), (R, J)).copy()
+    d_vel = np.broadcast_to(_muestrear(por_linea.get('velocidad', params['velocidad']), rng, columnas), (R, J)).copy()
+    for j, art in enumerate(m['articulo']):
+        if art in por_art:
+            if 'oee' in por_art[art]: d_oee[:, j] = _muestrear(por_art[art]['oee'], rng, R)
+            if 'velocidad' in por_art[art]: d_vel[:, j] = _muestrear(por_art[art]['velocidad'], rng, R)
+    oee = np.clip(m['oee'] + d_oee, 1.0, np.maximum(100.0, m['oee']))
+    vel = m['velocidad'] * (oee / 100.0) * np.maximum(0.05, 1.0 + d_vel)
+    vel = np.where(vel <= 0, 1.0, vel)
+
+    extra = None; paradas = por_linea.get('paradas', params['paradas'])
+    if paradas and paradas.get('por_hora', 0) > 0:
+        # Paradas durante cada pedido: Poisson en su duración, cada una exponencial de media `minutos`
+        n_paradas = rng.poisson(paradas['por_hora'] * (m['cant'] / vel))
+        extra = rng.gamma(np.maximum(n_paradas, 1), paradas.get('minutos', 15) / 60.0) * (n_paradas > 0)
+    return vel, extra
+
+def _ejecutar_bloque(modelos, params, semilla, R):
+    rng = np.random.default_rng(semilla)
+    res = [simular_vectorizado(m, *_perturbar(m, params, rng, R)) for m in modelos]
+    return tuple(np.stack([r[k] for r in res], axis=1) for k in range(4))
+
+# ==========================================
+# 3. BARRIDO Y AGREGADO
+# ==========================================
+def crear_pool(procesos=None):
+    """Pool de procesos para los bloques de escenarios, con procesos arrancados por "spawn"."""
+    return ProcessPoolExecutor(max_workers=procesos or os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+
+def barrido_montecarlo(sims, n_escenarios=1000, oee=None, velocidad=None, paradas=None, nivel='linea', por_linea=None, por_articulo=None,
+                       cortes=None, semilla=None, procesos=None, horizonte=HORIZONTE_HORAS, paso=1.0, pool=None):
+    """Lanza `n_escenarios` copias perturbadas de la planta y agrega percentiles.
+
+    `oee` (puntos) y `velocidad` (fracción relativa) son especificaciones de `_muestrear`;
+    `nivel` = 'linea' (un valor por línea y escenario) o 'articulo' (uno por pedido).
+    `por_linea` / `por_articulo` sustituyen esas especificaciones para una línea o un
+    artículo. `paradas` = {"por_hora": tasa, "minutos": duración media}. Con `pool`
+    (de `crear_pool`) se reutilizan sus procesos; si no, se crea uno para esta llamada.
+    """
+    cortes = cortes or {}
+    if not sims: return None
+    origen = min(s['start_time'] for s in sims)
+    modelos = [modelo_linea(s, origen, cortes.get(s['id']) if s['turno'] == '1' else None, horizonte, paso) for s in sims]
+    params = {"oee": oee, "velocidad": velocidad, "paradas": paradas, "nivel": nivel, "por_linea": por_linea or {}, "por_articulo": por_articulo or {}}
+
+    tamanos = [TAM_BLOQUE] * (n_escenarios // TAM_BLOQUE) + ([n_escenarios % TAM_BLOQUE] if n_escenarios % TAM_BLOQUE else [])
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    procesos = procesos or os.cpu_count() or 1
+    args = ([modelos] * len(tamanos), [params] * len(tamanos), semillas, tamanos)
+    if procesos > 1 and len(tamanos) > 1:
+        if pool is not None: bloques = list(pool.map(_ejecutar_bloque, *args))
+        else:
+            with crear_pool(min(procesos, len(tamanos))) as propio: bloques = list(propio.map(_ejecutar_bloque, *args))
+    else:
+        bloques = list(map(_ejecutar_bloque, *args))
+    fin, producido, interrumpido, terminado = (np.concatenate([b[k] for b in bloques]) for k in range(4))
+    return agregar_resultados(sims, fin, producido, interrumpido, terminado)
+
+def agregar_resultados(sims, fin, producido, interrumpido, terminado):
+    """Percentiles por línea y por turno a partir de las matrices (escenarios x líneas)."""
+    filas = []
+    for c, s in enumerate(sims):
+        p_fin = np.nanpercentile(fin[:, c], PERCENTILES) if not np.isnan(fin[:, c]).all() else [np.nan] * len(PERCENTILES)
+        p_prod = np.percentile(producido[:, c], PERCENTILES)
+        fila = {"Línea/Turno": f"L{s['id']} (T{s['turno']})", "turno": s['turno']}
+        for p, v in zip(PERCENTILES, p_fin): fila[f"Fin P{p}"] = v
+        for p, v in zip(PERCENTILES, p_prod): fila[f"Barquetas P{p}"] = v
+        fila["% Cortado"] = 100.0 * interrumpido[:, c].mean(); fila["% Sin terminar"] = 100.0 * (~terminado[:, c]).mean()
+        filas.append(fila)
+
+    turnos = []
+    for t in sorted({s['turno'] for s in sims}):
+        cols = [c for c, s in enumerate(sims) if s['turno'] == t]
+        fin_t = np.nanmax(fin[:, cols], axis=1); total_t = producido[:, cols].sum(axis=1)
+        fila = {"Turno": t}
+        for p, v in zip(PERCENTILES, np.nanpercentile(fin_t, PERCENTILES)): fila[f"Fin P{p}"] = v
+        for p, v in zip(PERCENTILES, np.percentile(total_t, PERCENTILES)): fila[f"Total P{p}"] = v
+        turnos.append(fila)
+    return {"escenarios": len(fin), "lineas": pd.DataFrame(filas), "turnos": pd.DataFrame(turnos),
+            "fin": fin, "producido": producido, "interrumpido": interrumpido, "terminado": terminado}
@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+"""Motor de simulación por eventos, independiente de Streamlit.
+
+Reproduce los resultados del antiguo bucle horario (`run_sim_tick`): mismas horas
+de fin, `producido` e historia por tramo, pero saltando de evento en evento (fin de pedido,
+descansos, hora de entrada del cliente, corte por el Turno 2) en vez de avanzar
+los pedidos hora a hora.
+
+La duración del tramo (`paso`) es configurable: 1 h reproduce el bucle antiguo y
+pasos de 15, 5 o 1 minuto separan descansos y pedidos cortos. La historia y la
+traza de cada línea se guardan como columnas NumPy; `historial_df` y `serie_turno`
+las convierten en DataFrames (agregando por bloques si se pide menos resolución).
+Los pedidos de las colas son objetos `Pedido` con `__slots__` (hay decenas de miles
+en una planta grande); la línea y el resultado siguen siendo dicts, como en la app.
+"""
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque, OrderedDict
+import numpy as np
+import pandas as pd
+from utilidades import fmt_num_es, time_to_float
+from calendario import calendario_linea, descanso_en_tramos, descansos_de_config
+from perfilador import medir, contar
+
+HORIZONTE_HORAS = 48.0
+EPS_PENDIENTE = 0.1  # Un pedido con menos de 0,1 barquetas pendientes al cerrar el tramo se da por terminado
+MAX_LINEAS_CACHE = 512  # Resultados de línea guardados (LRU) para no re-simular líneas sin cambios
+
+# ==========================================
+# 1. CONSTRUCCIÓN DE LA SIMULACIÓN
+# ==========================================
+class Pedido:
+    """Artículo de un cliente en la cola de una línea.
+
+    `pendiente` en barquetas, `vel_real` en barquetas/h (velocidad teórica por OEE) y
+    `hora_entrada` en horas (0 = sin hora de entrada). Se trata como un valor: los cambios
+    se hacen con `copia`, así colas, cachés y propuestas pueden compartir los mismos pedidos.
+    """
+    __slots__ = ("cliente", "articulo", "pendiente", "vel_real", "hora_entrada", "velocidad", "oee", "lineas_permitidas")
+
+    def __init__(self, cliente, articulo, pendiente, vel_real, hora_entrada=0.0, velocidad=None, oee=100, lineas_permitidas=None):
+        self.cliente = cliente; self.articulo = articulo; self.pendiente = pendiente; self.vel_real = vel_real; self.hora_entrada = hora_entrada
+        self.velocidad = vel_real if velocidad is None else velocidad; self.oee = oee; self.lineas_permitidas = lineas_permitidas
+
+    def copia(self, **cambios):
+        """Copia del pedido con los campos de `cambios` sustituidos."""
+        p = Pedido(self.cliente, self.articulo, self.pendiente, self.vel_real, self.hora_entrada, self.velocidad, self.oee, self.lineas_permitidas)
+        for c, v in cambios.items(): setattr(p, c, v)
+        return p
+
+    def __repr__(self):
+        return f"Pedido({self.cliente!r}, {self.articulo!r}, pendiente={self.pendiente!r}, vel_real={self.vel_real!r}, hora_entrada={self.hora_entrada!r})"
+
+def tabla_pedidos(cola):
+    """Tabla resumen de una línea: una fila por pedido de la cola."""
+    if not cola: return pd.DataFrame()
+    # Por columnas y formateando cada valor distinto una sola vez (velocidades y OEE se repiten mucho)
+    fmt = {}
+    def f(v):
+        r = fmt.get(v)
+        if r is None: r = fmt[v] = fmt_num_es(v)
+        return r
+    return pd.DataFrame({"Cliente": [j.cliente for j in cola], "Artículo": [j.articulo for j in cola], "Pedido": [f(j.pendiente) for j in cola],
+                         "Vel. Teórica": [f(j.velocidad) for j in cola], "OEE": [f"{j.oee}%" for j in cola], "Vel. Real": [f(j.vel_real) for j in cola],
+                         "Horas Est.": [fmt_num_es(j.pendiente / j.vel_real) + " h" for j in cola]})
+
+def crear_simulacion(lid, turno, start_time, breaks, clientes_data, breaks_desc="", permitir_vacia=False, con_resumen=True):
+    """Crea el estado inicial de una línea/turno a partir de `plan_data`.
+
+    `breaks` son los descansos activos [(inicio, fin)] o el dict de la hoja (ver `calendario.descansos_de_config`).
+    Devuelve None si no hay nada que producir, salvo con `permitir_vacia` (líneas que pueden recibir carga).
+    Sin `con_resumen`, `resumen_tabla` queda a None (construir el DataFrame es lo más caro de la preparación).
+    """
+    queue = deque(); total_obj = 0
+    for c_name, c_data in clientes_data.items():
+        h_ent = time_to_float(c_data['hora_entrada']) if c_data['tiene_hora'] else 0.0
+        for art in c_data['articulos']:
+            cant = art['cantidad']
+            if cant > 0:
+                vel_real = art['velocidad'] * (art['oee'] / 100.0)
+                if vel_real <= 0: vel_real = 1.0
+                queue.append(Pedido(c_name, art['nombre'], cant, vel_real, h_ent, art['velocidad'], art['oee'], art.get('lineas_permitidas')))
+                total_obj += cant
+
+    if total_obj == 0 and not permitir_vacia: return None
+    return {"id": lid, "turno": turno, "active": True, "start_time": start_time, "queue": queue, "current_job": None, "end_time": None, "interrupted": False, "producido": 0, "horas_netas": 0.0, "horas_descanso": 0.0, "breaks": breaks, "breaks_desc": breaks_desc, "total_obj": total_obj, "historial": None, "traza": None, "resumen_tabla": tabla_pedidos(queue) if con_resumen else None}
+
+def n_descansos(estado, pref):
+    """Número de descansos configurados para el prefijo `l{id}_t{turno}_`."""
+    n = 0
+    while f"{pref}desc_{n + 1}_skip" in estado: n += 1
+    return n
+
+def simulacion_desde_estado(estado, lid, turno, permitir_vacia=False, con_resumen=True):
+    """`crear_simulacion` a partir de las claves de `carga_datos.parsear_datos` (o `st.session_state`)."""
+    pref = f"l{lid}_t{turno}_"
+    start_time_obj = estado.get(f"{pref}hora_inicio")
+    if not start_time_obj: return None
+    start_time = time_to_float(start_time_obj)
+
+    breaks = []; breaks_desc = []
+    for i in range(1, n_descansos(estado, pref) + 1):
+        s_obj = estado.get(f"{pref}desc_{i}_start")
+        e_obj = estado.get(f"{pref}desc_{i}_end")
+        skip = estado.get(f"{pref}desc_{i}_skip", True)
+        # Un descanso sin inicio o sin fin no se aplica (como en el panel de configuración): con fin 0.0 cruzaría la medianoche
+        if skip or not (s_obj and e_obj): continue
+        breaks.append((time_to_float(s_obj), time_to_float(e_obj)))
+        breaks_desc.append(f"{s_obj.strftime('%H:%M')}-{e_obj.strftime('%H:%M')}")
+
+    clientes_data = estado.get("plan_data", {}).get(f"{lid}_{turno}", {})
+    return crear_simulacion(lid, turno, start_time, breaks, clientes_data, ", ".join(breaks_desc), permitir_vacia, con_resumen)
+
+def simulaciones_desde_estado(estado, activar_t2=False, incluir_vacias=False, con_resumen=True):
+    """(sims, cortes) de las líneas configuradas; `cortes` = {id: hora de inicio del T2} con el T2 activo."""
+    sims = []; cortes = {}
+    lineas = estado.get('lineas_configuradas', [])
+    if activar_t2:
+        for lid, turno in lineas:
+            t_obj = estado.get(f"l{lid}_t{turno}_hora_inicio") if turno == '2' else None
+            if t_obj: cortes[lid] = time_to_float(t_obj)
+    with medir("preparacion.simulaciones"):
+        for lid, turno in lineas:
+            if turno == '2' and not activar_t2: continue
+            s = simulacion_desde_estado(estado, lid, turno, incluir_vacias, con_resumen)
+            if s: sims.append(s)
+    return sims, cortes
+
+# ==========================================
+# 2. SIMULACIÓN DE UNA LÍNEA
+# ==========================================
+def n_tramos(horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Número de tramos globales del horizonte para una resolución `paso` (horas)."""
+    return int(round(horizonte / paso, 6)) + 1
+
+def _instantes(origen, n, paso):
+    # Misma acumulación que el antiguo bucle (curr_t += paso), para obtener exactamente las mismas horas
+    return np.cumsum(np.concatenate(([origen], np.full(n, paso))))[1:]
+
+def _rejilla(sim, origen, corte, n_max, paso):
+    """Arrays de los tramos en los que la línea está en marcha: k global, inicio, fin, descanso, neto y `cum`.
+
+    Devuelve también el índice del tramo en el que actúa el corte (`n_max` si no hay).
+    """
+    curr_t = _instantes(origen, n_max, paso)
+    k_corte = n_max
+    if corte is not None:
+        pasados = np.flatnonzero(curr_t > corte)
+        if len(pasados): k_corte = int(pasados[0])
+    t0 = curr_t[:k_corte] - paso; t_end = t0 + paso
+    t_start = np.maximum(sim['start_time'], t0)
+    en_marcha = t_start < t_end
+    k = np.flatnonzero(en_marcha); t_start = t_start[en_marcha]; t_end = t_end[en_marcha]
+    # Sólo hace falta el calendario desde el arranque de la línea (en horizontes de varios días, muchos tramos antes)
+    cal = calendario_linea(sim, float(t_start[0]) if len(t_start) else origen, origen + n_max * paso)
+    descanso = descanso_en_tramos(cal, t_start, t_end)
+    neto = np.maximum(0, (t_end - t_start) - descanso)
+    return {"k": k, "t_start": t_start, "t_end": t_end, "descanso": descanso, "neto": neto, "cum": np.concatenate(([0.0], np.cumsum(neto)))}, k_corte
+
+def rejilla_linea(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Tramos de la línea y suma acumulada de horas netas; no depende de OEE ni velocidades.
+
+    Devuelve (tramos, cum, k_corte, n_max), con `tramos` = [(k global, inicio, fin, descanso, neto)].
+    """
+    n_max = n_tramos(horizonte, paso)
+    r, k_corte = _rejilla(sim, origen, corte, n_max, paso)
+    tramos = list(zip(r['k'].tolist(), r['t_start'].tolist(), r['t_end'].tolist(), r['descanso'].tolist(), r['neto'].tolist()))
+    return tramos, r['cum'].tolist(), k_corte, n_max
+
+def _colocar_pedido(job, x, tramos, cum):
+    """(inicio, fin) de `job` en horas netas si la línea queda libre en `x`; None si ya no hay tramo en el que pueda empezar."""
+    i = bisect_right(cum, x) - 1
+    if i >= len(tramos): return None
+    # Hora de entrada del cliente: el pedido espera al siguiente tramo con producción
+    _, t_start, _, descanso, _ = tramos[i]
+    actual = t_start + (x - cum[i]) + descanso
+    h_ent = job.hora_entrada
+    if h_ent > (actual % 24) and actual < 24:
+        i += 1
+        while i < len(tramos):
+            _, t_start, _, descanso, neto = tramos[i]
+            actual = t_start + descanso
+            if neto > 0 and not (h_ent > (actual % 24) and actual < 24): break
+            i += 1
+        if i >= len(tramos): return None
+        x = cum[i]
+    vel = job.vel_real; x_fin = x + job.pendiente / vel
+    b = bisect_left(cum, x_fin) - 1
+    if cum[b] > x and (x_fin - cum[b]) * vel < EPS_PENDIENTE: x_fin = cum[b]
+    return x, x_fin
+
+def _planificar_pedidos(queue, tramos, cum):
+    """Coloca los pedidos sobre el eje de horas netas.
+
+    Devuelve (segmentos, x_fin, pendientes, pedido_en_curso); `x_fin` es None si la
+    cola no se vacía dentro de los tramos disponibles.
+    """
+    total = cum[-1]; segs = []; x = 0.0; pendientes = deque(queue)
+    while pendientes:
+        job = pendientes[0]; pos = _colocar_pedido(job, x, tramos, cum)
+        if pos is None: return segs, None, pendientes, None
+        pendientes.popleft(); x, x_fin = pos
+        segs.append((x, min(x_fin, total), job.vel_real))
+        if x_fin > total: return segs, None, pendientes, job.copia(pendiente=job.pendiente - (total - x) * job.vel_real)
+        x = x_fin
+    return segs, x, pendientes, None
+
+def _reparto_por_tramo(segs, cum, n):
+    """Barquetas y horas trabajadas en cada uno de los `n` primeros tramos a partir de los segmentos."""
+    prod = np.zeros(n); trabajado = np.zeros(n)
+    if not segs or not n: return prod, trabajado
+    s0, s1, vel = (np.array(c) for c in zip(*segs))
+    # Tramos que toca cada segmento, en orden de segmento (mismo orden de suma que el bucle horario)
+    i_lo = np.searchsorted(cum, s0, side='right') - 1
+    i_hi = np.minimum(np.searchsorted(cum, s1, side='left') - 1, n - 1)
+    cuantos = np.maximum(i_hi - i_lo + 1, 0)
+    seg = np.repeat(np.arange(len(s0)), cuantos)
+    i = np.repeat(i_lo, cuantos) + (np.arange(cuantos.sum()) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos))
+    ov = np.minimum(s1[seg], cum[i + 1]) - np.maximum(s0[seg], cum[i])
+    ok = ov > 0
+    np.add.at(prod, i[ok], ov[ok] * vel[seg[ok]]); np.add.at(trabajado, i[ok], ov[ok])
+    return prod, trabajado
+
+def simular_linea(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Simula una línea completa y rellena `sim` igual que lo hacía el bucle horario.
+
+    `origen` es la hora de inicio global de la planta (rejilla de tramos común),
+    `corte` la hora a la que el Turno 2 interrumpe esta línea (sólo Turno 1) y `paso`
+    la resolución en horas. La historia queda en `sim['historial']` y el estado tras
+    cada tramo global en `sim['traza']`, ambos como columnas NumPy, para reproducir
+    la animación sin volver a simular.
+    """
+    n_max = n_tramos(horizonte, paso)
+    r, k_corte = _rejilla(sim, origen, corte, n_max, paso)
+    cum_l = r['cum'].tolist()
+    tramos = list(zip(r['k'].tolist(), r['t_start'].tolist(), r['t_end'].tolist(), r['descanso'].tolist(), r['neto'].tolist()))
+
+    segs, x_fin, pendientes, job_actual = _planificar_pedidos(sim['queue'], tramos, cum_l)
+    i_fin = None
+    if x_fin is not None:
+        i = bisect_right(cum_l, x_fin) - 1
+        if i < len(tramos): i_fin = i
+
+    # Barrido tramos x segmentos -> historia por tramo
+    n_run = len(tramos) if i_fin is None else i_fin + 1
+    prod, trabajado = _reparto_por_tramo(segs, r['cum'], n_run)
+    ks = r['k'][:n_run]; t_start = r['t_start'][:n_run]; t_end = r['t_end'][:n_run]; descanso = r['descanso'][:n_run]
+    # Redondeo de la suma acumulada: con tramos cortos los errores de coma flotante se notan (7.999,99...)
+    producido = np.round(np.cumsum(prod), 6); netas = np.cumsum(trabajado); descanso_acum = np.cumsum(descanso)
+    activo = np.ones(n_run, dtype=bool); fin = t_end.copy()
+    if i_fin is not None: activo[i_fin] = False; fin[i_fin] = t_start[i_fin] + (x_fin - cum_l[i_fin]) + descanso[i_fin]
+    en_historia = (prod > 0) | activo
+    historial = {"k": ks[en_historia], "t": t_end[en_historia], "prod": prod[en_historia], "acum": producido[en_historia]}
+
+    interrupted = False; sigue = i_fin is None; ultimo = int(ks[-1]) if n_run else -1
+    netas_f = float(netas[-1]) if n_run else 0.0; descanso_f = float(descanso_acum[-1]) if n_run else 0.0
+    producido_f = float(producido[-1]) if n_run else 0; end_time = float(fin[-1]) if n_run else None
+    if sigue and k_corte < n_max: interrupted = True; sigue = False; end_time = corte
+
+    # Traza por tramo global: antes de arrancar, estado inicial; tras el corte, el último estado sin producción
+    n_traza = k_corte + 1 if interrupted else ultimo + 1
+    traza = _traza_vacia(n_traza)
+    if n_run:
+        traza['netas'][ks] = netas; traza['descanso'][ks] = descanso_acum; traza['producido'][ks] = producido
+        traza['n_hist'][ks] = np.cumsum(en_historia); traza['fin'][ks] = fin; traza['activo'][ks] = activo; traza['prod'][ks] = prod
+    if interrupted:
+        for c in ('netas', 'descanso', 'producido', 'n_hist', 'fin', 'activo'):
+            if ultimo >= 0: traza[c][ultimo + 1:] = traza[c][ultimo]
+        traza['fin'][k_corte] = corte; traza['activo'][k_corte] = False
+
+    sim.update({"active": sigue, "interrupted": interrupted, "end_time": end_time, "producido": producido_f, "horas_netas": netas_f, "horas_descanso": descanso_f, "historial": historial, "traza": traza, "origen": origen, "paso": paso, "queue": pendientes, "current_job": job_actual})
+    # Número de tramos globales tras los que la línea sigue activa
+    sim['tramos_activos'] = n_max if sigue else (k_corte if interrupted else tramos[i_fin][0])
+    return sim
+
+def _traza_vacia(n):
+    return {"netas": np.zeros(n), "descanso": np.zeros(n), "producido": np.zeros(n), "n_hist": np.zeros(n, dtype=np.int64),
+            "fin": np.full(n, np.nan), "activo": np.ones(n, dtype=bool), "prod": np.zeros(n)}
+
+def _estado_inicial():
+    return (0.0, 0.0, 0, 0, None, True, 0)
+
+def estado_en_tick(sim, k):
+    """Estado de la línea tras el tramo global `k`: netas, descanso, producido, n_hist, fin, activo, prod."""
+    tz = sim['traza']
+    if not tz or not len(tz['netas']): return _estado_inicial()
+    n = len(tz['netas']); i = min(k, n - 1); fin = tz['fin'][i]
+    return (float(tz['netas'][i]), float(tz['descanso'][i]), float(tz['producido'][i]), int(tz['n_hist'][i]),
+            None if np.isnan(fin) else float(fin), bool(tz['activo'][i]), float(tz['prod'][i]) if k < n else 0)
+
+def traza_extendida(sim, n):
+    """Columnas de la traza para los `n` primeros tramos globales (tras el final, último estado sin producción)."""
+    tz = sim['traza']; m = len(tz['netas']) if tz else 0
+    if not m: return _traza_vacia(n)
+    idx = np.minimum(np.arange(n), m - 1)
+    ext = {c: v[idx] for c, v in tz.items()}
+    ext['prod'][m:] = 0
+    return ext
+
+def historial_df(sim, n=None, resolucion=None):
+    """Historia de la línea como DataFrame (Hora, Prod, Acum), con las `n` primeras filas.
+
+    Con `resolucion` (horas) mayor que el paso simulado se agrega por bloques de esa
+    duración contados desde el origen: producción sumada, acumulado y hora del último tramo.
+    """
+    h = sim.get('historial') or {"k": np.zeros(0, dtype=np.int64), "t": np.zeros(0), "prod": np.zeros(0), "acum": np.zeros(0)}
+    k, t, prod, acum = (h[c][:n] if n is not None else h[c] for c in ('k', 't', 'prod', 'acum'))
+    paso = sim.get('paso', 1.0)
+    if resolucion and resolucion > paso + 1e-9 and len(k):
+        m = int(round(resolucion / paso)); bloque = k // m
+        corte = np.flatnonzero(np.diff(bloque)) + 1; inicio = np.concatenate(([0], corte)); ultimo = np.concatenate((corte - 1, [len(k) - 1]))
+        # Cada bloque se etiqueta con su hora de cierre, como los tramos de una hora
+        prod = np.round(np.add.reduceat(prod, inicio), 6); acum = acum[ultimo]; t = np.round(sim['origen'] + (bloque[ultimo] + 1) * m * paso, 6)
+    hora = t.astype(int) if (resolucion or paso) >= 1 else np.round(t, 2)
+    return pd.DataFrame({"Hora": hora, "Prod": prod, "Acum": acum})
+
+# ==========================================
+# 3. SIMULACIÓN DE LA PLANTA
+# ==========================================
+def _entradas_linea(sim, corte=None):
+    # Todo lo que determina la simulación de una línea, como tupla hashable
+    cola = tuple((j.cliente, j.articulo, j.pendiente, j.vel_real, j.hora_entrada) for j in sim['queue'])
+    return (sim['id'], sim['turno'], sim['start_time'], tuple(descansos_de_config(sim['breaks'])), corte, cola)
+
+def firma_linea(sim, corte=None):
+    """Huella de todo lo que determina la simulación de una línea: inicio, descansos, cola y corte."""
+    return hashlib.sha1(repr(_entradas_linea(sim, corte)).encode()).hexdigest()
+
+def firma_planta(sims, cortes=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """Huella de una llamada a `simular_planta` (mismas líneas, cortes y resolución = mismo resultado).
+
+    El resultado incluye las simulaciones con su tabla de pedidos, así que también cuentan la
+    velocidad teórica y el OEE de cada artículo y los descansos tal y como se muestran.
+    """
+    cortes = cortes or {}
+    tablas = (hashlib.sha1(repr((s['breaks_desc'], [(j.velocidad, j.oee, j.lineas_permitidas) for j in s['queue']])).encode()).hexdigest() for s in sims)
+    return (tuple((firma_linea(s, cortes.get(s['id']) if s['turno'] == '1' else None), t) for s, t in zip(sims, tablas)), horizonte, paso)
+
+# Campos que `simular_linea` escribe en la simulación
+_CAMPOS_RESULTADO = ("active", "interrupted", "end_time", "producido", "horas_netas", "horas_descanso", "historial", "traza", "origen", "paso", "queue", "current_job", "tramos_activos")
+_cache_lineas = OrderedDict()
+_lock_cache = threading.Lock()
+
+def _copia_resultado(r):
+    # Los arrays de historia y traza sólo se leen y los pedidos no se modifican (ver `Pedido`): basta copiar la cola
+    return dict(r, queue=deque(r['queue']))
+
+def simular_linea_cacheada(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0):
+    """`simular_linea` con memo LRU: una línea con las mismas entradas (las de `firma_linea`),
+    origen y resolución no se vuelve a simular."""
+    clave = (_entradas_linea(sim, corte), origen, horizonte, paso)
+    with _lock_cache:
+        r = _cache_lineas.get(clave)
+        if r is not None: _cache_lineas.move_to_end(clave)
+    if r is not None:
+        contar("simulacion.lineas_en_cache"); sim.update(_copia_resultado(r))
+        return sim
+    simular_linea(sim, origen, corte, horizonte, paso)
+    r = _copia_resultado({c: sim[c] for c in _CAMPOS_RESULTADO})
+    with _lock_cache:
+        _cache_lineas[clave] = r
+        while len(_cache_lineas) > MAX_LINEAS_CACHE: _cache_lineas.popitem(last=False)
+    return sim
+
+def limpiar_cache_lineas():
+    with _lock_cache: _cache_lineas.clear()
+
+def simular_planta(sims, cortes=None, horizonte=HORIZONTE_HORAS, paso=1.0, progreso=None, cache=True):
+    """Simula todas las líneas y agrega la producción global por turno y tramo.
+
+    `cortes` = {linea_id: hora de inicio del Turno 2}; se aplica a las líneas de Turno 1.
+    Con `cache`, sólo se simulan las líneas cuyas entradas han cambiado desde una llamada
+    anterior (ver `simular_linea_cacheada`); el agregado global se recalcula siempre.
+    `progreso(fraccion)`, si se indica, se llama tras simular cada línea.
+    Devuelve columnas por tramo global: "t" (hora de fin del tramo) y, por turno,
+    "prod", "acum", "fin" (hora de fin prevista) y "activo".
+    """
+    cortes = cortes or {}
+    if not sims: return {"origen": None, "fin": None, "paso": paso, "t": np.zeros(0), "prod": {}, "acum": {}, "fin_turno": {}, "activo": {}, "sims": sims}
+    origen = min(s['start_time'] for s in sims)
+    with medir("simulacion.lineas"):
+        for i, s in enumerate(sims):
+            contar("simulacion.pedidos", len(s['queue']))
+            (simular_linea_cacheada if cache else simular_linea)(s, origen, cortes.get(s['id']) if s['turno'] == '1' else None, horizonte, paso)
+            if progreso: progreso((i + 1) / len(sims))
+
+    n_max = n_tramos(horizonte, paso)
+    n_ticks = min(n_max, max(s['tramos_activos'] for s in sims) + 1)
+    t = _instantes(origen, n_ticks, paso); contar("simulacion.tramos", n_ticks)
+    prod = {}; fin = {}; activo = {}
+    with medir("simulacion.agregado"):
+        for s in sims:
+            e = traza_extendida(s, n_ticks); tr = s['turno']
+            fin_s = np.where(np.isnan(e['fin']), s['start_time'] + e['netas'] + e['descanso'], e['fin'])
+            prod[tr] = prod.get(tr, 0) + e['prod']
+            fin[tr] = np.maximum(fin.get(tr, 0), fin_s)
+            activo[tr] = activo.get(tr, False) | e['activo']
+        acum = {tr: np.round(np.cumsum(p), 6) for tr, p in prod.items()}
+    return {"origen": origen, "fin": float(t[-1]), "paso": paso, "t": t, "prod": prod, "acum": acum, "fin_turno": fin, "activo": activo, "sims": sims}
+
+def serie_turno(resultado, turno, n=None, resolucion=None):
+    """Serie global de un turno (Hora, Prod, Acum, Ultima) con los `n` primeros tramos.
+
+    "Ultima" es la hora del último tramo con la línea activa o produciendo. Con
+    `resolucion` (horas) se agrega por bloques desde el origen, como `historial_df`.
+    """
+    t = resultado['t'][:n]; vacio = np.zeros(len(t))
+    prod = resultado['prod'].get(turno, vacio)[:n]; acum = resultado['acum'].get(turno, vacio)[:n]
+    activo = resultado['activo'].get(turno, np.zeros(len(t), dtype=bool))[:n]
+    ultima = np.maximum.accumulate(np.where(activo | (prod > 0), t, resultado['origen'])) if len(t) else t
+    paso = resultado['paso']
+    if resolucion and resolucion > paso + 1e-9 and len(t):
+        m = int(round(resolucion / paso)); inicio = np.arange(0, len(t), m); ultimo = np.minimum(inicio + m, len(t)) - 1
+        prod = np.round(np.add.reduceat(prod, inicio), 6); acum = acum[ultimo]; ultima = ultima[ultimo]
+        t = np.round(resultado['origen'] + (inicio // m + 1) * m * paso, 6)
+    hora = t.astype(int) if (resolucion or paso) >= 1 else np.round(t, 2)
+    return pd.DataFrame({"Hora": hora, "Prod": prod, "Acum": acum, "Ultima": ultima})
+
+
+def resumen_planta(resultado):
+    """Datos de la tabla "Resumen Global", sin formato: una fila por línea/turno y la fila "GLOBAL".
+
+    Las horas de fin son horas absolutas (pueden pasar de 24); "cortada" indica que el T2 cortó la línea.
+    """
+    filas = []
+    for s in resultado['sims']:
+        fin = s['end_time'] if s['end_time'] else (s['start_time'] + s['horas_netas'] + s['horas_descanso'])
+        filas.append({"linea_id": s['id'], "turno": s['turno'], "producido": float(s['producido']), "horas_netas": s['horas_netas'],
+                      "horas_descanso": s['horas_descanso'], "fin": fin, "cortada": bool(s.get('interrupted'))})
+    acumulado = {t: a[-1] for t, a in resultado['acum'].items() if len(a)}
+    filas.append({"linea_id": "GLOBAL", "turno": None, "producido": float(acumulado.get('1', 0) + acumulado.get('2', 0)), "horas_netas": sum(f['horas_netas'] for f in filas),
+                  "horas_descanso": None, "fin": resultado['fin'], "cortada": False})
+    return filas
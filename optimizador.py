@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Secuenciación de pedidos: reordena la cola de cada línea para terminar antes.
+
+El motor sigue la cola en el orden de la hoja y, si el primer pedido tiene una hora
+de entrada futura, la línea espera aunque otros pedidos podrían producirse ya. Aquí
+se busca el orden que minimiza la hora de fin (y con ella la espera) respetando
+entradas de cliente, descansos y corte por el Turno 2; si la línea no puede
+terminar, el que más barquetas produce antes del corte.
+
+Se parte de reglas de despacho (orden de la hoja, por hora de entrada, despacho sin
+esperas) y se mejora con búsqueda local por inserción. Cada movimiento sólo
+recalcula la cola desde la primera posición que cambia, sobre la rejilla de tramos
+del motor. Con pocos pedidos se usa ramificación y poda, que da el óptimo exacto si
+termina a tiempo; si no, se sigue con búsqueda local desde el mejor orden encontrado.
+La planta entera tiene un presupuesto de tiempo que se reparte entre sus líneas.
+"""
+import time
+from bisect import bisect_right
+from collections import deque
+import pandas as pd
+from motor_simulacion import HORIZONTE_HORAS, EPS_PENDIENTE, rejilla_linea, _colocar_pedido
+from utilidades import float_to_time_str
+
+MAX_EXACTO = 8        # Hasta este número de pedidos se explora el árbol completo (con poda)
+LIMITE_SEG_LINEA = 1.0
+LIMITE_SEG_PLANTA = 3.0   # Toda la planta; cada línea recibe su parte de lo que queda, hasta LIMITE_SEG_LINEA
+
+# ==========================================
+# 1. EVALUACIÓN INCREMENTAL
+# ==========================================
+# Estado tras colocar un prefijo de la cola: (x en horas netas, producido, espera, sigue_en_marcha)
+_INICIAL = (0.0, 0.0, 0.0, True)
+
+def _avanzar(estado, job, tramos, cum):
+    x, producido, espera, vivo = estado
+    if not vivo: return estado
+    pos = _colocar_pedido(job, x, tramos, cum)
+    if pos is None: return (x, producido, espera, False)
+    x0, x_fin = pos; total = cum[-1]
+    if x_fin > total: return (total, producido + (total - x0) * job.vel_real, espera + (x0 - x), False)
+    return (x_fin, producido + (x_fin - x0) * job.vel_real, espera + (x0 - x), True)
+
+def _clave(estado):
+    """Menor es mejor: primero las colas que terminan (por hora de fin), luego las que producen más."""
+    x, producido, _, vivo = estado
+    return (0, x) if vivo else (1, -producido)
+
+def _recorrer(orden, jobs, tramos, cum, desde=0, prefijos=None):
+    """Estados tras cada posición de `orden` a partir de `desde`, reutilizando `prefijos`."""
+    estados = list(prefijos[:desde + 1]) if prefijos else [_INICIAL]
+    for j in orden[desde:]: estados.append(_avanzar(estados[-1], jobs[j], tramos, cum))
+    return estados
+
+def _hora(x, tramos, cum):
+    # Hora de reloj del punto `x` del eje neto, como `end_time` en el motor
+    i = min(bisect_right(cum, x) - 1, len(tramos) - 1)
+    _, t_start, _, descanso, _ = tramos[i]
+    return t_start + (x - cum[i]) + descanso
+
+# ==========================================
+# 2. REGLAS DE DESPACHO
+# ==========================================
+def _despacho_sin_espera(jobs, tramos, cum):
+    """En cada momento, el primer pedido (orden de la hoja) cuyo cliente ya ha entrado; si no hay, el que entra antes."""
+    libres = list(range(len(jobs))); orden = []; estado = _INICIAL
+    while libres:
+        elegido = None
+        for j in libres:
+            pos = _colocar_pedido(jobs[j], estado[0], tramos, cum) if estado[3] else None
+            if pos is not None and pos[0] == estado[0]: elegido = j; break
+        if elegido is None: elegido = min(libres, key=lambda j: jobs[j].hora_entrada)
+        libres.remove(elegido); orden.append(elegido); estado = _avanzar(estado, jobs[elegido], tramos, cum)
+    return orden
+
+def _heuristicas(jobs, tramos, cum):
+    n = len(jobs)
+    return {"hoja": list(range(n)),
+            "hora_entrada": sorted(range(n), key=lambda j: jobs[j].hora_entrada),
+            "sin_espera": _despacho_sin_espera(jobs, tramos, cum),
+            "mas_rapido_antes": sorted(range(n), key=lambda j: (jobs[j].hora_entrada, -jobs[j].vel_real))}
+
+# ==========================================
+# 3. MEJORA: BÚSQUEDA LOCAL Y RAMIFICACIÓN Y PODA
+# ==========================================
+def _busqueda_local(orden, jobs, tramos, cum, limite_seg):
+    """Primera mejora moviendo un pedido a otra posición; para en un óptimo local o al agotar el tiempo."""
+    n = len(orden); estados = _recorrer(orden, jobs, tramos, cum); t0 = time.perf_counter()
+    mejorado = True
+    while mejorado and time.perf_counter() - t0 < limite_seg:
+        mejorado = False; mejor = _clave(estados[-1])
+        for i in range(n):
+            for p in range(n):
+                if p == i or p == i - 1: continue
+                cand = orden[:i] + orden[i + 1:]; cand.insert(p if p < i else p - 1, orden[i])
+                desde = min(i, p)
+                # Un prefijo ya parado no cambia con lo que venga detrás
+                if not estados[desde][3]: continue
+                nuevos = _recorrer(cand, jobs, tramos, cum, desde, estados)
+                if _clave(nuevos[-1]) < mejor:
+                    orden, estados, mejorado = cand, nuevos, True
+                    break
+            if mejorado or time.perf_counter() - t0 >= limite_seg: break
+    return orden
+
+class _Agotado(Exception):
+    pass
+
+def _ramificar_y_podar(orden_ini, jobs, tramos, cum, limite_seg=None):
+    """Orden óptimo explorando todas las permutaciones, podando con una cota inferior de la hora de fin.
+
+    Devuelve (orden, exacto): si se agota `limite_seg`, el mejor orden visto hasta entonces y False.
+    """
+    n = len(jobs); mejor = [_clave(_recorrer(orden_ini, jobs, tramos, cum)[-1]), list(orden_ini)]
+    limite = None if limite_seg is None else time.perf_counter() + limite_seg; nodos = [0]
+    # Cotas: el resto de pedidos no puede durar menos que su trabajo neto (menos el redondeo
+    # por EPS) ni producir más que lo que queda pendiente
+    dur = [max(0.0, (jobs[j].pendiente - EPS_PENDIENTE) / jobs[j].vel_real) for j in range(n)]
+    candidatos = sorted(range(n), key=lambda j: jobs[j].hora_entrada)
+
+    def explorar(prefijo, usados, estado, resto, cantidad):
+        nodos[0] += 1
+        if limite is not None and nodos[0] % 256 == 1 and time.perf_counter() > limite: raise _Agotado
+        if not estado[3] or len(prefijo) == n:
+            # Una vez parada la línea, el resto del orden ya no influye
+            if _clave(estado) < mejor[0]: mejor[0], mejor[1] = _clave(estado), prefijo + [j for j in candidatos if j not in usados]
+            return
+        if mejor[0][0] == 0 and estado[0] + resto >= mejor[0][1]: return
+        if mejor[0][0] == 1 and estado[1] + cantidad <= -mejor[0][1]: return
+        for j in candidatos:
+            if j in usados: continue
+            usados.add(j); prefijo.append(j)
+            explorar(prefijo, usados, _avanzar(estado, jobs[j], tramos, cum), resto - dur[j], cantidad - jobs[j].pendiente)
+            prefijo.pop(); usados.discard(j)
+
+    try: explorar([], set(), _INICIAL, sum(dur), sum(j.pendiente for j in jobs))
+    except _Agotado: return mejor[1], False
+    return mejor[1], True
+
+# ==========================================
+# 4. OPTIMIZACIÓN POR LÍNEA Y PLANTA
+# ==========================================
+def _resumen(estado, jobs, tramos, cum):
+    x, producido, espera, vivo = estado
+    return {"fin": _hora(x, tramos, cum) if (vivo and tramos) else None, "espera": espera, "producido": producido, "terminado": vivo}
+
+def optimizar_linea(sim, origen, corte=None, horizonte=HORIZONTE_HORAS, paso=1.0, limite_seg=LIMITE_SEG_LINEA):
+    """Propone un orden para la cola de `sim` (sin modificarla).
+
+    Devuelve {"orden": índices sobre la cola actual, "metodo", "actual", "propuesta"},
+    donde "actual"/"propuesta" = {"fin", "espera", "producido", "terminado"}.
+    """
+    jobs = list(sim['queue'])
+    tramos, cum, _, _ = rejilla_linea(sim, origen, corte, horizonte, paso)
+    actual = list(range(len(jobs)))
+    candidatos = _heuristicas(jobs, tramos, cum)
+    metodo, orden = min(candidatos.items(), key=lambda kv: _clave(_recorrer(kv[1], jobs, tramos, cum)[-1]))
+    t0 = time.perf_counter(); exacto = False
+    if 1 < len(jobs) <= MAX_EXACTO:
+        # La mitad del tiempo para el árbol; si no acaba, el resto para la búsqueda local desde lo mejor visto
+        mejorado, exacto = _ramificar_y_podar(orden, jobs, tramos, cum, limite_seg / 2)
+        if exacto: orden, metodo = mejorado, "exacto"
+        elif _clave(_recorrer(mejorado, jobs, tramos, cum)[-1]) < _clave(_recorrer(orden, jobs, tramos, cum)[-1]): orden, metodo = mejorado, "exacto parcial"
+    if len(jobs) > 1 and not exacto:
+        mejorado = _busqueda_local(orden, jobs, tramos, cum, limite_seg - (time.perf_counter() - t0))
+        if mejorado != orden: orden = mejorado; metodo += "+búsqueda local"
+    # Nunca se propone un orden peor que el actual
+    e_actual = _recorrer(actual, jobs, tramos, cum)[-1]; e_prop = _recorrer(orden, jobs, tramos, cum)[-1]
+    if _clave(e_prop) >= _clave(e_actual): orden, e_prop, metodo = actual, e_actual, "hoja"
+    return {"orden": orden, "metodo": metodo, "actual": _resumen(e_actual, jobs, tramos, cum), "propuesta": _resumen(e_prop, jobs, tramos, cum)}
+
+def optimizar_planta(sims, cortes=None, horizonte=HORIZONTE_HORAS, paso=1.0, limite_seg=LIMITE_SEG_LINEA, limite_planta=LIMITE_SEG_PLANTA):
+    """`optimizar_linea` para cada simulación, con el mismo origen y cortes que `simular_planta`; clave "{id}_{turno}".
+
+    Cada línea tiene como mucho `limite_seg` y su parte de lo que queda de `limite_planta`; agotado
+    el presupuesto, las líneas restantes se quedan con la mejor regla de despacho.
+    """
+    cortes = cortes or {}
+    if not sims: return {}
+    origen = min(s['start_time'] for s in sims); fin = time.perf_counter() + limite_planta; res = {}
+    for i, s in enumerate(sims):
+        limite = min(limite_seg, max(0.0, fin - time.perf_counter()) / (len(sims) - i))
+        res[f"{s['id']}_{s['turno']}"] = optimizar_linea(s, origen, cortes.get(s['id']) if s['turno'] == '1' else None, horizonte, paso, limite)
+    return res
+
+def aplicar_orden(sim, orden):
+    """Reordena la cola (y la tabla resumen) de `sim` según los índices de `orden`."""
+    jobs = list(sim['queue'])
+    if sorted(orden) != list(range(len(jobs))): return sim
+    sim['queue'] = deque(jobs[j] for j in orden)
+    if len(sim['resumen_tabla']) == len(jobs): sim['resumen_tabla'] = sim['resumen_tabla'].iloc[orden].reset_index(drop=True)
+    return sim
+
+def tabla_comparativa(sim, resultado):
+    """Orden actual y propuesto, posición a posición, para mostrar en la interfaz."""
+    jobs = list(sim['queue'])
+    etiqueta = lambda j: f"{jobs[j].cliente} · {jobs[j].articulo}" + (f" ({float_to_time_str(jobs[j].hora_entrada)})" if jobs[j].hora_entrada else "")
+    return pd.DataFrame([{"#": p + 1, "Orden actual": etiqueta(p), "Orden propuesto": etiqueta(j)} for p, j in enumerate(resultado['orden'])])
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Instrumentación ligera de las fases calientes (temporizadores y contadores).
+
+Los módulos marcan sus fases con `with medir("fase"):` y `contar("nombre")`. Sólo
+se registra algo si hay un `Perfilador` activo en el contexto actual (`usar`); la
+app activa uno por sesión, así que las sesiones no se mezclan. Desactivado, cada
+punto de medida cuesta una lectura de `ContextVar` y devuelve un objeto vacío
+compartido, por lo que puede quedarse en producción.
+
+El resultado se resume por fase, se exporta a JSON o como traza en formato
+"Trace Event" (abrir en chrome://tracing o https://ui.perfetto.dev).
+"""
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+import pandas as pd
+
+MAX_EVENTOS = 20000   # Eventos guardados para la traza; los totales por fase se acumulan siempre
+
+_actual = ContextVar("perfilador", default=None)
+
+# ==========================================
+# 1. REGISTRO
+# ==========================================
+class Perfilador:
+    """Tiempos por fase, contadores y eventos individuales de una ejecución."""
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.origen = time.perf_counter(); self.inicio = time.time()
+        self.fases = {}        # nombre -> [llamadas, total_s, max_s]
+        self.contadores = {}
+        self.eventos = []      # (nombre, inicio_s, duración_s, hilo)
+        self.descartados = 0
+
+    def registrar(self, nombre, t0, dt):
+        f = self.fases.get(nombre)
+        if f is None: self.fases[nombre] = [1, dt, dt]
+        else: f[0] += 1; f[1] += dt; f[2] = max(f[2], dt)
+        if len(self.eventos) < MAX_EVENTOS: self.eventos.append((nombre, t0 - self.origen, dt, threading.get_ident()))
+        else: self.descartados += 1
+
+    def contar(self, nombre, n=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    # --- Consultas y exportación ---
+    def resumen(self):
+        """DataFrame con una fila por fase, de mayor a menor tiempo total."""
+        total = time.perf_counter() - self.origen
+        filas = [{"Fase": n, "Llamadas": c, "Total (ms)": 1000 * t, "Media (ms)": 1000 * t / c, "Máx (ms)": 1000 * m, "% ejecución": 100 * t / total if total else 0.0}
+                 for n, (c, t, m) in self.fases.items()]
+        return pd.DataFrame(filas, columns=["Fase", "Llamadas", "Total (ms)", "Media (ms)", "Máx (ms)", "% ejecución"]).sort_values("Total (ms)", ascending=False, ignore_index=True)
+
+    def a_dict(self):
+        return {"inicio": self.inicio, "duracion_s": time.perf_counter() - self.origen,
+                "fases": {n: {"llamadas": c, "total_s": t, "max_s": m} for n, (c, t, m) in self.fases.items()},
+                "contadores": dict(self.contadores), "eventos_descartados": self.descartados}
+
+    def a_json(self):
+        return json.dumps(self.a_dict(), indent=2, ensure_ascii=False)
+
+    def a_traza(self):
+        """Traza "Trace Event" (microsegundos): una barra por evento y los contadores como metadatos."""
+        pid = os.getpid()
+        eventos = [{"name": n, "cat": n.split(".")[0], "ph": "X", "ts": t0 * 1e6, "dur": dt * 1e6, "pid": pid, "tid": tid} for n, t0, dt, tid in self.eventos]
+        return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms", "otherData": {"contadores": self.contadores}})
+
+class _Medicion:
+    __slots__ = ("p", "nombre", "t0")
+
+    def __init__(self, p, nombre):
+        self.p = p; self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter(); return self
+
+    def __exit__(self, *exc):
+        self.p.registrar(self.nombre, self.t0, time.perf_counter() - self.t0)
+        return False
+
+class _Nula:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULA = _Nula()
+
+# ==========================================
+# 2. API DE LOS PUNTOS DE MEDIDA
+# ==========================================
+def usar(perfilador):
+    """Activa `perfilador` en el contexto actual (None = desactivado)."""
+    _actual.set(perfilador)
+
+def medir(nombre):
+    """Context manager que acumula el tiempo de la fase `nombre` (no hace nada si no hay perfilador)."""
+    p = _actual.get()
+    return _NULA if p is None else _Medicion(p, nombre)
+
+def contar(nombre, n=1):
+    p = _actual.get()
+    if p is not None: p.contar(nombre, n)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Reparto voraz de carga: máximos empatados, movimientos que no adelantan el fin y plantas con más trabajo del que cabe."""
+import time
+from balanceo import balancear_planta
+from motor_simulacion import crear_simulacion
+
+def _linea(lid, articulos, inicio=6.0):
+    """Línea del T1 sin descansos; `articulos` = [(cantidad, velocidad)] de un mismo cliente."""
+    clientes = {"C": {"articulos": [{"nombre": f"A{lid}_{i}", "cantidad": q, "velocidad": v, "oee": 100} for i, (q, v) in enumerate(articulos)],
+                      "hora_entrada": None, "tiene_hora": False}} if articulos else {}
+    return crear_simulacion(str(lid), '1', inicio, [], clientes, permitir_vacia=True, con_resumen=False)
+
+def _fin(resultado):
+    return max(s['end_time'] or 0.0 for s in resultado['sims'])
+
+def _producido(resultado):
+    return sum(s['producido'] for s in resultado['sims'])
+
+def test_maximo_empatado_reparte_las_dos_lineas():
+    # L1 y L2 acaban a la vez (8 h); descargar sólo una no baja el máximo, pero es el primer paso
+    sims = [_linea(1, [(8000, 1000)]), _linea(2, [(8000, 1000)]), _linea(3, []), _linea(4, [])]
+    res = balancear_planta(sims)
+    assert _fin(res['antes']) == 14.0
+    assert {mv['desde'] for mv in res['movimientos']} == {"1_1", "2_1"}
+    assert _fin(res['despues']) == 10.0
+    assert _producido(res['despues']) == _producido(res['antes'])
+
+def test_sin_division_no_mueve_si_no_mejora():
+    # Con un único pedido por línea, moverlo entero sólo lo cambia de sitio
+    sims = [_linea(1, [(8000, 1000)]), _linea(2, [(8000, 1000)]), _linea(3, [])]
+    assert balancear_planta(sims, dividir=False)['movimientos'] == []
+
+def test_sin_adelantar_el_fin_no_mueve():
+    # L1 marca el fin (un pedido de 8 h que no se divide); repartir L2 con L3 no lo adelanta
+    sims = [_linea(1, [(8000, 1000)]), _linea(2, [(2000, 1000), (2000, 1000)]), _linea(3, [])]
+    assert balancear_planta(sims, dividir=False)['movimientos'] == []
+
+def test_planta_desbordada_llena_lineas_sin_ir_y_volver():
+    # 400 artículos de 2 h en 5 de 60 líneas: no caben en esas 5, pero sí repartidos entre todas
+    sims = [_linea(l, [(1000, 500)] * 80 if l <= 5 else []) for l in range(1, 61)]
+    t0 = time.perf_counter(); res = balancear_planta(sims); segundos = time.perf_counter() - t0
+    assert segundos < 1
+    movs = res['movimientos']
+    assert not {(mv['articulo'], mv['desde'], mv['hacia']) for mv in movs} & {(mv['articulo'], mv['hacia'], mv['desde']) for mv in movs}
+    assert len(res['despues']['sims']) == 60
+    assert all(s['producido'] > 0 for s in res['despues']['sims'])
+    assert _producido(res['antes']) < 400000 == _producido(res['despues'])
+    assert _fin(res['despues']) < _fin(res['antes'])
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Descanso por tramo y horas netas sobre calendarios de varios días."""
+import numpy as np
+import pytest
+from calendario import compilar_calendario, descanso_en_tramos, hora_de_netas
+
+def _solape(cal, a, b):
+    # Referencia: solape de cada tramo con cada descanso, uno a uno
+    return [sum(max(0.0, min(y, h) - max(x, d)) for d, h in zip(cal['pausa_desde'], cal['pausa_hasta'])) for x, y in zip(a, b)]
+
+@pytest.mark.parametrize("paso", [1.0, 0.25, 1 / 60])
+def test_descanso_en_tramos(paso):
+    # Descansos solapados y uno que cruza la medianoche, a lo largo de tres días
+    cal = compilar_calendario(6.5, 78.5, [(9.0, 9.5), (9.25, 10.0), (23.5, 0.5)])
+    a = np.arange(6.5, 78.5, paso); b = np.minimum(a + paso, 78.5)
+    assert np.allclose(descanso_en_tramos(cal, a, b), _solape(cal, a, b), atol=1e-12)
+    assert descanso_en_tramos(cal, a, b).sum() == pytest.approx(3 * (1.0 + 1.0))
+
+def test_sin_descansos():
+    cal = compilar_calendario(6.0, 30.0, [])
+    assert not descanso_en_tramos(cal, np.array([6.0, 7.0]), np.array([7.0, 8.0])).any()
+    assert hora_de_netas(cal, 5.0) == 11.0
+    assert hora_de_netas(cal, 25.0) is None
+
+def test_hora_de_netas_salta_descansos():
+    cal = compilar_calendario(6.0, 30.0, [(9.0, 9.5), (23.5, 0.5)])
+    assert hora_de_netas(cal, 3.0) == 9.0
+    assert hora_de_netas(cal, 3.5) == 10.0
+    assert hora_de_netas(cal, 17.5) == 25.0
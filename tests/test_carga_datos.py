@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Descarga con caché, copia local y modo sin conexión contra un servidor HTTP local; parseo por columnas."""
+import http.server
+import os
+import sys
+import threading
+import time
+import pytest
+import carga_datos
+from carga_datos import cargar_datos, limpiar_cache, parsear_datos
+
+# El parseo fila a fila de referencia vive en el banco de pruebas del parseo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from bench_parseo import generar_csv, parsear_por_filas
+
+CONFIG = b"linea_id,turno,oee_global,hora_inicio\n1,1,85,06:00\n2,1,80,07:00\n"
+PLAN = b"linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada\n1,1,Cliente A,Art 1,\"1.500\",800\n2,1,Cliente B,Art 2,900,600\n"
+
+class _Servidor(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    retraso = 0.0
+    peticiones = 0
+
+class _Manejador(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.peticiones += 1
+        time.sleep(self.server.retraso)
+        cuerpo = {"/config.csv": CONFIG, "/plan.csv": PLAN}.get(self.path)
+        try:
+            if cuerpo is None: self.send_error(404); return
+            self.send_response(200); self.send_header("Content-Type", "text/csv"); self.send_header("Content-Length", str(len(cuerpo))); self.end_headers()
+            self.wfile.write(cuerpo)
+        except OSError: pass   # el cliente ya se ha ido por timeout
+
+    def log_message(self, *args): pass
+
+@pytest.fixture
+def servidor():
+    srv = _Servidor(("127.0.0.1", 0), _Manejador)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    limpiar_cache()
+    yield srv
+    srv.shutdown(); srv.server_close(); limpiar_cache()
+
+def _urls(srv):
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    return f"{base}/config.csv", f"{base}/plan.csv"
+
+def test_descarga_normal_y_cache(servidor, tmp_path):
+    snap = str(tmp_path / "snap")
+    estado, h, origen = cargar_datos(*_urls(servidor), dir_snapshot=snap)
+    assert origen == 'red'
+    assert estado['lineas_configuradas'] == [('1', '1'), ('2', '1')]
+    assert estado['plan_data']['1_1']['Cliente A']['articulos'][0]['cantidad'] == 1500
+    assert os.path.exists(os.path.join(snap, "plan.csv"))
+    # Dentro del TTL no se vuelve a descargar
+    peticiones = servidor.peticiones
+    assert cargar_datos(*_urls(servidor), dir_snapshot=snap)[1:] == (h, 'cache')
+    assert servidor.peticiones == peticiones
+
+def test_timeout_sirve_copia_local_y_no_reintenta(servidor, tmp_path):
+    snap = str(tmp_path / "snap")
+    _, h, _ = cargar_datos(*_urls(servidor), dir_snapshot=snap)
+    servidor.retraso = 1.0
+    t0 = time.perf_counter()
+    estado, h2, origen = cargar_datos(*_urls(servidor), forzar=True, dir_snapshot=snap, timeout=0.2)
+    assert (h2, origen) == (h, 'sin_conexion') and estado['lineas_configuradas']
+    assert time.perf_counter() - t0 < 1.0
+    # Las siguientes interacciones usan la copia sin esperar a la red mientras dura la espera de reintento
+    peticiones = servidor.peticiones
+    assert cargar_datos(*_urls(servidor), ttl=0, dir_snapshot=snap, timeout=0.2)[1:] == (h, 'sin_conexion')
+    assert servidor.peticiones == peticiones
+    # Pasada la espera se vuelve a intentar; con la red de vuelta se descarga
+    servidor.retraso = 0.0
+    carga_datos._fallos[tuple(_urls(servidor))] = (time.time() - carga_datos.REINTENTO_SIN_CONEXION_SEG - 1, h)
+    assert cargar_datos(*_urls(servidor), ttl=0, dir_snapshot=snap)[2] == 'red'
+
+@pytest.mark.parametrize("fichero, contenido", [("plan.csv", b"linea_id,turno\n1,"), ("meta.json", b"{no es json")])
+def test_copia_local_danada(servidor, tmp_path, fichero, contenido):
+    snap = str(tmp_path / "snap")
+    cargar_datos(*_urls(servidor), dir_snapshot=snap)
+    with open(os.path.join(snap, fichero), 'wb') as f: f.write(contenido)
+    assert carga_datos.leer_snapshot(snap) is None
+    # Sin red y sin copia válida, el error llega a quien llama
+    urls = _urls(servidor); servidor.shutdown(); servidor.server_close(); limpiar_cache()
+    with pytest.raises(OSError):
+        cargar_datos(*urls, forzar=True, dir_snapshot=snap, timeout=0.5)
+
+def test_sin_conexion_no_sirve_la_copia_de_otra_hoja(servidor, tmp_path):
+    snap = str(tmp_path / "snap")
+    cargar_datos(*_urls(servidor), dir_snapshot=snap)
+    # La hoja pasa a otra URL que no responde: la copia local es de la anterior
+    config, plan = _urls(servidor); limpiar_cache()
+    otra = (config.replace("config.csv", "otra_config.csv"), plan.replace("plan.csv", "otro_plan.csv"))
+    with pytest.raises(OSError):
+        cargar_datos(*otra, forzar=True, dir_snapshot=snap, timeout=0.5)
+    assert carga_datos.leer_snapshot(snap)[2]["urls"] == [config, plan]
+
+# ==========================================
+# Parseo por columnas frente al parseo fila a fila
+# ==========================================
+CONFIG_RARA = ("﻿linea_id,\"turno\",oee_global,hora_inicio,desc_1_inicio,desc_1_fin,desc_1_skip,desc_2_inicio,desc_2_fin,desc_2_skip,desc_3_inicio,desc_3_fin,desc_3_skip\n"
+               "1,1,85,06:00,09:00,09:30,FALSE,,,TRUE,,,TRUE\n"
+               "1.0,2.0,\"9,5\",14:00,18:00,18:15,no,25:00,x,SI,,,\n"
+               "2,,abc,,10:00,,FALSE,12:00,12:30,verdadero,,,1\n"
+               "3,1,,7:5,23:30,00:30,yes,,,,,,\n").encode()
+PLAN_RARO = ("linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada,oee_articulo,act_oee_articulo,hora_entrada_cliente,act_hora_entrada\n"
+             "1,1,Cliente A,Art 1,\"1.500\",800,70,TRUE,08:00,TRUE\n"
+             "1,1,Cliente A,Art 2,\"2,5\",,abc,SI,09:30,FALSE\n"
+             "1.0,1.0,Cliente B,Art 3,,1_000,,verdadero,25:00,TRUE\n"
+             "1,2,Cliente B,Art 4,abc,\"1.200,5\",90,no,,\n"
+             "2,,Cliente C,12.0,300,600,95,1,7:05,yes\n"
+             "2,1,,Art 6,100,100,100,TRUE,,\n"
+             "2,1,Cliente C,,100,100,100,TRUE,,\n"
+             ",1,Cliente D,Art 8,100,100,100,TRUE,,\n"
+             "3,1,Cliente E,Art 9,-40,1e3,150,TRUE,08:00,TRUE\n"
+             "3,1,Cliente E,Art 10,7,  900 ,,FALSE,10:00,TRUE\n"
+             "9,1,Cliente F,Art 11,50,500,,TRUE,,\n").encode()
+
+@pytest.mark.parametrize("raw_config, raw_plan", [(CONFIG_RARA, PLAN_RARO), generar_csv(2000, lineas=8, seed=3)])
+def test_parseo_por_columnas_como_por_filas(raw_config, raw_plan):
+    nuevo, viejo = parsear_datos(raw_config, raw_plan), parsear_por_filas(raw_config, raw_plan)
+    assert nuevo["plan_data"] == viejo["plan_data"]
+    assert nuevo["lineas_configuradas"] == viejo["lineas_configuradas"]
+    for clave, valor in viejo.items():
+        if clave.startswith("l"): assert nuevo[clave] == valor, clave
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Lectores del feed en vivo: socket UDP y archivo que se va ampliando."""
+import gc
+import time
+import pytest
+from en_vivo import LectorArchivo, LectorSocket, enviar_registros
+
+def _leer(lector, n, espera=2.0):
+    registros = []; limite = time.monotonic() + espera
+    while len(registros) < n and time.monotonic() < limite:
+        registros += lector.leer(); time.sleep(0.01)
+    return registros
+
+def test_socket_recibe_registros():
+    lector = LectorSocket(0)
+    try:
+        enviar_registros([{"linea_id": 1, "nombre_articulo": "Pechuga", "producido": "1.500", "hora": "08:30"},
+                          {"linea_id": "2", "turno": 2, "articulo": "Alas", "cantidad": 300}], lector.puerto)
+        r1, r2 = _leer(lector, 2)
+        assert (r1['linea_id'], r1['turno'], r1['producido'], r1['hora']) == ("1", "1", 1500.0, 8.5)
+        assert (r2['linea_id'], r2['turno'], r2['articulo'], r2['producido']) == ("2", "2", "Alas", 300.0)
+    finally: lector.cerrar()
+
+def test_socket_un_lector_por_puerto_y_cierre():
+    lector = LectorSocket(0); puerto = lector.puerto
+    with pytest.raises(OSError): LectorSocket(puerto)
+    lector.cerrar(); lector.cerrar()
+    assert lector.sock.fileno() == -1
+    # Sin `cerrar` (la sesión termina), el socket se cierra al descartar el lector
+    lector = LectorSocket(puerto); sock = lector.sock
+    del lector; gc.collect()
+    assert sock.fileno() == -1
+    LectorSocket(puerto).cerrar()
+
+def test_archivo_lee_solo_lineas_completas(tmp_path):
+    ruta = tmp_path / "feed.csv"
+    ruta.write_text("linea_id,nombre_articulo,producido\n1,Pechuga,100\n1,Mus", encoding="utf-8")
+    lector = LectorArchivo(str(ruta))
+    assert [r['producido'] for r in lector.leer()] == [100.0]
+    with open(ruta, "a", encoding="utf-8") as f: f.write("lo,50\n")
+    assert [(r['articulo'], r['producido']) for r in lector.leer()] == [("Muslo", 50.0)]
+    assert lector.leer() == []
+
+# ==========================================
+# Re-previsión
+# ==========================================
+from motor_simulacion import crear_simulacion, simular_planta
+from en_vivo import PrevisionEnVivo, cola_restante, hora_en_eje, normalizar_registro, reprever_linea
+
+def _sim(lid, turno, inicio, articulos):
+    """Línea sin descansos; `articulos` = [(cliente, artículo, cantidad, velocidad)]."""
+    clientes = {}
+    for c, a, q, v in articulos: clientes.setdefault(c, {"articulos": [], "hora_entrada": None, "tiene_hora": False})["articulos"].append({"nombre": a, "cantidad": q, "velocidad": v, "oee": 100})
+    return crear_simulacion(lid, turno, inicio, [], clientes, con_resumen=False)
+
+def _registro(lid, turno, articulo, producido, hora):
+    return normalizar_registro({"linea_id": lid, "turno": turno, "nombre_articulo": articulo, "producido": producido, "hora": hora})
+
+def test_hora_en_eje_tras_la_medianoche():
+    assert hora_en_eje(1.5, 14.0) == 25.5
+    assert hora_en_eje(1.5, 6.0, ultima=23.0) == 25.5
+    assert hora_en_eje(9.75, 6.0, ultima=10.0) == 9.75   # un dato algo atrasado no salta al día siguiente
+    assert hora_en_eje(5.5, 6.0) == 5.5 and hora_en_eje(20.0, 6.0) == 20.0
+    assert hora_en_eje(3.0, 14.0, ultima=25.5) == 27.0
+
+def test_cola_restante_descuenta_en_orden_sin_tocar_la_cola():
+    sim = _sim("1", "1", 6.0, [("A", "Pechuga", 1000, 500), ("B", "Pechuga", 800, 500), ("A", "Alas", 600, 300)])
+    cola = cola_restante(sim['queue'], {(None, "Pechuga"): 1300, ("A", "Alas"): 600})
+    assert [(j.cliente, j.articulo, j.pendiente) for j in cola] == [("B", "Pechuga", 500)]
+    assert [j.pendiente for j in sim['queue']] == [1000, 600, 800]
+
+def test_reprever_linea_estados():
+    sim = _sim("1", "1", 6.0, [("A", "Pechuga", 4000, 1000)])
+    assert reprever_linea(sim, {}, 6.0) == {"fin": 10.0, "pendiente": 4000, "estado": 'en_curso'}
+    # Va con retraso: a las 09:00 sólo lleva 1000, le quedan 3 h
+    assert reprever_linea(sim, {(None, "Pechuga"): 1000}, 9.0)['fin'] == pytest.approx(12.0)
+    assert reprever_linea(sim, {(None, "Pechuga"): 1000}, 9.0, corte=11.0) == {"fin": 11.0, "pendiente": 3000, "estado": 'cortada'}
+    assert reprever_linea(sim, {(None, "Pechuga"): 4000}, 9.0)['estado'] == 'terminada'
+    assert reprever_linea(sim, {}, 6.0, fin_horizonte=8.0)['estado'] == 'sin_terminar'
+    assert sim['queue'][0].pendiente == 4000 and sim['end_time'] is None
+
+def test_prevision_sigue_el_plan_y_solo_recalcula_lo_que_cambia():
+    sims = [_sim("1", "1", 6.0, [("A", "Pechuga", 4000, 1000)]), _sim("2", "1", 6.0, [("B", "Alas", 3000, 1000)])]
+    plan = simular_planta([dict(s) for s in sims], cache=False)
+    prev = PrevisionEnVivo(sims)
+    assert prev.actualizar([]) == {("1", "1"), ("2", "1")}
+    assert {lt: p['fin'] for lt, p in prev.prevision.items()} == {(s['id'], s['turno']): s['end_time'] for s in plan['sims']}
+    assert prev.actualizar([_registro("1", "1", "Pechuga", 1000, "09:00")]) == {("1", "1")}
+    assert prev.prevision[("1", "1")]['fin'] == pytest.approx(12.0) and prev.ahora == 9.0
+    assert prev.totales() == (1000, 6000)
+
+def test_prevision_con_datos_tras_la_medianoche():
+    # Planta que arranca a las 06:00; el T2 de la línea 1 empieza a las 14:00 y acaba de madrugada
+    sims = [_sim("1", "1", 6.0, [("A", "Pechuga", 2000, 1000)]), _sim("1", "2", 14.0, [("B", "Alas", 12000, 1000)])]
+    prev = PrevisionEnVivo(sims, {"1": 14.0})
+    prev.actualizar([_registro("1", "2", "Alas", 9000, "23:00")])
+    assert prev.ahora == 23.0 and prev.prevision[("1", "2")]['fin'] == pytest.approx(26.0)
+    prev.actualizar([_registro("1", "2", "Alas", 11500, "01:30")])
+    assert prev.ahora == 25.5 and prev.prevision[("1", "2")]['fin'] == pytest.approx(26.0)
+    prev.actualizar([_registro("1", "2", "Alas", 12000, "01:50")])
+    p = prev.prevision[("1", "2")]
+    assert p['estado'] == 'terminada' and p['fin'] == pytest.approx(25 + 50 / 60)
+    assert prev.fin_turno('2') == (pytest.approx(25 + 50 / 60), False)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""El motor por eventos frente al bucle horario original, sobre plantas aleatorias.
+
+`_bucle_horario` es el bucle por tramos de una hora de la versión anterior del Gemelo,
+con las colas como diccionarios; el motor actual debe dar los mismos fines, producción,
+horas e historias. Se limita a los casos que el bucle original resolvía bien: origen en
+hora en punto y descansos de un mismo día que no se solapan.
+"""
+import copy
+import datetime
+import random
+from collections import deque
+import pytest
+from motor_simulacion import Pedido, crear_simulacion, simular_planta
+
+# ==========================================
+# 1. BUCLE HORARIO ORIGINAL
+# ==========================================
+def _descanso_en_tramo(desde, hasta, descansos):
+    total = 0.0
+    for i in range(1, 4):
+        if not descansos[f'skip_{i}']:
+            s = descansos[f'start_{i}']; e = descansos[f'end_{i}']
+            if s == 0.0 and e == 0.0: continue
+            total += max(0, min(hasta, e) - max(desde, s))
+    return total
+
+def _tramo(sim, t, paso=1.0):
+    if not sim['active']: return 0
+    t_ini = max(sim['start_time'], t); t_fin = t + paso
+    if t_ini >= t_fin: return 0
+    d_ini, d_fin = t_ini % 24, t_fin % 24
+    if d_fin < d_ini: d_fin += 24
+    descanso = _descanso_en_tramo(d_ini, d_fin, sim['breaks'])
+    neto = max(0, (t_fin - t_ini) - descanso)
+    producido = 0; trabajado = 0.0
+    while trabajado < neto:
+        if not sim['current_job']:
+            if not sim['queue']: sim['active'] = False; sim['end_time'] = t_ini + trabajado + descanso; break
+            ahora = t_ini + trabajado + descanso
+            if sim['queue'][0]['hora_entrada'] > (ahora % 24) and ahora < 24: break
+            sim['current_job'] = sim['queue'].popleft()
+        job = sim['current_job']
+        dt = min(job['pendiente'] / job['vel_real'], neto - trabajado); q = dt * job['vel_real']
+        job['pendiente'] -= q; producido += q; trabajado += dt; sim['producido'] += q
+        if job['pendiente'] < 0.1: sim['current_job'] = None
+    sim['horas_netas'] += trabajado; sim['horas_descanso'] += descanso
+    if producido > 0 or sim['active']: sim['history'].append((int(t_fin), producido, sim['producido']))
+    if sim['active']: sim['end_time'] = t_fin
+    return producido
+
+def _bucle_horario(sims, cortes):
+    for s in sims: s['history'] = []
+    origen = min(s['start_time'] for s in sims); t = origen; seguir = True; ticks = []
+    while seguir:
+        seguir = False; t += 1.0; prod = {'1': 0, '2': 0}; fin = {'1': 0, '2': 0}
+        for s in sims:
+            if s['turno'] == '1' and s['active'] and s['id'] in cortes and t > cortes[s['id']]:
+                s['active'] = False; s['interrupted'] = True; s['end_time'] = cortes[s['id']]
+            prod[s['turno']] += _tramo(s, t - 1.0)
+            if s['active']: seguir = True
+            f = s['end_time'] if s['end_time'] else s['start_time'] + s['horas_netas'] + s['horas_descanso']
+            fin[s['turno']] = max(fin[s['turno']], f)
+        ticks.append((t, prod, fin))
+        if t > origen + 48: break
+    return t, ticks
+
+# ==========================================
+# 2. PLANTAS ALEATORIAS
+# ==========================================
+def _hora(h):
+    h = h % 24; return datetime.time(int(h), int(round((h - int(h)) * 60)) % 60)
+
+def _planta(r):
+    planta = []
+    for lid in range(1, r.randint(1, 6)):
+        for turno in (['1', '2'] if r.random() < 0.5 else ['1']):
+            inicio = r.choice([6, 7, 7.5, 8, 13.25, 14, 22, 23.5]) if turno == '1' else r.choice([14, 15, 22])
+            descansos = {}
+            for i in range(1, 4):
+                s = r.choice([0, 9, 10.5, 12, 13, 17, 20, 23.5, 1]); e = s + r.choice([0.25, 0.5, 1, 0.75])
+                descansos.update({f'start_{i}': s, f'end_{i}': e % 24 if r.random() < 0.1 else e, f'skip_{i}': r.random() < 0.3})
+            clientes = {}
+            for c in range(r.randint(1, 4)):
+                he = _hora(r.choice([0, 8, 9.5, 12, 15, 20])) if r.random() < 0.6 else None
+                articulos = [{"nombre": f"a{a}", "cantidad": r.choice([0, 50, 500, 1234, 5000, 20000]), "velocidad": r.choice([300, 800, 1000, 2500]),
+                              "oee": r.choice([50, 85, 100])} for a in range(r.randint(1, 4))]
+                clientes[f"c{c}"] = {"nombre": f"c{c}", "articulos": articulos, "hora_entrada": he, "tiene_hora": he is not None and r.random() < 0.8}
+            planta.append((str(lid), turno, float(inicio), descansos, clientes))
+    return planta
+
+def _comparable(planta):
+    """Origen en hora en punto y descansos activos dentro del día y sin solapes."""
+    if not planta or min(p[2] for p in planta) % 1: return False
+    for _, _, _, d, _ in planta:
+        activos = sorted((d[f'start_{i}'], d[f'end_{i}']) for i in range(1, 4) if not d[f'skip_{i}'] and (d[f'start_{i}'], d[f'end_{i}']) != (0, 0))
+        if any(e < s or e > 24 for s, e in activos) or any(b[0] < a[1] for a, b in zip(activos, activos[1:])): return False
+    return True
+
+def _simulaciones(planta):
+    sims = [crear_simulacion(lid, t, inicio, dict(d), copy.deepcopy(c)) for lid, t, inicio, d, c in planta]
+    return [s for s in sims if s]
+
+def _cerca(x, y):
+    return (x is None and y is None) or (x is not None and y is not None and abs(x - y) < 1e-6 * max(1, abs(x)))
+
+# ==========================================
+# 3. COMPARACIÓN
+# ==========================================
+SEMILLAS = range(600)
+
+@pytest.mark.parametrize("bloque", range(6))
+def test_motor_como_bucle_horario(bloque):
+    comparadas = 0
+    for semilla in SEMILLAS[bloque::6]:
+        r = random.Random(semilla); planta = _planta(r)
+        if not _comparable(planta): continue
+        viejo, nuevo = _simulaciones(planta), _simulaciones(planta)
+        if not viejo: continue
+        cortes = {lid: inicio for lid, t, inicio, _, _ in planta if t == '2'} if r.random() < 0.7 else {}
+        colas = [list(s['queue']) for s in nuevo]; pendientes = [[p.pendiente for p in c] for c in colas]
+        for s in viejo: s['queue'] = deque({c: getattr(p, c) for c in Pedido.__slots__} for p in s['queue'])
+        fin, ticks = _bucle_horario(viejo, cortes)
+        res = simular_planta(nuevo, cortes, cache=False)
+        assert _cerca(fin, res['fin']) and len(ticks) == len(res['t']), semilla
+        for k, (t, prod, fin_turno) in enumerate(ticks):
+            assert _cerca(t, res['t'][k]), semilla
+            assert all(_cerca(prod[tu], res['prod'][tu][k] if tu in res['prod'] else 0) for tu in prod), semilla
+            assert all(_cerca(fin_turno[tu], res['fin_turno'][tu][k] if tu in res['fin_turno'] else 0) for tu in fin_turno), semilla
+        for a, b in zip(viejo, nuevo):
+            for campo in ('end_time', 'producido', 'horas_netas', 'horas_descanso'): assert _cerca(a[campo], b[campo]), (semilla, a['id'], a['turno'], campo)
+            assert (a['active'], a['interrupted']) == (b['active'], b['interrupted']), semilla
+            h = b['historial']
+            assert [x[0] for x in a['history']] == [int(t) for t in h['t']], semilla
+            assert all(_cerca(x[1], p) and _cerca(x[2], ac) for x, p, ac in zip(a['history'], h['prod'], h['acum'])), semilla
+        # Los pedidos de la cola de entrada no se tocan: el motor trabaja con copias
+        assert [[p.pendiente for p in c] for c in colas] == pendientes, semilla
+        comparadas += 1
+    assert comparadas >= 10
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Rejilla agrupada con y sin los módulos enterprise de AG Grid."""
+import pandas as pd
+from graficos import rejilla_agrupada
+
+DF = pd.DataFrame({"Línea": ["L1", "L2", "L1", "L2", "L1"], "Cliente": ["A", "B", "B", "B", "A"], "Artículo": ["a1", "b1", "b2", "b3", "a2"]})
+
+def test_community_ordena_y_muestra_cada_grupo_una_vez():
+    filas, opciones = rejilla_agrupada(DF, ["Línea", "Cliente"])
+    assert filas.values.tolist() == [["L1", "A", "a1"], ["", "", "a2"], ["", "B", "b2"], ["L2", "B", "b1"], ["", "", "b3"]]
+    assert not opciones['defaultColDef']['sortable'] and 'autoGroupColumnDef' not in opciones
+    assert not any(c.get('rowGroup') for c in opciones['columnDefs'])
+    assert DF['Línea'].tolist() == ["L1", "L2", "L1", "L2", "L1"]
+
+def test_enterprise_agrupa_filas():
+    filas, opciones = rejilla_agrupada(DF, ["Línea", "Cliente"], "Línea / Cliente", enterprise=True)
+    assert filas is DF
+    assert [c['field'] for c in opciones['columnDefs'] if c.get('rowGroup')] == ["Línea", "Cliente"]
+    assert opciones['autoGroupColumnDef']['headerName'] == "Línea / Cliente"
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Histórico: guardar, cargar y borrar ejecuciones antiguas."""
+import time
+import pytest
+import historico
+from historico import borrar_anteriores, cargar_ejecucion, conectar, guardar_simulacion, listar_ejecuciones
+from motor_simulacion import crear_simulacion, simular_planta
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "historico.sqlite")
+
+@pytest.fixture
+def resultado():
+    clientes = {"C": {"articulos": [{"nombre": "A", "cantidad": 3000, "velocidad": 1000, "oee": 100}], "hora_entrada": None, "tiene_hora": False}}
+    return simular_planta([crear_simulacion("1", "1", 6.0, [], clientes)])
+
+def _envejecer(ruta, eid, dias):
+    with conectar(ruta) as con: con.execute("UPDATE ejecuciones SET creado = ? WHERE id = ?", (time.time() - dias * 86400, eid))
+    con.close()
+
+def _filas(ruta, tabla):
+    con = conectar(ruta)
+    try: return con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    finally: con.close()
+
+def test_guardar_y_cargar(ruta, resultado):
+    eid = guardar_simulacion(resultado, plan_hash="abc", ruta=ruta)
+    e = cargar_ejecucion(eid, ruta=ruta)
+    assert e['meta']['total'] == 3000 and e['meta']['plan_hash'] == "abc"
+    assert e['lineas'][['linea', 'turno', 'producido', 'fin', 'estado']].values.tolist() == [["1", "1", 3000.0, 9.0, "terminada"]]
+    assert e['series'][("1", "1")]['Acum'].iat[-1] == 3000
+
+def test_guardar_borra_las_antiguas(ruta, resultado, monkeypatch):
+    vieja = guardar_simulacion(resultado, ruta=ruta); _envejecer(ruta, vieja, historico.DIAS_CONSERVAR + 1)
+    reciente = guardar_simulacion(resultado, ruta=ruta); _envejecer(ruta, reciente, historico.DIAS_CONSERVAR - 1)
+    nueva = guardar_simulacion(resultado, ruta=ruta)
+    assert listar_ejecuciones(ruta=ruta)['id'].tolist() == [nueva, reciente]
+    # Las líneas y series de la ejecución borrada se van con ella
+    assert _filas(ruta, "lineas") == 2 and _filas(ruta, "series") == 4
+    assert cargar_ejecucion(vieja, ruta=ruta) is None
+
+    monkeypatch.setattr(historico, "DIAS_CONSERVAR", None)
+    _envejecer(ruta, nueva, 1000); guardar_simulacion(resultado, ruta=ruta)
+    assert len(listar_ejecuciones(ruta=ruta)) == 3
+    assert borrar_anteriores(30, ruta=ruta) == 2 and len(listar_ejecuciones(ruta=ruta)) == 1
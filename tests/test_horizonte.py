@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Horizonte de varios días frente a `simular_planta`, también con arranques fuera de la hora en punto."""
+import pytest
+from carga_datos import parsear_datos
+from horizonte import planificar_horizonte
+from motor_simulacion import simulaciones_desde_estado, simular_planta
+
+PLAN = (b"linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada\n"
+        b"1,1,A,Pechuga,12000,1500\n1,1,B,Muslo,4000,1000\n2,1,C,Alas,9500,800\n1,2,D,Filete,8000,1200\n2,2,E,Alitas,60000,700\n")
+
+def _estado(h1, h2, h3, h4):
+    config = ("linea_id,turno,oee_global,hora_inicio,desc_1_inicio,desc_1_fin,desc_1_skip\n"
+              f"1,1,85,{h1},10:00,10:30,FALSE\n2,1,80,{h2},11:10,11:40,FALSE\n1,2,85,{h3},18:00,18:30,FALSE\n2,2,90,{h4},,,TRUE\n").encode()
+    return parsear_datos(config, PLAN)
+
+@pytest.mark.parametrize("horas", [("06:00", "07:00", "14:00", "15:00"), ("06:36", "07:10", "14:20", "15:45"), ("06:25", "06:50", "13:55", "14:05")])
+@pytest.mark.parametrize("paso", [1.0, 0.25])
+def test_primer_dia_como_simular_planta(horas, paso):
+    estado = _estado(*horas)
+    sims, cortes = simulaciones_desde_estado(estado, True)
+    planta = simular_planta(sims, cortes, 48.0, paso, cache=False)
+    origen = min(s['start_time'] for s in sims)
+    hor = planificar_horizonte(estado, paso, arrastrar=False, holgura=origen + 24)
+    turnos = hor['turnos'].set_index(['linea_id', 'turno'])
+    for s in planta['sims']:
+        fila = turnos.loc[(s['id'], s['turno'])]
+        fin = s['end_time'] if s['end_time'] else s['start_time'] + s['horas_netas'] + s['horas_descanso']
+        assert fila['producido'] == pytest.approx(s['producido']) and fila['fin'] == pytest.approx(fin)
+    assert hor['acum'][-1] == pytest.approx(sum(s['producido'] for s in planta['sims']))
+
+@pytest.mark.parametrize("inicio", ["06:36", "06:07", "05:59"])
+@pytest.mark.parametrize("paso", [1.0, 0.25, 1 / 12])
+def test_arranque_fuera_de_hora(inicio, paso):
+    # La rejilla global y la de cada turno deben tener el mismo número de tramos (antes: IndexError)
+    hor = planificar_horizonte(_estado(inicio, "07:10", "14:20", "15:45"), paso)
+    assert len(hor['t']) == len(hor['prod'])
+    assert hor['acum'][-1] == pytest.approx(hor['turnos']['producido'].sum())
+    assert hor['t'][-1] >= hor['fin'] - 1e-9
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Simulación por lotes: nombres de plan únicos y validación de argumentos."""
+import pandas as pd
+import pytest
+from lotes import emparejar, main
+
+CONFIG = "linea_id,turno,oee_global,hora_inicio,desc_1_inicio,desc_1_fin,desc_1_skip\n1,1,85,06:00,10:00,10:30,FALSE\n"
+PLAN = "linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada\n1,1,A,Pechuga,{}, 1000\n"
+
+@pytest.fixture
+def planes(tmp_path):
+    # Dos plan.csv con el mismo nombre en carpetas distintas, y configuración por carpeta
+    for carpeta, cantidad in (("norte", 4000), ("sur", 6000)):
+        (tmp_path / "planes" / carpeta).mkdir(parents=True); (tmp_path / "config" / carpeta).mkdir(parents=True)
+        (tmp_path / "planes" / carpeta / "plan.csv").write_text(PLAN.format(cantidad))
+        (tmp_path / "config" / carpeta / "plan.csv").write_text(CONFIG)
+    (tmp_path / "config_lineas.csv").write_text(CONFIG)
+    return tmp_path
+
+def test_nombres_unicos_con_mismo_fichero(planes):
+    pares = emparejar(str(planes / "config_lineas.csv"), [str(planes / "planes" / "norte"), str(planes / "planes" / "sur")])
+    assert [n for _, _, n in pares] == ["norte/plan.csv", "sur/plan.csv"]
+    pares = emparejar(str(planes / "config"), [str(planes / "planes" / "sur"), str(planes / "planes" / "norte" / "plan.csv")])
+    assert [(c.endswith("sur/plan.csv"), n) for c, _, n in pares] == [(True, "sur/plan.csv"), (False, "norte/plan.csv")]
+    assert [n for _, _, n in emparejar(str(planes / "config_lineas.csv"), [str(planes / "planes" / "sur")])] == ["plan.csv"]
+
+def test_main_escribe_un_resumen_por_plan(planes):
+    salida = planes / "resumen.csv"
+    assert main(["--config", str(planes / "config_lineas.csv"), str(planes / "planes" / "norte"), str(planes / "planes" / "sur"), "--salida", str(salida), "--procesos", "1"]) == 0
+    plantas = pd.read_csv(planes / "resumen_global.csv").set_index("Plan")
+    assert plantas["Barquetas Totales"].to_dict() == {"norte/plan.csv": 4000, "sur/plan.csv": 6000}
+    assert set(pd.read_csv(salida)["Plan"]) == {"norte/plan.csv", "sur/plan.csv"}
+
+@pytest.mark.parametrize("argumentos", [["--resolucion-min", "0"], ["--resolucion-min", "-15"], ["--procesos", "0"]])
+def test_argumentos_no_positivos(planes, argumentos, capsys):
+    with pytest.raises(SystemExit) as e: main(["--config", str(planes / "config_lineas.csv"), str(planes / "planes" / "sur"), *argumentos])
+    assert e.value.code == 2 and "mayor que 0" in capsys.readouterr().err
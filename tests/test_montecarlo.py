@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Barrido Monte Carlo: sin incertidumbre reproduce el motor; percentiles ordenados y cortes por T2."""
+import datetime
+import random
+import numpy as np
+import pytest
+from montecarlo import TAM_BLOQUE, barrido_montecarlo
+from motor_simulacion import crear_simulacion, simular_planta
+
+def _planta(semilla):
+    r = random.Random(semilla); planta = []
+    for lid in range(1, r.randint(2, 6)):
+        for turno, inicio in (('1', r.choice([6.0, 6.5, 7.0, 22.0])), ('2', r.choice([14.0, 15.0])))[:r.randint(1, 2)]:
+            clientes = {}
+            for c in range(r.randint(1, 3)):
+                he = r.choice([None, 8.0, 9.5, 12.0])
+                clientes[f"C{c}"] = {"articulos": [{"nombre": f"A{a}", "cantidad": r.choice([50, 500, 3000, 9000]), "velocidad": r.choice([300, 800, 1200]),
+                                                    "oee": r.choice([60, 85, 100])} for a in range(r.randint(1, 3))],
+                                     "hora_entrada": datetime.time(int(he), int(he % 1 * 60)) if he else None, "tiene_hora": he is not None}
+            descansos = r.sample([(9.0, 9.25), (10.0, 10.5), (13.0, 13.5), (18.0, 18.25), (23.5, 0.5)], r.randint(0, 3))
+            planta.append((str(lid), turno, inicio, descansos, clientes))
+    cortes = {lid: inicio for lid, t, inicio, _, _ in planta if t == '2'}
+    return planta, cortes
+
+def _sims(planta):
+    return [s for s in (crear_simulacion(lid, t, inicio, list(d), c, con_resumen=False) for lid, t, inicio, d, c in planta) if s]
+
+@pytest.mark.parametrize("semilla", range(40))
+@pytest.mark.parametrize("paso", [1.0, 0.25])
+def test_sin_incertidumbre_reproduce_simular_planta(semilla, paso):
+    planta, cortes = _planta(semilla)
+    mc = barrido_montecarlo(_sims(planta), n_escenarios=3, cortes=cortes, procesos=1, paso=paso)
+    for c, s in enumerate(simular_planta(_sims(planta), cortes, paso=paso, cache=False)['sims']):
+        assert np.allclose(mc['producido'][:, c], s['producido'])
+        assert (mc['interrumpido'][:, c] == s['interrupted']).all()
+        assert (mc['terminado'][:, c] == (not s['active'] and not s['interrupted'])).all()
+        if s['end_time'] is not None: assert np.allclose(mc['fin'][:, c], s['end_time'])
+
+def _linea(lid, turno, inicio, cantidad, velocidad=1000):
+    clientes = {"C": {"articulos": [{"nombre": "A", "cantidad": cantidad, "velocidad": velocidad, "oee": 100}], "hora_entrada": None, "tiene_hora": False}}
+    return crear_simulacion(lid, turno, inicio, [], clientes, con_resumen=False)
+
+def test_percentiles_ordenados_y_cortes_por_t2():
+    # L1 acaba con holgura antes de su T2, L2 nunca llega y L3 va justa (8 h de trabajo en 8 h de turno)
+    sims = [_linea("1", "1", 6.0, 4000), _linea("1", "2", 14.0, 1000), _linea("2", "1", 6.0, 12000), _linea("2", "2", 14.0, 1000),
+            _linea("3", "1", 6.0, 8000), _linea("3", "2", 14.0, 1000)]
+    cortes = {"1": 14.0, "2": 14.0, "3": 14.0}
+    mc = barrido_montecarlo(sims, n_escenarios=2000, oee={"dist": "normal", "media": 0.0, "desv": 5.0}, velocidad={"dist": "uniforme", "min": -0.1, "max": 0.1},
+                            cortes=cortes, semilla=7, procesos=1)
+    lineas = mc['lineas'].set_index("Línea/Turno"); turnos = mc['turnos'].set_index("Turno")
+    for df, col in ((lineas, "Fin"), (lineas, "Barquetas"), (turnos, "Fin"), (turnos, "Total")):
+        p = df[[f"{col} P50", f"{col} P90", f"{col} P99"]].dropna().to_numpy()
+        assert (np.diff(p, axis=1) >= -1e-9).all()
+    assert lineas.loc["L1 (T1)", "% Cortado"] == 0 and lineas.loc["L2 (T1)", "% Cortado"] == 100
+    assert 0 < lineas.loc["L3 (T1)", "% Cortado"] < 100
+    assert (lineas.loc[["L1 (T2)", "L2 (T2)", "L3 (T2)"], "% Cortado"] == 0).all()
+    # Una línea cortada no pasa de la hora del T2 ni se cuenta como terminada
+    assert (mc['fin'][mc['interrumpido']] == 14.0).all() and not (mc['interrumpido'] & mc['terminado']).any()
+
+def test_bloques_en_paralelo_como_en_serie():
+    planta, cortes = _planta(3)
+    kw = dict(n_escenarios=TAM_BLOQUE + 10, oee={"dist": "normal", "media": 0.0, "desv": 5.0}, cortes=cortes, semilla=11)
+    serie, paralelo = barrido_montecarlo(_sims(planta), procesos=1, **kw), barrido_montecarlo(_sims(planta), procesos=2, **kw)
+    assert serie['escenarios'] == paralelo['escenarios'] == TAM_BLOQUE + 10
+    assert np.array_equal(serie['producido'], paralelo['producido']) and np.array_equal(serie['fin'], paralelo['fin'], equal_nan=True)
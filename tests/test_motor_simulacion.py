@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Preparación de líneas desde la hoja de configuración y caché de resultados por línea."""
+import datetime
+import pytest
+import motor_simulacion
+from carga_datos import parsear_datos
+from motor_simulacion import crear_simulacion, limpiar_cache_lineas, simulaciones_desde_estado, simular_linea_cacheada, simular_planta
+
+PLAN = b"linea_id,turno,nombre_cliente,nombre_articulo,barquetas_pedido,velocidad_estimada,oee_articulo\n1,1,A,Pechuga,8000,1000,100\n"
+
+def _linea(desc_inicio, desc_fin):
+    config = ("linea_id,turno,oee_global,hora_inicio,desc_1_inicio,desc_1_fin,desc_1_skip\n"
+              f"1,1,100,08:00,{desc_inicio},{desc_fin},FALSE\n").encode()
+    sims, cortes = simulaciones_desde_estado(parsear_datos(config, PLAN))
+    return simular_planta(sims, cortes, cache=False)['sims'][0]
+
+@pytest.mark.parametrize("desc_inicio, desc_fin", [("12:00", ""), ("", "12:00"), ("", "")])
+def test_descanso_incompleto_no_se_aplica(desc_inicio, desc_fin):
+    s = _linea(desc_inicio, desc_fin)
+    assert s['breaks'] == [] and s['breaks_desc'] == ""
+    assert (s['end_time'], s['horas_descanso'], s['producido']) == (16.0, 0.0, 8000)
+
+@pytest.mark.parametrize("desc_inicio, desc_fin, fin", [("12:00", "12:30", 16.5), ("23:30", "00:00", 16.0)])
+def test_descanso_completo(desc_inicio, desc_fin, fin):
+    s = _linea(desc_inicio, desc_fin)
+    assert s['breaks_desc'] == f"{desc_inicio}-{desc_fin}"
+    assert s['end_time'] == pytest.approx(fin)
+
+# ==========================================
+# Caché de líneas
+# ==========================================
+def _sim(inicio=6.0, descansos=((10.0, 10.5),), cantidad=6000, hora_entrada=None, velocidad=1000, oee=85):
+    clientes = {"A": {"articulos": [{"nombre": "Pechuga", "cantidad": 2000, "velocidad": 800, "oee": 100}], "hora_entrada": None, "tiene_hora": False},
+                "B": {"articulos": [{"nombre": "Alas", "cantidad": cantidad, "velocidad": velocidad, "oee": oee}],
+                      "hora_entrada": hora_entrada, "tiene_hora": hora_entrada is not None}}
+    return crear_simulacion("1", "1", inicio, list(descansos), clientes, con_resumen=False)
+
+@pytest.fixture
+def simulaciones(monkeypatch):
+    """Cuenta las llamadas reales a `simular_linea` con la caché vacía."""
+    limpiar_cache_lineas(); llamadas = []
+    original = motor_simulacion.simular_linea
+    monkeypatch.setattr(motor_simulacion, "simular_linea", lambda *a, **k: (llamadas.append(a[0]['id']), original(*a, **k))[1])
+    yield llamadas
+    limpiar_cache_lineas()
+
+def _resultado(sim):
+    return (sim['end_time'], sim['producido'], sim['horas_netas'], sim['horas_descanso'], sim['active'], sim['interrupted'], list(sim['historial']['acum']))
+
+def test_misma_linea_sale_de_la_cache(simulaciones):
+    a = simular_linea_cacheada(_sim(), 6.0, 14.0)
+    b = simular_linea_cacheada(_sim(), 6.0, 14.0)
+    assert len(simulaciones) == 1 and _resultado(a) == _resultado(b)
+    # La cola devuelta es una copia: vaciarla no altera lo guardado
+    b['queue'].clear()
+    assert list(simular_linea_cacheada(_sim(), 6.0, 14.0)['queue']) == list(a['queue'])
+
+@pytest.mark.parametrize("cambio", [
+    dict(sim=dict(cantidad=7000)), dict(sim=dict(hora_entrada=datetime.time(9, 0))), dict(sim=dict(descansos=((11.0, 11.5),))),
+    dict(sim=dict(inicio=7.0)), dict(sim=dict(oee=60)), dict(sim=dict(velocidad=1200)),
+    dict(corte=12.0), dict(corte=None), dict(origen=5.0), dict(paso=0.25), dict(horizonte=10.0)])
+def test_cambio_en_la_clave_vuelve_a_simular(simulaciones, cambio):
+    args = dict(origen=6.0, corte=14.0, horizonte=48.0, paso=1.0)
+    simular_linea_cacheada(_sim(), **args)
+    args.update({k: v for k, v in cambio.items() if k != 'sim'})
+    r = simular_linea_cacheada(_sim(**cambio.get('sim', {})), **args)
+    assert len(simulaciones) == 2
+    # Y el resultado es el de simular sin caché
+    directo = _sim(**cambio.get('sim', {})); motor_simulacion.simular_linea(directo, **args)
+    assert _resultado(r) == _resultado(directo)
+
+def test_lru_descarta_la_menos_usada(simulaciones, monkeypatch):
+    monkeypatch.setattr(motor_simulacion, "MAX_LINEAS_CACHE", 2)
+    a, b, c = (dict(inicio=h) for h in (6.0, 7.0, 8.0))
+    simular_linea_cacheada(_sim(**a), 6.0); simular_linea_cacheada(_sim(**b), 6.0)
+    simular_linea_cacheada(_sim(**a), 6.0)          # acierto: `a` pasa a ser la más reciente
+    simular_linea_cacheada(_sim(**c), 6.0)          # expulsa a `b`
+    assert len(simulaciones) == 3
+    simular_linea_cacheada(_sim(**a), 6.0); simular_linea_cacheada(_sim(**c), 6.0)
+    assert len(simulaciones) == 3
+    simular_linea_cacheada(_sim(**b), 6.0)
+    assert len(simulaciones) == 4
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Secuenciación: la propuesta nunca empeora el orden actual y el motor la confirma."""
+import datetime
+import random
+import time
+import pytest
+from motor_simulacion import crear_simulacion, simular_planta
+from optimizador import aplicar_orden, optimizar_planta
+
+def _planta(semilla, lineas=6, pedidos=(2, 12), primera=1):
+    """[(id, turno, inicio, descansos, clientes)] con horas de entrada que obligan a esperar."""
+    r = random.Random(semilla); planta = []
+    for lid in range(primera, primera + lineas):
+        for turno, inicio in (('1', r.choice([6.0, 7.0, 7.5])), ('2', 14.0))[:r.randint(1, 2)]:
+            clientes = {}
+            for c in range(r.randint(*pedidos) // 2 or 1):
+                he = r.choice([None, 8.0, 9.5, 12.0, 16.0])
+                clientes[f"C{c}"] = {"articulos": [{"nombre": f"A{c}_{a}", "cantidad": r.choice([500, 2000, 6000]), "velocidad": r.choice([400, 1000]), "oee": 85}
+                                                   for a in range(r.randint(1, 2))],
+                                     "hora_entrada": datetime.time(int(he), int(he % 1 * 60)) if he else None, "tiene_hora": he is not None}
+            planta.append((str(lid), turno, inicio, [(10.0, 10.5), (18.0, 18.25)], clientes))
+    return planta
+
+def _sims(planta):
+    return [crear_simulacion(lid, t, inicio, list(d), c) for lid, t, inicio, d, c in planta]
+
+def _cortes(planta):
+    return {lid: inicio for lid, t, inicio, _, _ in planta if t == '2'}
+
+@pytest.mark.parametrize("semilla", range(8))
+def test_propuesta_no_empeora_y_coincide_con_el_motor(semilla):
+    planta = _planta(semilla); cortes = _cortes(planta)
+    propuesta = optimizar_planta(_sims(planta), cortes)
+    for r in propuesta.values():
+        a, p = r['actual'], r['propuesta']
+        if a['terminado']: assert p['terminado'] and p['fin'] <= a['fin'] + 1e-9
+        else: assert p['terminado'] or p['producido'] >= a['producido'] - 1e-6
+    # Con el orden propuesto aplicado, el motor da la misma hora de fin y producción
+    sims = [aplicar_orden(s, propuesta[f"{s['id']}_{s['turno']}"]['orden']) for s in _sims(planta)]
+    for s in simular_planta(sims, cortes, cache=False)['sims']:
+        p = propuesta[f"{s['id']}_{s['turno']}"]['propuesta']
+        assert s['producido'] == pytest.approx(p['producido'])
+        if p['terminado']: assert not s['interrupted'] and s['end_time'] == pytest.approx(p['fin'])
+
+def test_presupuesto_de_la_planta():
+    # 80 líneas/turno con hasta 8 pedidos (ramificación y poda) y con muchos (búsqueda local)
+    planta = _planta(1, lineas=40, pedidos=(6, 8)) + _planta(2, lineas=10, pedidos=(30, 40), primera=41)
+    cortes = _cortes(planta)
+    t0 = time.perf_counter(); propuesta = optimizar_planta(_sims(planta), cortes, limite_planta=0.5); segundos = time.perf_counter() - t0
+    assert segundos < 1.5 and len(propuesta) == len(planta)
+    for r in propuesta.values():
+        if r['actual']['terminado']: assert r['propuesta']['fin'] <= r['actual']['fin'] + 1e-9
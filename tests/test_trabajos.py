@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Trabajos compartidos: reutilización por clave, resultados compartidos y memo entre hilos."""
+import threading
+import time
+import uuid
+import pytest
+from motor_simulacion import crear_simulacion, firma_planta, simular_planta
+from perfilador import Perfilador, contar, usar
+from trabajos import lanzar
+
+def _clave():
+    return ("prueba", uuid.uuid4().hex)
+
+def _sumar(a, b, progreso=None):
+    progreso(0.5); contar("prueba.sumas")
+    return {"total": a + b}
+
+def test_misma_clave_reutiliza_el_trabajo():
+    clave = _clave()
+    t1, nuevo1 = lanzar(clave, _sumar, 1, 2)
+    t2, nuevo2 = lanzar(clave, _sumar, 10, 20)
+    assert (nuevo1, nuevo2) == (True, False) and t1 is t2 and t1.sesiones == 2
+    assert t1.esperar(5) and t1.estado == 'hecho' and t1.progreso == 1.0
+    assert t2.resultado is t1.resultado and t1.resultado == {"total": 3}
+    t3, nuevo3 = lanzar(_clave(), _sumar, 10, 20)
+    assert nuevo3 and t3 is not t1 and t3.esperar(5) and t3.resultado == {"total": 30}
+
+def test_un_trabajo_con_error_se_relanza():
+    clave = _clave()
+    t1, _ = lanzar(clave, _sumar, 1, None)
+    assert t1.esperar(5) and t1.estado == 'error' and isinstance(t1.error, TypeError)
+    t2, nuevo = lanzar(clave, _sumar, 1, 2)
+    assert nuevo and t2.esperar(5) and t2.resultado == {"total": 3}
+
+def test_el_trabajo_no_usa_el_perfilador_de_la_sesion():
+    perf = Perfilador(); usar(perf)
+    try:
+        t, _ = lanzar(_clave(), _sumar, 1, 2)
+        assert t.esperar(5) and t.estado == 'hecho'
+    finally: usar(None)
+    assert "prueba.sumas" not in perf.contadores
+
+def test_memo_se_calcula_una_vez_entre_hilos():
+    t, _ = lanzar(_clave(), _sumar, 1, 2); t.esperar(5)
+    llamadas = []
+    def construir():
+        llamadas.append(1); time.sleep(0.1); return len(llamadas)
+    valores = []
+    hilos = [threading.Thread(target=lambda: valores.append(t.memo(('historico',), construir))) for _ in range(8)]
+    for h in hilos: h.start()
+    for h in hilos: h.join()
+    assert llamadas == [1] and valores == [1] * 8
+
+def test_memo_con_error_no_se_guarda():
+    t, _ = lanzar(_clave(), _sumar, 1, 2); t.esperar(5)
+    def falla(): raise ValueError("sin base de datos")
+    with pytest.raises(ValueError): t.memo("x", falla)
+    assert t.memo("x", lambda: 7) == 7
+
+def _linea(velocidad, oee, descansos=()):
+    clientes = {"A": {"articulos": [{"nombre": "Pechuga", "cantidad": 6000, "velocidad": velocidad, "oee": oee}], "hora_entrada": None, "tiene_hora": False}}
+    return crear_simulacion("1", "1", 6.0, list(descansos), clientes, breaks_desc=", ".join(f"{s}-{e}" for s, e in descansos))
+
+def test_firma_distingue_la_tabla_de_pedidos():
+    # Misma velocidad real (1000 * 80% = 800 * 100%): simulan igual, pero la tabla de pedidos es otra
+    a, b = _linea(1000, 80), _linea(800, 100)
+    assert firma_planta([a]) != firma_planta([b])
+    assert firma_planta([a]) == firma_planta([_linea(1000, 80)])
+    ra, rb = simular_planta([a], cache=False), simular_planta([b], cache=False)
+    assert ra['fin'] == rb['fin'] and not ra['sims'][0]['resumen_tabla'].equals(rb['sims'][0]['resumen_tabla'])
+
+def test_sesiones_con_el_mismo_plan_comparten_el_resultado():
+    sims_a, sims_b = [_linea(1000, 80)], [_linea(1000, 80)]
+    ta, _ = lanzar(firma_planta(sims_a), simular_planta, sims_a)
+    tb, nuevo = lanzar(firma_planta(sims_b), simular_planta, sims_b)
+    assert not nuevo and tb is ta and ta.esperar(10)
+    assert ta.resultado['sims'][0]['end_time'] == pytest.approx(6.0 + 6000 / 800)
+    tc, nuevo = lanzar(firma_planta([_linea(800, 100)]), simular_planta, [_linea(800, 100)])
+    assert nuevo and tc is not ta
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Trabajos en segundo plano compartidos entre sesiones.
+
+La simulación se lanza en un pool de hilos y su progreso y resultado quedan en un
+almacén a nivel de módulo, indexado por una clave (huella del plan y de los
+ajustes). Si otra sesión pide el mismo trabajo recibe el que ya está en curso o
+terminado, en lugar de repetirlo. La interfaz consulta el estado sin bloquearse
+(fragmentos de Streamlit que se re-ejecutan periódicamente).
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+MAX_TRABAJOS = 16          # Trabajos terminados que se conservan (los más antiguos se descartan)
+MAX_MEMO = 2000            # Valores derivados (p.ej. gráficos serializados) por trabajo
+HILOS = max(1, min(4, os.cpu_count() or 1))
+
+# ==========================================
+# 1. TRABAJO
+# ==========================================
+class Trabajo:
+    """Estado de un cálculo: 'en_cola', 'en_curso', 'hecho' o 'error'; `progreso` entre 0 y 1."""
+
+    def __init__(self, clave):
+        self.clave = clave; self.estado = 'en_cola'; self.progreso = 0.0
+        self.resultado = None; self.error = None
+        self.creado = time.time(); self.terminado = None; self.sesiones = 1
+        self._evento = threading.Event(); self._lock = threading.Lock(); self._memo = OrderedDict()
+
+    def hecho(self):
+        return self._evento.is_set()
+
+    def esperar(self, timeout=None):
+        """True si el trabajo ha terminado (bien o con error) antes de `timeout` segundos."""
+        return self._evento.wait(timeout)
+
+    def avanzar(self, fraccion):
+        self.progreso = min(1.0, max(self.progreso, fraccion))
+
+    def memo(self, clave, construir):
+        """Valor derivado del resultado, calculado una vez y compartido por todas las sesiones.
+
+        Si otra sesión ya lo está calculando se espera a su valor (p.ej. guardar en el histórico
+        una sola vez); si el cálculo falla no se guarda y el error llega a quien espera.
+        """
+        with self._lock:
+            f = self._memo.get(clave); propio = f is None
+            if propio:
+                f = self._memo[clave] = Future()
+                while len(self._memo) > MAX_MEMO: self._memo.popitem(last=False)
+            else: self._memo.move_to_end(clave)
+        if propio:
+            try: f.set_result(construir())
+            except BaseException as e:
+                with self._lock:
+                    if self._memo.get(clave) is f: del self._memo[clave]
+                f.set_exception(e)
+        return f.result()
+
+def _ejecutar(trabajo, fn, args, kwargs):
+    trabajo.estado = 'en_curso'
+    try:
+        trabajo.resultado = fn(*args, progreso=trabajo.avanzar, **kwargs)
+        trabajo.progreso = 1.0; trabajo.estado = 'hecho'
+    except Exception as e:
+        trabajo.error = e; trabajo.estado = 'error'
+    finally:
+        trabajo.terminado = time.time(); trabajo._evento.set()
+
+# ==========================================
+# 2. ALMACÉN COMPARTIDO
+# ==========================================
+_lock = threading.Lock()
+_trabajos = OrderedDict()   # clave -> Trabajo
+_pool = ThreadPoolExecutor(max_workers=HILOS, thread_name_prefix="trabajo")
+
+def lanzar(clave, fn, *args, **kwargs):
+    """Trabajo de `clave`; si no existe (o falló) se encola `fn(*args, progreso=..., **kwargs)`.
+
+    Devuelve (trabajo, nuevo): `nuevo` es False si se reutiliza uno en curso o ya terminado.
+    """
+    with _lock:
+        t = _trabajos.get(clave)
+        if t is not None and t.estado != 'error':
+            _trabajos.move_to_end(clave); t.sesiones += 1
+            return t, False
+        t = _trabajos[clave] = Trabajo(clave)
+        # Sólo se descartan trabajos terminados: los que siguen en curso tienen sesiones esperándolos
+        for c in [c for c, v in _trabajos.items() if v.hecho()][:max(0, len(_trabajos) - MAX_TRABAJOS)]: del _trabajos[c]
+    # En un contexto vacío: el trabajo es de todas las sesiones, no del perfilador de quien lo lanza
+    _pool.submit(contextvars.Context().run, _ejecutar, t, fn, args, kwargs)
+    return t, True
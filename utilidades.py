@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Funciones helper sin dependencia de Streamlit (formato, horas y descansos)."""
+import datetime
+import pandas as pd
+
+def fmt_num_es(val):
+    """Formato español 1.000,00"""
+    # Los int/float de Python (lo habitual) no pasan por pd.isna, que es lo más lento de la función
+    if type(val) is float or type(val) is int:
+        if val != val: return ""
+    elif pd.isna(val) or val == "": return ""
+    try:
+        if val == int(val): return "{:,.0f}".format(val).replace(",", ".")
+        return "{:,.2f}".format(val).replace(",", "X").replace(".", ",").replace("X", ".")
+    except: return str(val)
+
+def time_to_float(time_obj):
+    if time_obj is None: return 0.0
+    return time_obj.hour + time_obj.minute / 60.0
+
+def float_to_time_str(time_float):
+    hours = int(time_float); minutes = round((time_float - hours) * 60)
+    if minutes == 60: hours += 1; minutes = 0
+    days = hours // 24; hours = hours % 24
+    if days > 0: return f"{hours:02d}:{minutes:02d} (+{days}d)"
+    return f"{hours:02d}:{minutes:02d}"
+
+def str_to_time(time_str):
+    if not time_str or pd.isna(time_str): return None
+    try: return datetime.datetime.strptime(str(time_str).strip(), '%H:%M').time()
+    except ValueError: return None
+
+def str_to_bool(val):
+    if pd.isna(val): return False
+    s = str(val).strip().upper()
+    return s in ['TRUE', 'VERDADERO', 'SI', 'YES', '1']
+
+def safe_get_int(val, default):
+    if pd.isna(val) or val == "": return default
+    s_val = str(val).strip().replace('.', '').replace(',', '')
+    if s_val == '': return default
+    try: return int(float(s_val))
+    except: return default